@@ -4,36 +4,18 @@ Python 3.12 + Flask 3.x
 Real-time Analytics and Event Tracking for E-Commerce Platform
 """
 
-import os
 import structlog
 from flask import Flask, jsonify
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from flask_cors import CORS
-from src.config.settings import Config
+from src.config.settings import get_settings
+from src.config.logging_config import configure_logging
 from src.controllers.analytics_controller import analytics_bp
 from src.controllers.health_controller import health_bp
 from src.controllers.chaos_controller import chaos_bp
-from src.middleware.monitoring_middleware import RequestMonitoringMiddleware, get_metrics_endpoint
-from src.services.background_tasks import celery_app
+from src.middleware.monitoring_middleware import RequestMonitoringMiddleware
 
 # Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+configure_logging()
 
 logger = structlog.get_logger(__name__)
 
@@ -45,26 +27,7 @@ def create_app(config_name: str = None) -> Flask:
     app = Flask(__name__)
     
     # Load configuration
-    settings = Config()
-    
-    # Configure structured logging
-    structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
-        ],
-        context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
-        cache_logger_on_first_use=True,
-    )
+    settings = get_settings()
     
     # Set Flask configuration
     app.config.update(
@@ -167,8 +130,17 @@ def create_app(config_name: str = None) -> Flask:
                 'metrics': '/metrics', 
                 'events': '/api/v1/analytics/events',
                 'dashboard': '/api/v1/analytics/dashboard/metrics',
+                'rolling_uniques': '/api/v1/analytics/dashboard/uniques',
+                'realtime_top': '/api/v1/analytics/realtime/top/{dimension}',
+                'event_timeseries': '/api/v1/analytics/realtime/events/timeseries',
+                'funnel': '/api/v1/analytics/funnels/{name}',
                 'search': '/api/v1/analytics/events/search',
                 'aggregations': '/api/v1/analytics/aggregations/{period}',
+                'quantiles': '/api/v1/analytics/quantiles',
+                'event_export': '/api/v1/analytics/events/export',
+                'query': '/api/v1/analytics/query',
+                'archive_segments': '/api/v1/analytics/archive/segments',
+                'archive_rehydrate': '/api/v1/analytics/archive/rehydrate',
                 'load_test_metrics': '/api/v1/analytics/metrics/load-test',
                 'load_test_start': '/api/v1/analytics/load-test/start',
                 'load_test_stop': '/api/v1/analytics/load-test/stop',
@@ -183,19 +155,7 @@ def create_app(config_name: str = None) -> Flask:
             }
         })
     
-    # Initialize Celery with Flask app context
-    celery_app.conf.update(app.config)
-    
-    class ContextTask(celery_app.Task):
-        """Make celery tasks work with Flask app context."""
-        def __call__(self, *args, **kwargs):
-            with app.app_context():
-                return self.run(*args, **kwargs)
-    
-    celery_app.Task = ContextTask
-    
     # Log application startup
-    logger = structlog.get_logger(__name__)
     logger.info(
         "Analytics service initialized",
         version="2.0.0",
@@ -214,17 +174,28 @@ def create_app(config_name: str = None) -> Flask:
     
     return app
 
-# Create application instance
-app = create_app()
+
+
+def __getattr__(name: str):
+    """
+    Create the application instance on first access (`gunicorn app:app`,
+    or once in the master with --preload) rather than at import
+    """
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
     # Get settings
-    settings = Config()
+    settings = get_settings()
     
     # Run the application
-    app.run(
+    create_app().run(
         host='0.0.0.0',
         port=settings.PORT,
         debug=settings.DEBUG,
         threaded=True
-    ) 
\ No newline at end of file
+    )
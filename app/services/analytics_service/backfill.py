@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Historical backfill / re-aggregation CLI for Analytics Service
+Rebuilds stored aggregations for a time range, partitioned and resumable
+
+Examples:
+    python backfill.py --start 2024-01-01 --end 2025-01-01
+    python backfill.py --start 2024-06-01 --end 2024-07-01 --periods hour,day \\
+        --executor celery --max-read-units 2000 --checkpoint /tmp/backfill-june.json
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.services.aggregation_engine import PERIODS
+from src.services.backfill import run_backfill
+
+
+def parse_time(value: str) -> datetime:
+    """ISO date or timestamp; naive values are UTC"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Analytics Service aggregation backfill')
+    parser.add_argument('--start', type=parse_time, required=True, help='Range start (ISO date/timestamp)')
+    parser.add_argument('--end', type=parse_time, required=True, help='Range end, exclusive (ISO date/timestamp)')
+    parser.add_argument('--periods', type=str, default=','.join(PERIODS),
+                        help='Comma-separated periods to rebuild (default: all, in rollup order)')
+    parser.add_argument('--executor', type=str, default='process', choices=['process', 'celery', 'serial'],
+                        help='Run partitions on a local process pool, a Celery group or inline')
+    parser.add_argument('--workers', type=int, help='Parallel partitions (default: CPU count)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='Checkpoint file (none by default); rerunning the same range and periods '
+                             'with it skips completed partitions')
+    parser.add_argument('--from-events', action='store_true',
+                        help='Build every period from raw events instead of rolling up')
+    parser.add_argument('--max-read-units', type=float,
+                        help='Total DynamoDB read capacity units per second across workers')
+    parser.add_argument('--max-writes', type=float,
+                        help='Total aggregation writes per second across workers')
+
+    args = parser.parse_args()
+
+    try:
+        summary = run_backfill(
+            start=args.start,
+            end=args.end,
+            periods=[p.strip() for p in args.periods.split(',') if p.strip()],
+            executor=args.executor,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            from_events=args.from_events,
+            max_read_units=args.max_read_units,
+            max_writes=args.max_writes,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
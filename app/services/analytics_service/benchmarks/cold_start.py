@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for Analytics Service
+Import-time breakdown (python -X importtime) and time to first request of fresh processes
+
+Usage:
+    python benchmarks/cold_start.py                 # importtime breakdown + in-process first request
+    python benchmarks/cold_start.py --gunicorn      # also gunicorn with and without --preload
+    python benchmarks/cold_start.py --runs 10 --json
+
+Every measurement starts a new interpreter after one untimed run (so
+bytecode caches are warm, as in a built image). No AWS or Redis is
+needed: the first request is the liveness probe.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.app
+created = time.perf_counter()
+status = flask_app.test_client().get('/live').status_code
+served = time.perf_counter()
+print(json.dumps({'import_s': imported - started, 'create_app_s': created - imported,
+                  'first_request_s': served - created, 'status': status}))
+"""
+
+
+def _run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=SERVICE_ROOT, capture_output=True, text=True, check=True)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        'median_ms': round(statistics.median(values) * 1000, 1),
+        'min_ms': round(min(values) * 1000, 1),
+        'max_ms': round(max(values) * 1000, 1),
+    }
+
+
+def importtime_breakdown(top: int = 25) -> Dict[str, Any]:
+    """Modules imported by `import app`, by cumulative and by self time"""
+    _run_python(['-c', 'import app'])
+    stderr = _run_python(['-X', 'importtime', '-c', 'import app']).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip())) // 2,
+                        'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    total = next(m['cumulative_ms'] for m in modules if m['module'] == 'app')
+    return {
+        'total_ms': total,
+        'modules': len(modules),
+        'by_cumulative': sorted(modules, key=lambda m: -m['cumulative_ms'])[:top],
+        'by_self': sorted(modules, key=lambda m: -m['self_ms'])[:top],
+    }
+
+
+def first_request(runs: int) -> Dict[str, Any]:
+    """Process start to first served request, through the Flask test client"""
+    _run_python(['-c', FIRST_REQUEST_SNIPPET])
+    samples: Dict[str, List[float]] = {'process_s': [], 'import_s': [], 'create_app_s': [], 'first_request_s': []}
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = json.loads(_run_python(['-c', FIRST_REQUEST_SNIPPET]).stdout.strip().splitlines()[-1])
+        samples['process_s'].append(time.perf_counter() - started)
+        for key in ('import_s', 'create_app_s', 'first_request_s'):
+            samples[key].append(result[key])
+    return {key.replace('_s', ''): _summary(values) for key, values in samples.items()}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def gunicorn_first_request(runs: int, workers: int, preload: bool, timeout: float = 60.0) -> Dict[str, Any]:
+    """Gunicorn start to the first 200 from /live"""
+    samples = []
+    for _ in range(runs):
+        port = _free_port()
+        env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false')
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+             '--workers', str(workers), '--log-level', 'warning', 'app:app'],
+            cwd=SERVICE_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"gunicorn did not serve within {timeout}s")
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/live', timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    time.sleep(0.01)
+            samples.append(time.perf_counter() - started)
+        finally:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+    return _summary(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Analytics Service cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per measurement')
+    parser.add_argument('--top', type=int, default=25, help='Modules listed in the import breakdown')
+    parser.add_argument('--gunicorn', action='store_true', help='Also measure gunicorn with and without preload')
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers')
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        'python': sys.version.split()[0],
+        'importtime': importtime_breakdown(args.top),
+        'first_request': first_request(args.runs),
+    }
+    if args.gunicorn:
+        report['gunicorn'] = {
+            'preload': gunicorn_first_request(args.runs, args.workers, preload=True),
+            'no_preload': gunicorn_first_request(args.runs, args.workers, preload=False),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    breakdown = report['importtime']
+    print(f"import app: {breakdown['total_ms']:.1f} ms, {breakdown['modules']} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module in breakdown['by_cumulative']:
+        print(f"{module['cumulative_ms']:14.1f} {module['self_ms']:9.1f}  {'  ' * module['depth']}{module['module']}")
+    print()
+    for phase, summary in report['first_request'].items():
+        print(f"{phase:>14}: median {summary['median_ms']} ms (min {summary['min_ms']}, max {summary['max_ms']})")
+    for mode, summary in report.get('gunicorn', {}).items():
+        print(f"{'gunicorn ' + mode:>22}: median {summary['median_ms']} ms to first /live (min {summary['min_ms']}, max {summary['max_ms']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Serving-mode benchmark for Analytics Service
+Throughput and latency percentiles of gunicorn sync vs gthread workers under concurrent load
+
+Usage:
+    python benchmarks/serving.py                          # /health, 32 clients, 10 s per mode
+    python benchmarks/serving.py --path /api/v1/analytics/dashboard/metrics --clients 64
+    python benchmarks/serving.py --modes gthread --workers 4 --threads 16 --json
+
+Each mode starts its own gunicorn (with gunicorn.conf.py, so worker and
+thread counts are the auto-tuned defaults unless overridden) and is
+driven by keep-alive HTTP clients in threads. The default /health
+endpoint waits 100 ms for a CPU sample, like a request waiting on
+DynamoDB or Redis, and needs no backing services; point --path at a real
+endpoint when LocalStack and Redis are running.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def start_server(mode: str, workers: Optional[int], threads: Optional[int]) -> Dict[str, Any]:
+    port = _free_port()
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=mode)
+    if workers:
+        env['GUNICORN_WORKERS'] = str(workers)
+    if threads:
+        env['GUNICORN_THREADS'] = str(threads)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'app:app'],
+        cwd=SERVICE_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/live', timeout=1):
+                return {'process': server, 'port': port}
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise TimeoutError(f"gunicorn ({mode}) did not start")
+
+
+def stop_server(server: Dict[str, Any]) -> None:
+    process = server['process']
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_load(port: int, path: str, clients: int, duration: float, warmup: float) -> Dict[str, Any]:
+    """Closed-loop load: every client sends its next request as soon as the previous one is answered"""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client() -> None:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local: List[float] = []
+        failed = 0
+        while True:
+            sent = time.monotonic()
+            if sent >= stop_at:
+                break
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            if sent >= measure_from:
+                if ok:
+                    local.append(time.monotonic() - sent)
+                else:
+                    failed += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    if not latencies:
+        return {'requests': 0, 'errors': errors[0]}
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(max(latencies) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Analytics Service serving-mode benchmark')
+    parser.add_argument('--path', default='/health', help='Endpoint to load')
+    parser.add_argument('--modes', default='sync,gthread', help='Comma-separated gunicorn worker classes')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per mode')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds before each run')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: auto-tuned per mode)')
+    parser.add_argument('--threads', type=int, help='Threads per gthread worker (default: auto-tuned)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {'path': args.path, 'clients': args.clients, 'cpus': os.cpu_count(), 'modes': {}}
+    for mode in args.modes.split(','):
+        server = start_server(mode, args.workers, args.threads)
+        try:
+            report['modes'][mode] = run_load(server['port'], args.path, args.clients, args.duration, args.warmup)
+        finally:
+            stop_server(server)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"GET {args.path} with {args.clients} clients, {args.duration:.0f} s per mode")
+    print(f"{'mode':>10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for mode, result in report['modes'].items():
+        print(f"{mode:>10} {result.get('throughput_rps', 0):9.1f} {result.get('p50_ms', 0):8.1f} "
+              f"{result.get('p99_ms', 0):8.1f} {result.get('max_ms', 0):8.1f} {result['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,14 @@ import os
 import sys
 import signal
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.services.background_tasks import celery_app
-from src.config.settings import Settings
+from src.services.background_tasks import batching_prefetch_multiplier, celery_app
+from src.config.settings import get_settings
+from src.config.logging_config import configure_logging
 import structlog
 
 # Configure logging for Celery worker
@@ -24,31 +25,106 @@ logging.basicConfig(
 )
 
 # Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+configure_logging()
 
 logger = structlog.get_logger(__name__)
 
+DEFAULT_QUEUES = "high_priority,aggregations,notifications,maintenance"
+
+
+def io_concurrency(cpus: int) -> int:
+    """Threads of an I/O-bound pool: bounded by the AWS connection pool they share"""
+    settings = get_settings()
+    return max(1, min(cpus * settings.WORKER_IO_THREADS_PER_CPU, settings.AWS_MAX_POOL_CONNECTIONS))
+
+
+# Worker profile of each queue: pool, concurrency (from the CPU count), prefetch
+# (from the concurrency) and acknowledgement policy of its tasks
+QUEUE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Event ingestion waits on DynamoDB, SNS and Redis: many threads in one process.
+    # Acked after the task and redelivered if the worker dies (event writes are idempotent)
+    'high_priority': {
+        'pool': 'threads',
+        'concurrency': io_concurrency,
+        'prefetch_multiplier': batching_prefetch_multiplier,
+        'acks_late': True,
+        'reject_on_worker_lost': True,
+    },
+    # Alerts are I/O-bound as well; acked on receipt, as a redelivered alert would be sent twice
+    'notifications': {
+        'pool': 'threads',
+        'concurrency': io_concurrency,
+        'prefetch_multiplier': lambda concurrency: 4,
+        'acks_late': False,
+        'reject_on_worker_lost': False,
+    },
+    # Aggregations are CPU-heavy: one process per CPU, one task reserved at a time;
+    # a task that kills its process is not redelivered (it would take the next one down too)
+    'aggregations': {
+        'pool': 'prefork',
+        'concurrency': lambda cpus: cpus,
+        'prefetch_multiplier': lambda concurrency: 1,
+        'acks_late': True,
+        'reject_on_worker_lost': False,
+    },
+    # Long scans and exports, throttled to a capacity budget: few processes
+    'maintenance': {
+        'pool': 'prefork',
+        'concurrency': lambda cpus: min(2, cpus),
+        'prefetch_multiplier': lambda concurrency: 1,
+        'acks_late': True,
+        'reject_on_worker_lost': False,
+    },
+}
+
+
+# Time limits and child recycling; only the prefork pool enforces them. The threads
+# and solo pools have no child process to signal or replace, so there a task's run
+# time is bounded by the AWS and Redis client timeouts instead
+PREFORK_LIMITS: Dict[str, Any] = {
+    'task_time_limit': 1200,             # 20 minutes hard limit
+    'task_soft_time_limit': 600,         # 10 minutes soft limit
+    'worker_max_tasks_per_child': 1000,  # Restart after 1000 tasks
+}
+
+
+def pool_limits(pool: str) -> Dict[str, Any]:
+    """Time-limit and recycling options of a worker; empty for pools that cannot enforce them"""
+    return dict(PREFORK_LIMITS) if pool == 'prefork' else {}
+
+
+def resolve_worker_profile(queues: List[str], concurrency: Optional[int] = None,
+                           pool: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pool, concurrency and prefetch of a worker consuming the given queues:
+    their common pool, or prefork when CPU-bound queues are mixed in
+    (a thread pool would serialize them on the GIL)
+    """
+    cpus = os.cpu_count() or 1
+    profiles = [QUEUE_PROFILES[queue] for queue in queues if queue in QUEUE_PROFILES]
+    pools = {profile['pool'] for profile in profiles}
+    pool = pool or (pools.pop() if len(pools) == 1 else 'prefork')
+    matching = [profile for profile in profiles if profile['pool'] == pool] or profiles
+    if concurrency is None:
+        concurrency = max([profile['concurrency'](cpus) for profile in matching], default=cpus)
+    prefetch_multiplier = max([profile['prefetch_multiplier'](concurrency) for profile in profiles], default=1)
+    return {'pool': pool, 'concurrency': concurrency, 'prefetch_multiplier': prefetch_multiplier}
+
+
+def apply_acks_policy(queues: List[str]) -> None:
+    """Set the acknowledgement policy of each queue's tasks"""
+    for task in celery_app.tasks.values():
+        profile = QUEUE_PROFILES.get(getattr(task, 'queue', None))
+        if profile is not None and task.queue in queues:
+            task.acks_late = profile['acks_late']
+            task.reject_on_worker_lost = profile['reject_on_worker_lost']
+
+
 class CeleryWorkerManager:
     """Manager for Celery worker lifecycle"""
     
     def __init__(self):
-        self.settings = Settings()
+        self.settings = get_settings()
         self.worker = None
         self.setup_signal_handlers()
     
@@ -68,28 +144,40 @@ class CeleryWorkerManager:
                     worker_name: Optional[str] = None,
                     concurrency: Optional[int] = None,
                     queues: Optional[str] = None,
-                    log_level: str = 'INFO'):
+                    log_level: str = 'INFO',
+                    pool: Optional[str] = None):
         """
         Start Celery worker with enhanced configuration
         
         Args:
             worker_name: Name of the worker (default: hostname)
-            concurrency: Number of worker processes (default: CPU count)
+            concurrency: Number of worker processes or threads (default: from the queues' profiles)
             queues: Comma-separated list of queues to consume from
             log_level: Logging level
+            pool: Worker pool (default: from the queues' profiles)
         """
         
         # Determine worker configuration
         worker_name = worker_name or f"analytics-worker@{os.uname().nodename}"
-        concurrency = concurrency or os.cpu_count()
-        queues = queues or "high_priority,aggregations,notifications,maintenance"
+        queues = queues or DEFAULT_QUEUES
+        profile = resolve_worker_profile(queues.split(','), concurrency, pool)
+        limits = pool_limits(profile['pool'])
+        apply_acks_policy(queues.split(','))
+        if not limits:
+            logger.warning(
+                "Task time limits and max tasks per child are not enforced by this pool",
+                pool=profile['pool'],
+                aws_read_timeout=self.settings.AWS_READ_TIMEOUT,
+            )
         
         # Log startup configuration
         logger.info(
             "Starting Celery worker",
             worker_name=worker_name,
-            concurrency=concurrency,
+            pool=profile['pool'],
+            concurrency=profile['concurrency'],
             queues=queues,
+            prefetch_multiplier=profile['prefetch_multiplier'],
             log_level=log_level,
             redis_host=self.settings.redis_host,
             redis_port=self.settings.redis_port,
@@ -108,22 +196,19 @@ class CeleryWorkerManager:
         try:
             self.worker = celery_app.Worker(
                 hostname=worker_name,
-                concurrency=concurrency,
+                concurrency=profile['concurrency'],
                 queues=queues.split(','),
                 loglevel=log_level.upper(),
                 optimization='fair',
-                pool='prefork',  # Use prefork pool for better isolation
+                pool=profile['pool'],  # threads for I/O-bound queues, prefork for isolation of CPU-bound ones
                 # Enable events for monitoring
                 send_events=True,
                 # Prefetch settings for better performance
-                prefetch_multiplier=1,
+                prefetch_multiplier=profile['prefetch_multiplier'],
                 # Heartbeat settings
                 worker_heartbeat_interval=30,
-                # Task execution settings
-                task_time_limit=1200,      # 20 minutes hard limit
-                task_soft_time_limit=600,  # 10 minutes soft limit
-                # Memory management
-                worker_max_tasks_per_child=1000,  # Restart after 1000 tasks
+                # Time limits and memory management (prefork only)
+                **limits,
                 worker_disable_rate_limits=False,
                 # Enable result backend
                 result_persistent=True,
@@ -177,8 +262,10 @@ def main():
     
     parser = argparse.ArgumentParser(description='Analytics Service Celery Worker')
     parser.add_argument('--name', type=str, help='Worker name')
-    parser.add_argument('--concurrency', type=int, help='Number of worker processes')
+    parser.add_argument('--concurrency', type=int, help='Number of worker processes or threads')
     parser.add_argument('--queues', type=str, help='Comma-separated list of queues')
+    parser.add_argument('--pool', type=str, choices=['prefork', 'threads', 'solo'],
+                       help='Worker pool (default: from the queues\' profiles)')
     parser.add_argument('--log-level', type=str, default='INFO', 
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                        help='Log level')
@@ -195,7 +282,8 @@ def main():
             worker_name=args.name,
             concurrency=args.concurrency,
             queues=args.queues,
-            log_level=args.log_level
+            log_level=args.log_level,
+            pool=args.pool
         )
 
 if __name__ == '__main__':
@@ -0,0 +1,83 @@
+"""
+Gunicorn configuration for Analytics Service
+Passed with --config; flags given on the command line take precedence
+"""
+
+import gc
+import importlib
+import math
+import os
+
+
+def available_cpus() -> int:
+    """CPUs this container may use: the cgroup CPU quota if set, else the CPU affinity"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:  # cgroup v2: "<quota> <period>" or "max <period>"
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:  # cgroup v1
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if quota > 0:
+                cpus = min(cpus, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+    return max(1, cpus)
+
+
+# Serving mode: 'gthread' (default) serves each worker's requests from a thread pool,
+# which suits requests that mostly wait on DynamoDB, Redis or the broker;
+# 'sync' handles one request per worker process
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+_cpus = available_cpus()
+if worker_class == 'sync':
+    workers = int(os.getenv('GUNICORN_WORKERS', 2 * _cpus + 1))
+    threads = 1
+else:
+    # One process per CPU for the Python work, threads for the concurrency
+    workers = int(os.getenv('GUNICORN_WORKERS', max(2, _cpus)))
+    threads = int(os.getenv('GUNICORN_THREADS',
+                            max(4, _cpus * int(os.getenv('GUNICORN_THREADS_PER_CPU', 8)) // workers)))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))  # seconds idle connections stay open (gthread)
+
+# Import the application once in the master and fork workers from it, so a
+# new worker serves immediately instead of repeating the imports
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ['true', '1']
+
+# Modules the web process only imports lazily (task dispatch, DynamoDB access):
+# with preload they are imported in the master as well, for workers to share
+PRELOAD_MODULES = (
+    'src.services.background_tasks',
+    'src.services.aws_services',
+)
+
+
+def when_ready(server):
+    """
+    Finish the master's imports, then move everything allocated so far out
+    of the garbage collector's reach: collections would otherwise touch
+    (and copy) every shared page in every worker
+    """
+    if not preload_app:
+        return
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """
+    Drop AWS clients inherited from the master and start the worker's
+    service warm-up (in the background: the worker already accepts
+    requests, /ready reports when the warm-up is done)
+    """
+    from src.services.aws_clients import get_aws_clients
+    from src.services.registry import get_services
+    get_aws_clients().reset()
+    get_services().start_warm_up()
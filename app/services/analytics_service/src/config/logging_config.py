@@ -0,0 +1,33 @@
+"""
+Logging configuration for Analytics Service
+Structured JSON logging shared by the API and the Celery worker
+"""
+
+import structlog
+
+_configured = False
+
+
+def configure_logging() -> None:
+    """Configure structlog (once per process; later calls are no-ops)"""
+    global _configured
+    if _configured:
+        return
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer()
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    _configured = True
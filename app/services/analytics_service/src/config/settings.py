@@ -4,6 +4,7 @@ Environment-based configuration management
 """
 
 import os
+from functools import lru_cache
 from typing import Optional
 
 
@@ -28,6 +29,16 @@ class Config:
     AWS_DYNAMODB_ENDPOINT = os.getenv('AWS_DYNAMODB_ENDPOINT', 'http://localhost:4566')
     AWS_SNS_ENDPOINT = os.getenv('AWS_SNS_ENDPOINT', 'http://localhost:4566')
     AWS_SQS_ENDPOINT = os.getenv('AWS_SQS_ENDPOINT', 'http://localhost:4566')
+    AWS_S3_ENDPOINT = os.getenv('AWS_S3_ENDPOINT', 'http://localhost:4566')
+    
+    # Shared boto3 clients: pooled keep-alive connections per process (size >= threads using them)
+    AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', 50))
+    AWS_CONNECT_TIMEOUT = float(os.getenv('AWS_CONNECT_TIMEOUT', 2))  # seconds
+    AWS_READ_TIMEOUT = float(os.getenv('AWS_READ_TIMEOUT', 10))
+    AWS_RETRY_MODE = os.getenv('AWS_RETRY_MODE', 'standard')
+    AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', 3))  # botocore attempts (not DynamoDB, see below)
+    # Threads running the blocking AWS calls of async service methods (at most one pooled connection each)
+    AWS_IO_WORKERS = int(os.getenv('AWS_IO_WORKERS', AWS_MAX_POOL_CONNECTIONS))
     
     # DynamoDB Tables
     ANALYTICS_EVENTS_TABLE = os.getenv('ANALYTICS_EVENTS_TABLE', 'analytics-events')
@@ -56,6 +67,80 @@ class Config:
     EVENTS_ENABLED = os.getenv('EVENTS_ENABLED', 'true').lower() in ['true', '1']
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', 100))
     PROCESSING_INTERVAL = int(os.getenv('PROCESSING_INTERVAL', 30))  # seconds
+    EVENT_SCAN_PAGE_SIZE = int(os.getenv('EVENT_SCAN_PAGE_SIZE', 1000))  # items per DynamoDB page when streaming events
+    # Single-event tasks are buffered by the high_priority worker and processed together,
+    # flushed at EVENT_BATCH_MAX_SIZE events or every EVENT_BATCH_MAX_WAIT seconds
+    EVENT_BATCHING_ENABLED = os.getenv('EVENT_BATCHING_ENABLED', 'true').lower() in ['true', '1']
+    EVENT_BATCH_MAX_SIZE = int(os.getenv('EVENT_BATCH_MAX_SIZE', 100))
+    EVENT_BATCH_MAX_WAIT = float(os.getenv('EVENT_BATCH_MAX_WAIT', 1.0))
+    # Larger batches are split into chunks processed in parallel by the high_priority workers (0 = never)
+    EVENT_BATCH_CHUNK_SIZE = int(os.getenv('EVENT_BATCH_CHUNK_SIZE', 100))
+    # Celery thread pools of I/O-bound queues (high_priority, notifications): threads per CPU
+    WORKER_IO_THREADS_PER_CPU = int(os.getenv('WORKER_IO_THREADS_PER_CPU', 16))
+    
+    # Time-bucket index: events carry time_bucket = "{hour}#{hash(event_id) mod N}", the partition key of
+    # EVENTS_TIME_INDEX (sort key: timestamp); time-range reads query all shards of each hour in parallel.
+    # Without write sharding N is 1, so every hour is still read with one query instead of a table scan
+    EVENT_SHARDING_ENABLED = os.getenv('EVENT_SHARDING_ENABLED', 'false').lower() in ['true', '1']
+    EVENT_SHARDING_SINCE = os.getenv('EVENT_SHARDING_SINCE', '')  # first hour with time_bucket; earlier ranges are scanned
+    EVENT_SHARDS = int(os.getenv('EVENT_SHARDS', 8))
+    EVENT_SHARD_SCHEDULE = os.getenv('EVENT_SHARD_SCHEDULE', '')  # JSON {"<hour ISO>": shards from that hour on}
+    EVENT_SHARD_READ_WORKERS = int(os.getenv('EVENT_SHARD_READ_WORKERS', 16))
+    EVENTS_TIME_INDEX = os.getenv('EVENTS_TIME_INDEX', 'time-bucket-index')
+    
+    # DynamoDB access layer: throttled operations are retried individually (decorrelated jitter) and
+    # an AIMD client-side limit per table and process (capacity units/second, 0 = unlimited) adapts to throttling
+    DYNAMODB_MAX_READ_UNITS = float(os.getenv('DYNAMODB_MAX_READ_UNITS', 1000))
+    DYNAMODB_MAX_WRITE_UNITS = float(os.getenv('DYNAMODB_MAX_WRITE_UNITS', 1000))
+    DYNAMODB_MIN_RATE_UNITS = float(os.getenv('DYNAMODB_MIN_RATE_UNITS', 5))
+    DYNAMODB_RATE_INCREASE = float(os.getenv('DYNAMODB_RATE_INCREASE', 1))  # units/second added per second of successes
+    DYNAMODB_MAX_RETRIES = int(os.getenv('DYNAMODB_MAX_RETRIES', 8))
+    DYNAMODB_RETRY_BASE_DELAY = float(os.getenv('DYNAMODB_RETRY_BASE_DELAY', 0.025))  # seconds
+    DYNAMODB_RETRY_MAX_DELAY = float(os.getenv('DYNAMODB_RETRY_MAX_DELAY', 5))
+    
+    # Aggregation kernel for raw-event passes: 'numpy' (vectorized batches) or 'python'
+    AGGREGATION_KERNEL = os.getenv('AGGREGATION_KERNEL', 'numpy')
+    AGGREGATION_BATCH_SIZE = int(os.getenv('AGGREGATION_BATCH_SIZE', 50000))
+    # Raw-event reads one rollup may issue to rebuild missing lower-level aggregations (0 = unlimited);
+    # beyond it missing periods are skipped and logged (rebuild them with a backfill)
+    AGGREGATION_MAX_REBUILD_READS = int(os.getenv('AGGREGATION_MAX_REBUILD_READS', 48))
+    
+    # Sessionization: inactivity gap that ends a session, and in-worker store bound
+    SESSION_INACTIVITY_GAP = int(os.getenv('SESSION_INACTIVITY_GAP', 1800))  # seconds
+    SESSION_STORE_MAX_SESSIONS = int(os.getenv('SESSION_STORE_MAX_SESSIONS', 1000000))
+    
+    # Conversion funnels as a JSON list of {name, steps, step_window_seconds}; empty = built-in checkout funnel
+    FUNNEL_DEFINITIONS = os.getenv('FUNNEL_DEFINITIONS', '')
+    
+    # Parquet/Arrow event exports
+    EXPORT_OUTPUT_DIR = os.getenv('EXPORT_OUTPUT_DIR', '/tmp/analytics-exports')
+    EXPORT_ROW_GROUP_SIZE = int(os.getenv('EXPORT_ROW_GROUP_SIZE', 50000))  # rows buffered per file/stream chunk
+    EXPORT_COMPRESSION = os.getenv('EXPORT_COMPRESSION', 'zstd')
+    EXPORT_MAX_DOWNLOAD_DAYS = int(os.getenv('EXPORT_MAX_DOWNLOAD_DAYS', 31))
+    
+    # Retention: days raw events are kept (per-type overrides as a JSON object, e.g. {"api_call": 30})
+    EVENT_RETENTION_DAYS = int(os.getenv('EVENT_RETENTION_DAYS', 395))
+    RETENTION_POLICIES = os.getenv('RETENTION_POLICIES', '')
+    # Purge of legacy items without TTL: parallel scan segments and capacity budget (units/second)
+    PURGE_SEGMENTS = int(os.getenv('PURGE_SEGMENTS', 4))
+    PURGE_MAX_READ_UNITS = float(os.getenv('PURGE_MAX_READ_UNITS', 50))
+    PURGE_MAX_WRITE_UNITS = float(os.getenv('PURGE_MAX_WRITE_UNITS', 25))
+    
+    # Cold-tier archival of events older than the hot window (keep below the shortest retention)
+    ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'false').lower() in ['true', '1']
+    ARCHIVE_HOT_DAYS = int(os.getenv('ARCHIVE_HOT_DAYS', 14))
+    ARCHIVE_STORAGE = os.getenv('ARCHIVE_STORAGE', 'local')  # 'local' or 's3'
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '/tmp/analytics-archive')
+    ARCHIVE_S3_BUCKET = os.getenv('ARCHIVE_S3_BUCKET', 'analytics-archive')
+    ARCHIVE_SEGMENT_MAX_EVENTS = int(os.getenv('ARCHIVE_SEGMENT_MAX_EVENTS', 500000))
+    REHYDRATE_TTL_DAYS = int(os.getenv('REHYDRATE_TTL_DAYS', 7))
+    
+    # Embedded SQLite query tier with the last N days of events (file on a volume shared by workers and API)
+    LOCAL_STORE_ENABLED = os.getenv('LOCAL_STORE_ENABLED', 'false').lower() in ['true', '1']
+    LOCAL_STORE_PATH = os.getenv('LOCAL_STORE_PATH', '/tmp/analytics-local/events.sqlite3')
+    LOCAL_STORE_RETENTION_DAYS = int(os.getenv('LOCAL_STORE_RETENTION_DAYS', 7))
+    LOCAL_STORE_QUERY_TIMEOUT_MS = int(os.getenv('LOCAL_STORE_QUERY_TIMEOUT_MS', 2000))  # upper bound per query
+    LOCAL_STORE_MAX_ROWS = int(os.getenv('LOCAL_STORE_MAX_ROWS', 10000))
     
     # Other Services URLs
     PRODUCT_SERVICE_URL = os.getenv('PRODUCT_SERVICE_URL', 'http://localhost:8080')
@@ -124,6 +209,20 @@ class Config:
             config['endpoint_url'] = cls.AWS_SQS_ENDPOINT
             
         return config
+    
+    @classmethod
+    def get_s3_config(cls) -> dict:
+        """Get S3 configuration (archive storage)"""
+        config = {
+            'region_name': cls.AWS_REGION,
+            'aws_access_key_id': cls.AWS_ACCESS_KEY_ID,
+            'aws_secret_access_key': cls.AWS_SECRET_ACCESS_KEY,
+        }
+        
+        if cls.AWS_S3_ENDPOINT:
+            config['endpoint_url'] = cls.AWS_S3_ENDPOINT
+            
+        return config
 
 
 class DevelopmentConfig(Config):
@@ -137,6 +236,7 @@ class ProductionConfig(Config):
     AWS_DYNAMODB_ENDPOINT = None  # Use real AWS endpoints
     AWS_SNS_ENDPOINT = None
     AWS_SQS_ENDPOINT = None
+    AWS_S3_ENDPOINT = None
 
 
 class TestConfig(Config):
@@ -146,4 +246,10 @@ class TestConfig(Config):
 
 
 # Alias for backward compatibility
-Settings = Config 
\ No newline at end of file
+Settings = Config
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Config:
+    """Process-wide settings instance"""
+    return Config()
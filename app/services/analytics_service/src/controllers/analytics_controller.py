@@ -6,7 +6,7 @@ Main API endpoints for analytics event tracking and metrics
 import uuid
 import structlog
 from datetime import datetime, timedelta, timezone
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from pydantic import ValidationError
 from src.models.analytics_models import (
     AnalyticsEvent, MetricData, DashboardMetrics, 
@@ -14,9 +14,14 @@ from src.models.analytics_models import (
     EventBatchRequest, EventSearchRequest, EventSearchResponse,
     AnalyticsAggregation
 )
-from src.services.cache_service import CacheService
-from src.services.aws_services import AWSServices, DynamoDBService, SNSService
-from src.services.background_tasks import BackgroundTaskManager
+from src.config.settings import Config
+from src.services.aggregation_engine import QUANTILE_METRICS, RollupEngine
+from src.services.funnel_engine import COUNTER_TTL as FUNNEL_PERIODS, FunnelEngine
+from src.services.local_store import QueryTimeout, get_local_store
+from src.services.realtime_metrics import RealtimeTopK, RealtimeUniques, SlidingWindowCounter
+from src.services.registry import get_services
+from src.services.sessionizer import RedisSessionStore
+from src.services.sketches import hash64
 from src.middleware.monitoring_middleware import (
     log_function_call, correlation_id_required, PerformanceProfiler,
     get_correlation_id, add_structured_context,
@@ -35,12 +40,32 @@ api_requests = Counter('analytics_api_requests_total', 'Total API requests', ['e
 request_duration = Histogram('analytics_request_duration_seconds', 'Request duration', ['endpoint'])
 active_sessions = Gauge('analytics_active_sessions', 'Number of active sessions')
 
-# Initialize services with proper dependencies
-aws_services = AWSServices()
-dynamodb_service = DynamoDBService(aws_services)
-sns_service = SNSService(aws_services)
-cache_service = CacheService()
-task_manager = BackgroundTaskManager()
+# Services are created on first use (or by the warm-up), never at import time
+services = get_services()
+
+
+def _create_task_manager(registry):
+    # Imports the Celery app, only needed once a request dispatches a task
+    from src.services.background_tasks import BackgroundTaskManager
+    return BackgroundTaskManager()
+
+
+services.register('task_manager', _create_task_manager)
+services.register('realtime_uniques', lambda s: RealtimeUniques(s.get('cache')))
+services.register('realtime_top_k', lambda s: RealtimeTopK(s.get('cache')))
+services.register('event_counter', lambda s: SlidingWindowCounter(s.get('cache')))
+services.register('funnel_engine', lambda s: FunnelEngine(s.get('cache')))
+services.register('session_store', lambda s: RedisSessionStore(s.get('cache')))
+
+dynamodb_service = services.lazy('dynamodb')
+sns_service = services.lazy('sns')
+cache_service = services.lazy('cache')
+task_manager = services.lazy('task_manager')
+realtime_uniques = services.lazy('realtime_uniques')
+realtime_top_k = services.lazy('realtime_top_k')
+event_counter = services.lazy('event_counter')
+funnel_engine = services.lazy('funnel_engine')
+session_store = services.lazy('session_store')
 
 @analytics_bp.route('/events', methods=['POST'])
 @correlation_id_required
@@ -82,11 +107,8 @@ def track_event():
                 # Store in DynamoDB
                 dynamodb_service.store_event(event)
                 
-                # Update real-time cache metrics
-                cache_key = f"user_events:{event.user_id}:{event.event_day}"
-                cache_service.increment_counter(cache_key, ttl=86400)
-                
-                # Dispatch background tasks for heavy processing
+                # Dispatch background tasks for heavy processing (realtime counters,
+                # SNS publication, sessions, funnels)
                 task_id = task_manager.process_events_async(
                     [event.model_dump()], 
                     get_correlation_id()
@@ -230,8 +252,8 @@ def search_events():
                     'correlation_id': get_correlation_id()
                 }), 400
             
-            # Check cache first
-            cache_key = f"event_search:{hash(str(search_request.model_dump()))}"
+            # Check cache first (stable key, shared by every API worker)
+            cache_key = f"event_search:{hash64(search_request.model_dump_json())}"
             cached_result = cache_service.get_json(cache_key)
             
             if cached_result:
@@ -241,8 +263,14 @@ def search_events():
                 )
                 return jsonify(cached_result)
             
-            # Query events from DynamoDB
-            events = dynamodb_service.search_events(
+            # Ranges within the local store's retention are served from its indexes,
+            # older ones fall back to DynamoDB
+            local_store = get_local_store()
+            source = dynamodb_service
+            if local_store is not None and local_store.covers(search_request.start_time):
+                source = local_store
+            
+            events = source.search_events(
                 user_id=search_request.user_id,
                 event_type=search_request.event_type,
                 start_time=search_request.start_time,
@@ -252,7 +280,7 @@ def search_events():
             )
             
             # Get total count for pagination
-            total_count = dynamodb_service.count_events(
+            total_count = source.count_events(
                 user_id=search_request.user_id,
                 event_type=search_request.event_type,
                 start_time=search_request.start_time,
@@ -283,6 +311,11 @@ def search_events():
             
             return jsonify(response_data)
             
+        except QueryTimeout as e:
+            return jsonify({
+                'error': str(e),
+                'correlation_id': get_correlation_id()
+            }), 504
         except Exception as e:
             logger.error(
                 "Unexpected error in search_events",
@@ -303,49 +336,49 @@ def get_dashboard_metrics():
     """
     with PerformanceProfiler("get_dashboard_metrics"):
         try:
-            # Check cache first
-            cache_key = "dashboard:metrics:current"
-            cached_metrics = cache_service.get_json(cache_key)
-            
-            if cached_metrics:
-                cached_metrics['correlation_id'] = get_correlation_id()
-                cached_metrics['from_cache'] = True
-                return jsonify(cached_metrics)
-            
-            # Get current time for calculations
             now = datetime.now(timezone.utc)
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            last_hour = now - timedelta(hours=1)
-            last_24h = now - timedelta(hours=24)
             
-            # Get metrics from various sources
-            total_users = cache_service.get_counter("users:total") or 0
-            active_sessions = cache_service.get_counter("sessions:active") or 0
-            
-            # Get event counts
-            events_last_hour = dynamodb_service.count_events(start_time=last_hour)
-            events_last_24h = dynamodb_service.count_events(start_time=last_24h)
-            total_events = dynamodb_service.count_events()
+            # Totals from the stored aggregations (several queries): cached for 2 minutes
+            totals = cache_service.get_json("dashboard:metrics:totals")
+            if totals is None:
+                engine = RollupEngine(dynamodb_service, store_missing=False)
+                to_date = engine.state_to_date(now)
+                last_24h = engine.state_for_range(now - timedelta(hours=24), now)
+                totals = {
+                    'total_events': to_date.total_events,
+                    'total_revenue': str(to_date.total_revenue),
+                    'revenue_last_24h': str(last_24h.total_revenue),
+                }
+                cache_service.set_json("dashboard:metrics:totals", totals, ttl=120)
             
-            # Get revenue data
-            revenue_last_24h = dynamodb_service.get_revenue_sum(start_time=last_24h)
-            total_revenue = dynamodb_service.get_revenue_sum()
+            # Rolling windows from the Redis counters, read at request time
+            total_users = realtime_uniques.rolling('users', '7d', now=now)
+            active_sessions = session_store.count_active(now=now)
+            events_last_minute = event_counter.total('1m', now=now)
+            events_last_hour = event_counter.total('1h', now=now)
+            events_last_24h = event_counter.total('24h', now=now)
             
-            # Get conversion funnel data
-            funnel_data = dynamodb_service.get_conversion_funnel(start_time=today_start)
+            # Get conversion funnel data (sessions reaching each step today, from step counters)
+            funnel_steps = funnel_engine.get_conversion_funnel('checkout', start_time=today_start, end_time=now)['steps']
+            step_sessions = {step['event_type']: step['sessions'] for step in funnel_steps}
+            funnel_data = {
+                'page_views': step_sessions.get('page_view', 0),
+                'add_to_carts': step_sessions.get('add_to_cart', 0),
+                'purchases': step_sessions.get('purchase', 0),
+            }
             
             # Create dashboard metrics using Pydantic model
             metrics = DashboardMetrics(
                 total_users=total_users,
                 active_sessions=active_sessions,
-                total_revenue=total_revenue,
-                total_events=total_events,
+                total_revenue=totals['total_revenue'],
+                total_events=totals['total_events'],
+                events_last_minute=events_last_minute,
                 events_last_hour=events_last_hour,
                 events_last_24h=events_last_24h,
-                revenue_last_24h=revenue_last_24h,
+                revenue_last_24h=totals['revenue_last_24h'],
                 new_users_today=funnel_data.get('new_users', 0),
-                avg_response_time=cache_service.get_counter("performance:avg_response_time") or 0.0,
-                error_rate=cache_service.get_counter("performance:error_rate") or 0.0,
                 page_views=funnel_data.get('page_views', 0),
                 add_to_carts=funnel_data.get('add_to_carts', 0),
                 purchases=funnel_data.get('purchases', 0)
@@ -353,15 +386,11 @@ def get_dashboard_metrics():
             
             response_data = metrics.model_dump(mode='json')
             response_data['correlation_id'] = get_correlation_id()
-            response_data['from_cache'] = False
-            
-            # Cache for 2 minutes
-            cache_service.set_json(cache_key, response_data, ttl=120)
             
             logger.info(
                 "Dashboard metrics generated",
                 **add_structured_context(
-                    total_events=total_events,
+                    total_events=metrics.total_events,
                     conversion_rate=metrics.conversion_rate,
                     avg_revenue_per_user=metrics.avg_revenue_per_user
                 )
@@ -380,6 +409,547 @@ def get_dashboard_metrics():
                 'correlation_id': get_correlation_id()
             }), 500
 
+@analytics_bp.route('/dashboard/uniques', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_rolling_uniques():
+    """
+    Get rolling distinct users and sessions (1h/24h/7d) from Redis HyperLogLogs
+    """
+    with PerformanceProfiler("get_rolling_uniques"):
+        try:
+            response_data = {
+                'uniques': realtime_uniques.rolling_summary(),
+                'windows': {
+                    window: {'bucket': period, 'buckets': count}
+                    for window, (period, count) in RealtimeUniques.WINDOWS.items()
+                },
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'correlation_id': get_correlation_id()
+            }
+            
+            return jsonify(response_data)
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in get_rolling_uniques",
+                **add_structured_context(error=str(e)),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/realtime/events/timeseries', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_event_timeseries():
+    """
+    Get per-minute processed event counts for the last N minutes
+    """
+    with PerformanceProfiler("get_event_timeseries"):
+        try:
+            try:
+                minutes = int(request.args.get('minutes', 60))
+            except ValueError:
+                return jsonify({
+                    'error': 'minutes must be an integer',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            if not 1 <= minutes <= SlidingWindowCounter.MAX_SERIES_MINUTES:
+                return jsonify({
+                    'error': f'minutes must be between 1 and {SlidingWindowCounter.MAX_SERIES_MINUTES}',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            now = datetime.now(timezone.utc)
+            return jsonify({
+                'resolution': 'minute',
+                'minutes': minutes,
+                'series': event_counter.series(minutes, now=now),
+                'windows': {window: event_counter.total(window, now=now) for window in SlidingWindowCounter.WINDOWS},
+                'timestamp': now.isoformat(),
+                'correlation_id': get_correlation_id()
+            })
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in get_event_timeseries",
+                **add_structured_context(error=str(e)),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/funnels/<name>', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_funnel(name: str):
+    """
+    Get step counts, conversion and drop-off of a configured funnel
+    """
+    with PerformanceProfiler("get_funnel"):
+        try:
+            if name not in funnel_engine.funnels:
+                return jsonify({
+                    'error': f'Unknown funnel. Must be one of: {list(funnel_engine.funnels)}',
+                    'correlation_id': get_correlation_id()
+                }), 404
+            
+            period = request.args.get('period', 'day')
+            if period not in FUNNEL_PERIODS:
+                return jsonify({
+                    'error': f'Invalid period. Must be one of: {list(FUNNEL_PERIODS)}',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            try:
+                end_time = request.args.get('end_time')
+                end_time = datetime.fromisoformat(end_time) if end_time else datetime.now(timezone.utc)
+                start_time = request.args.get('start_time')
+                start_time = datetime.fromisoformat(start_time) if start_time else end_time - timedelta(days=1)
+                if start_time.tzinfo is None:
+                    start_time = start_time.replace(tzinfo=timezone.utc)
+                if end_time.tzinfo is None:
+                    end_time = end_time.replace(tzinfo=timezone.utc)
+                
+                funnel = funnel_engine.get_conversion_funnel(
+                    name, start_time=start_time, end_time=end_time, period=period
+                )
+            except ValueError as e:
+                return jsonify({
+                    'error': str(e),
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            funnel['definition'] = funnel_engine.funnels[name].model_dump()
+            funnel['correlation_id'] = get_correlation_id()
+            return jsonify(funnel)
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in get_funnel",
+                **add_structured_context(error=str(e), funnel=name),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/realtime/top/<dimension>', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_realtime_top(dimension: str):
+    """
+    Get realtime top-k products, categories or countries over a rolling window
+    """
+    with PerformanceProfiler("get_realtime_top"):
+        try:
+            if dimension not in RealtimeTopK.DIMENSIONS:
+                return jsonify({
+                    'error': f'Invalid dimension. Must be one of: {list(RealtimeTopK.DIMENSIONS)}',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            window = request.args.get('window', '1h')
+            if window not in RealtimeTopK.WINDOWS:
+                return jsonify({
+                    'error': f'Invalid window. Must be one of: {list(RealtimeTopK.WINDOWS)}',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            try:
+                k = min(max(int(request.args.get('k', 10)), 1), 100)
+            except ValueError:
+                return jsonify({
+                    'error': 'k must be an integer',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            return jsonify({
+                'dimension': dimension,
+                'window': window,
+                'k': k,
+                'items': realtime_top_k.top(dimension, window, k),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'correlation_id': get_correlation_id()
+            })
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in get_realtime_top",
+                **add_structured_context(error=str(e), dimension=dimension),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/quantiles', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_quantiles():
+    """
+    Get p50/p90/p99 of revenue and api_call latency for any time range,
+    merged from the quantile sketches of stored aggregations
+    """
+    with PerformanceProfiler("get_quantiles"):
+        try:
+            metrics = request.args.getlist('metric') or list(QUANTILE_METRICS)
+            invalid = [metric for metric in metrics if metric not in QUANTILE_METRICS]
+            if invalid:
+                return jsonify({
+                    'error': f'Invalid metric. Must be one of: {list(QUANTILE_METRICS)}',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            try:
+                end_time = request.args.get('end_time')
+                end_time = datetime.fromisoformat(end_time) if end_time else datetime.now(timezone.utc)
+                start_time = request.args.get('start_time')
+                start_time = datetime.fromisoformat(start_time) if start_time else end_time - timedelta(hours=24)
+            except ValueError:
+                return jsonify({
+                    'error': 'start_time and end_time must be ISO 8601 timestamps',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            if start_time.tzinfo is None:
+                start_time = start_time.replace(tzinfo=timezone.utc)
+            if end_time.tzinfo is None:
+                end_time = end_time.replace(tzinfo=timezone.utc)
+            if start_time >= end_time:
+                return jsonify({
+                    'error': 'start_time must be before end_time',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            engine = RollupEngine(dynamodb_service, store_missing=False)
+            quantiles = engine.state_for_range(start_time, end_time).quantiles()
+            
+            return jsonify({
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+                'quantiles': {metric: quantiles[metric] for metric in metrics},
+                'aggregations_read': engine.stats['aggregations_read'],
+                'correlation_id': get_correlation_id()
+            })
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in get_quantiles",
+                **add_structured_context(error=str(e)),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/query', methods=['POST'])
+@correlation_id_required
+@log_function_call()
+def query_local_store():
+    """
+    Ad-hoc counts and group-bys over recent events, answered by the embedded
+    local store with a per-query timeout and row limit
+    """
+    with PerformanceProfiler("query_local_store"):
+        try:
+            local_store = get_local_store()
+            if local_store is None:
+                return jsonify({
+                    'error': 'Local query store is not enabled',
+                    'correlation_id': get_correlation_id()
+                }), 503
+            
+            data = request.get_json(silent=True) or {}
+            limit = data.get('limit', 100)
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+                return jsonify({
+                    'error': 'limit must be a positive integer',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            try:
+                start_time = data.get('start_time')
+                start_time = datetime.fromisoformat(start_time) if start_time else None
+                end_time = data.get('end_time')
+                end_time = datetime.fromisoformat(end_time) if end_time else None
+                result = local_store.group_by(
+                    dimensions=data.get('dimensions') or [],
+                    metrics=data.get('metrics') or ['events'],
+                    filters=data.get('filters'),
+                    start_time=start_time,
+                    end_time=end_time,
+                    order_by=data.get('order_by'),
+                    limit=limit,
+                    timeout_ms=int(data['timeout_ms']) if data.get('timeout_ms') else None
+                )
+            except (TypeError, ValueError) as e:
+                return jsonify({
+                    'error': 'Invalid query',
+                    'details': str(e),
+                    'correlation_id': get_correlation_id()
+                }), 400
+            except QueryTimeout as e:
+                return jsonify({
+                    'error': str(e),
+                    'correlation_id': get_correlation_id()
+                }), 504
+            
+            result['retention_days'] = local_store.retention_days
+            result['correlation_id'] = get_correlation_id()
+            return jsonify(result)
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in query_local_store",
+                **add_structured_context(error=str(e)),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/events/export', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def download_event_export():
+    """
+    Stream raw events of a time range as one Parquet file (format=parquet)
+    or Arrow IPC stream (format=arrow), written and sent one row group at a
+    time so memory stays bounded regardless of the range size
+    """
+    with PerformanceProfiler("download_event_export"):
+        try:
+            fmt = request.args.get('format', 'parquet')
+            if fmt not in ('parquet', 'arrow'):
+                return jsonify({
+                    'error': "Invalid format. Must be one of: ['parquet', 'arrow']",
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            try:
+                start_time = datetime.fromisoformat(request.args['start_time'])
+                end_time = datetime.fromisoformat(request.args['end_time'])
+            except (KeyError, ValueError):
+                return jsonify({
+                    'error': 'start_time and end_time are required ISO 8601 timestamps',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            if start_time.tzinfo is None:
+                start_time = start_time.replace(tzinfo=timezone.utc)
+            if end_time.tzinfo is None:
+                end_time = end_time.replace(tzinfo=timezone.utc)
+            if start_time >= end_time:
+                return jsonify({
+                    'error': 'start_time must be before end_time',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            if end_time - start_time > timedelta(days=Config.EXPORT_MAX_DOWNLOAD_DAYS):
+                return jsonify({
+                    'error': 'Range too large for a download; use POST /events/export for a batch export',
+                    'correlation_id': get_correlation_id()
+                }), 400
+            
+            from src.services.event_export import stream_events
+            
+            event_types = request.args.getlist('event_type')
+            events = dynamodb_service.iter_events_by_timerange(start_time, end_time)
+            if event_types:
+                events = (event for event in events if event.get('event_type') in event_types)
+            
+            extension = 'parquet' if fmt == 'parquet' else 'arrows'
+            filename = f"events-{start_time:%Y%m%dT%H%M%S}-{end_time:%Y%m%dT%H%M%S}.{extension}"
+            logger.info(
+                "Event export download started",
+                **add_structured_context(format=fmt, start_time=start_time.isoformat(),
+                                         end_time=end_time.isoformat(), event_types=event_types)
+            )
+            return Response(
+                stream_with_context(stream_events(events, fmt)),
+                mimetype='application/vnd.apache.parquet' if fmt == 'parquet'
+                else 'application/vnd.apache.arrow.stream',
+                headers={
+                    'Content-Disposition': f'attachment; filename="{filename}"',
+                    'X-Correlation-ID': get_correlation_id() or '',
+                }
+            )
+            
+        except Exception as e:
+            logger.error(
+                "Unexpected error in download_event_export",
+                **add_structured_context(error=str(e)),
+                exc_info=True
+            )
+            return jsonify({
+                'error': 'Internal server error',
+                'correlation_id': get_correlation_id()
+            }), 500
+
+@analytics_bp.route('/events/export', methods=['POST'])
+@correlation_id_required
+@log_function_call()
+def trigger_event_export():
+    """
+    Start a batch export of a time range to Parquet files partitioned by
+    event_day and event_type under EXPORT_OUTPUT_DIR
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            start_time = datetime.fromisoformat(data['start_time'])
+            end_time = datetime.fromisoformat(data['end_time'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'error': 'start_time and end_time are required ISO 8601 timestamps',
+                'correlation_id': get_correlation_id()
+            }), 400
+        if start_time >= end_time:
+            return jsonify({
+                'error': 'start_time must be before end_time',
+                'correlation_id': get_correlation_id()
+            }), 400
+        
+        event_types = data.get('event_types')
+        task_id = task_manager.export_events_async(start_time.isoformat(), end_time.isoformat(), event_types)
+        
+        logger.info(
+            "Event export triggered",
+            **add_structured_context(
+                start_time=start_time.isoformat(),
+                end_time=end_time.isoformat(),
+                task_id=task_id
+            )
+        )
+        
+        return jsonify({
+            'success': True,
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'event_types': event_types,
+            'task_id': task_id,
+            'correlation_id': get_correlation_id()
+        }), 202
+        
+    except Exception as e:
+        logger.error(
+            "Unexpected error in trigger_event_export",
+            **add_structured_context(error=str(e)),
+            exc_info=True
+        )
+        return jsonify({
+            'error': 'Internal server error',
+            'correlation_id': get_correlation_id()
+        }), 500
+
+@analytics_bp.route('/archive/segments', methods=['GET'])
+@correlation_id_required
+@log_function_call()
+def get_archive_segments():
+    """
+    List archived segments covering a time range (from the archive manifest)
+    """
+    try:
+        try:
+            start_time = datetime.fromisoformat(request.args['start_time'])
+            end_time = datetime.fromisoformat(request.args['end_time'])
+        except (KeyError, ValueError):
+            return jsonify({
+                'error': 'start_time and end_time are required ISO 8601 timestamps',
+                'correlation_id': get_correlation_id()
+            }), 400
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        
+        from src.services.archive import ArchiveManifest, get_archive_storage
+        
+        segments = ArchiveManifest(get_archive_storage()).segments_for(start_time, end_time)
+        return jsonify({
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'segments': segments,
+            'events': sum(segment['events'] for segment in segments),
+            'correlation_id': get_correlation_id()
+        })
+        
+    except Exception as e:
+        logger.error(
+            "Unexpected error in get_archive_segments",
+            **add_structured_context(error=str(e)),
+            exc_info=True
+        )
+        return jsonify({
+            'error': 'Internal server error',
+            'correlation_id': get_correlation_id()
+        }), 500
+
+@analytics_bp.route('/archive/rehydrate', methods=['POST'])
+@correlation_id_required
+@log_function_call()
+def trigger_archive_rehydration():
+    """
+    Restore archived events of a time range into the events table
+    (temporarily: restored events expire after REHYDRATE_TTL_DAYS)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            start_time = datetime.fromisoformat(data['start_time'])
+            end_time = datetime.fromisoformat(data['end_time'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'error': 'start_time and end_time are required ISO 8601 timestamps',
+                'correlation_id': get_correlation_id()
+            }), 400
+        if start_time >= end_time:
+            return jsonify({
+                'error': 'start_time must be before end_time',
+                'correlation_id': get_correlation_id()
+            }), 400
+        
+        event_types = data.get('event_types')
+        task_id = task_manager.rehydrate_events_async(start_time.isoformat(), end_time.isoformat(), event_types)
+        
+        logger.info(
+            "Archive rehydration triggered",
+            **add_structured_context(
+                start_time=start_time.isoformat(),
+                end_time=end_time.isoformat(),
+                task_id=task_id
+            )
+        )
+        
+        return jsonify({
+            'success': True,
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'event_types': event_types,
+            'task_id': task_id,
+            'correlation_id': get_correlation_id()
+        }), 202
+        
+    except Exception as e:
+        logger.error(
+            "Unexpected error in trigger_archive_rehydration",
+            **add_structured_context(error=str(e)),
+            exc_info=True
+        )
+        return jsonify({
+            'error': 'Internal server error',
+            'correlation_id': get_correlation_id()
+        }), 500
+
 @analytics_bp.route('/aggregations/<period>', methods=['GET'])
 @correlation_id_required
 @log_function_call()
@@ -493,7 +1063,7 @@ def trigger_aggregation_generation(period: str):
     """
     try:
         # Validate period
-        valid_periods = ['hour', 'day', 'week', 'month']
+        valid_periods = ['minute', 'hour', 'day', 'week', 'month']
         if period not in valid_periods:
             return jsonify({
                 'error': f'Invalid period. Must be one of: {valid_periods}',
@@ -4,20 +4,20 @@ Provides health status endpoints for Analytics Service
 """
 
 import time
-import psutil
 import structlog
 import redis
-import boto3
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify
 from src.models.analytics_models import HealthStatus
-from src.config.settings import Config
+from src.config.settings import get_settings
+from src.services.aws_clients import get_aws_clients
+from src.services.registry import get_services
 
 logger = structlog.get_logger(__name__)
 
 health_bp = Blueprint('health', __name__)
 
 # Initialize settings at module level
-settings = Config()
+settings = get_settings()
 
 
 @health_bp.route('/health', methods=['GET'])
@@ -27,6 +27,7 @@ def health_check():
         start_time = time.time()
         
         # Get basic system metrics
+        import psutil
         cpu_usage = psutil.cpu_percent(interval=0.1)
         memory = psutil.virtual_memory()
         
@@ -83,6 +84,7 @@ def detailed_health_check():
         dependencies = _check_dependencies_detailed()
         
         # Get detailed system metrics
+        import psutil
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
@@ -135,13 +137,24 @@ def detailed_health_check():
 def readiness_check():
     """Readiness probe for Kubernetes"""
     try:
+        # Not ready before the warm-up has created services and primed connections
+        services = get_services()
+        if not services.ready:
+            # Kick it off if no server hook did (e.g. the development server)
+            services.start_warm_up()
+            return jsonify({
+                "status": "not ready",
+                "warm_up": services.status()
+            }), 503
+        
         # Check if service is ready to serve traffic
         dependencies = _check_critical_dependencies()
         
         if all(status == "healthy" for status in dependencies.values()):
             return jsonify({
                 "status": "ready",
-                "dependencies": dependencies
+                "dependencies": dependencies,
+                "warm_up": services.warm_up_report
             }), 200
         else:
             return jsonify({
@@ -186,8 +199,7 @@ def _check_dependencies():
         logger.info("Attempting DynamoDB connection", endpoint=settings.AWS_DYNAMODB_ENDPOINT)
         
         try:
-            dynamodb_config = settings.get_dynamodb_config()
-            dynamodb = boto3.client('dynamodb', **dynamodb_config)
+            dynamodb = get_aws_clients().client('dynamodb')
             
             # Try a simple operation
             result = dynamodb.list_tables()
@@ -219,25 +231,20 @@ def _check_dependencies():
 def _check_dependencies_detailed():
     """Check all service dependencies with detailed status"""
     dependencies = _check_dependencies()
+    clients = get_aws_clients()
     
     # Add more detailed checks
     try:
         # Check SNS
-        if hasattr(current_app, 'aws_services'):
-            current_app.aws_services.sns.list_topics()
-            dependencies['sns'] = "healthy"
-        else:
-            dependencies['sns'] = "unknown"
+        clients.client('sns').list_topics()
+        dependencies['sns'] = "healthy"
     except Exception:
         dependencies['sns'] = "unhealthy"
     
     try:
         # Check SQS
-        if hasattr(current_app, 'aws_services'):
-            current_app.aws_services.sqs.list_queues()
-            dependencies['sqs'] = "healthy"
-        else:
-            dependencies['sqs'] = "unknown"
+        clients.client('sqs').list_queues()
+        dependencies['sqs'] = "healthy"
     except Exception:
         dependencies['sqs'] = "unhealthy"
     
@@ -250,14 +257,11 @@ def _check_critical_dependencies():
     
     try:
         # DynamoDB is critical
-        if hasattr(current_app, 'aws_services'):
-            current_app.aws_services.dynamodb.meta.client.describe_table(
-                TableName='analytics-events'
-            )
-            dependencies['dynamodb'] = "healthy"
-        else:
-            dependencies['dynamodb'] = "unknown"
+        get_aws_clients().client('dynamodb').describe_table(
+            TableName=settings.ANALYTICS_EVENTS_TABLE
+        )
+        dependencies['dynamodb'] = "healthy"
     except Exception:
         dependencies['dynamodb'] = "unhealthy"
     
-    return dependencies 
\ No newline at end of file
+    return dependencies
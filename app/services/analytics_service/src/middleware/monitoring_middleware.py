@@ -6,7 +6,7 @@ from functools import wraps
 import structlog
 from flask import Flask, request, Response, g, has_request_context
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
-import psutil
+import os
 import threading
 
 # Prometheus metrics
@@ -58,8 +58,11 @@ class RequestMonitoringMiddleware:
     def __init__(self, app: Flask, service_name: str = "analytics-service"):
         self.app = app
         self.service_name = service_name
+        # System metrics are collected by a thread per serving process, started
+        # on its first request (threads do not survive a --preload fork)
+        self._monitoring_pid = None
+        self._monitoring_lock = threading.Lock()
         self.setup_middleware()
-        self.start_system_monitoring()
     
     def setup_middleware(self):
         """Setup Flask middleware hooks"""
@@ -70,6 +73,11 @@ class RequestMonitoringMiddleware:
     
     def before_request(self):
         """Called before each request"""
+        if self._monitoring_pid != os.getpid():
+            with self._monitoring_lock:
+                if self._monitoring_pid != os.getpid():
+                    self.start_system_monitoring()
+        
         # Generate correlation ID
         correlation_id = request.headers.get('X-Correlation-ID', str(uuid.uuid4()))
         g.correlation_id = correlation_id
@@ -186,6 +194,9 @@ class RequestMonitoringMiddleware:
     
     def start_system_monitoring(self):
         """Start background thread for system metrics collection"""
+        import psutil
+        self._monitoring_pid = os.getpid()
+        
         def collect_system_metrics():
             while True:
                 try:
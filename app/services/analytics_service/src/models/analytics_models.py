@@ -163,8 +163,15 @@ class AnalyticsAggregation(BaseModel):
     # Computed aggregations
     conversion_metrics: Dict[str, float] = Field(default_factory=dict)
     top_products: List[Dict[str, Any]] = Field(default_factory=list)
+    top_categories: List[Dict[str, Any]] = Field(default_factory=list)
     geo_distribution: Dict[str, int] = Field(default_factory=dict)
-    
+    event_type_breakdown: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    session_metrics: Dict[str, float] = Field(default_factory=dict, description="Session totals, avg depth and bounce rate")
+    quantiles: Dict[str, Dict[str, Optional[float]]] = Field(default_factory=dict, description="p50/p90/p99 of revenue and API latency")
+
+    # Serialized mergeable sketches used by hierarchical rollups
+    sketches: Dict[str, str] = Field(default_factory=dict, description="Mergeable sketches (e.g. HyperLogLog uniques)")
+
     @model_validator(mode='after')
     def validate_period_bounds(self) -> Self:
         """Validate that period_end > period_start"""
@@ -186,6 +193,35 @@ class AnalyticsAggregation(BaseModel):
             return self.total_events / self.period_duration_hours
         return 0.0
 
+class FunnelDefinition(BaseModel):
+    """Configured conversion funnel: ordered steps with per-step time windows"""
+    model_config = ConfigDict(validate_assignment=True)
+    
+    name: str = Field(..., min_length=1, max_length=50, pattern=r'^[a-zA-Z0-9_-]+$')
+    steps: List[EventType] = Field(..., min_length=2, max_length=10)
+    step_window_seconds: Union[int, List[int]] = Field(
+        1800, description="Max seconds between consecutive steps (one value or one per transition)"
+    )
+    
+    @model_validator(mode='after')
+    def validate_windows(self) -> Self:
+        """Normalize step windows to one positive value per transition"""
+        windows = self.step_window_seconds
+        if isinstance(windows, int):
+            windows = [windows] * (len(self.steps) - 1)
+        if len(windows) != len(self.steps) - 1:
+            raise ValueError("step_window_seconds needs one value per step transition")
+        if any(w <= 0 for w in windows):
+            raise ValueError("Step windows must be positive")
+        object.__setattr__(self, 'step_window_seconds', windows)
+        return self
+    
+    @computed_field
+    @property
+    def max_duration_seconds(self) -> int:
+        """Longest time a session can take to complete the funnel"""
+        return sum(self.step_window_seconds)
+
 class DashboardMetrics(BaseModel):
     """Enhanced dashboard metrics with computed fields"""
     model_config = ConfigDict(validate_assignment=True)
@@ -197,6 +233,7 @@ class DashboardMetrics(BaseModel):
     total_events: int = Field(ge=0)
     
     # Time-based metrics  
+    events_last_minute: int = Field(ge=0, default=0)
     events_last_hour: int = Field(ge=0, default=0)
     events_last_24h: int = Field(ge=0, default=0) 
     revenue_last_24h: CurrencyValue = Field(default=Decimal('0'))
@@ -0,0 +1,632 @@
+"""
+Aggregation Engine
+Mergeable aggregation state and hierarchical rollups (minute -> hour -> day -> week/month)
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+
+from src.config.settings import Config
+from src.models.analytics_models import AnalyticsAggregation
+from .sketches import DDSketch, HyperLogLog, SpaceSaving
+
+logger = structlog.get_logger(__name__)
+
+PERIODS = ('minute', 'hour', 'day', 'week', 'month')
+
+# Which stored lower-level aggregation each period is rolled up from
+ROLLUP_SOURCE = {
+    'hour': 'minute',
+    'day': 'hour',
+    'week': 'day',
+    'month': 'day',
+}
+
+# Event types for which per-type unique users/sessions are tracked
+TRACKED_EVENT_TYPES = ('page_view', 'product_view', 'purchase', 'add_to_cart')
+
+# Heavy-hitter summaries: dimension -> (event field, Space-Saving capacity)
+HEAVY_HITTER_DIMENSIONS = {
+    'products': ('product_id', 200),
+    'categories': ('category', 100),
+    'countries': ('country', 250),
+}
+
+# Number of heavy hitters materialized on each aggregation
+TOP_K = 20
+
+# Quantile summaries (DDSketch) kept per aggregation
+QUANTILE_METRICS = ('revenue', 'latency_ms')
+
+# Reported percentiles
+QUANTILES = (0.5, 0.9, 0.99)
+
+# api_call properties carrying the call latency in milliseconds (first present wins)
+LATENCY_PROPERTY_KEYS = ('latency_ms', 'duration_ms', 'response_time_ms')
+
+# Session totals (from the sessionizer) carried on each aggregation; sessions
+# count towards the period in which they were closed
+SESSION_TOTAL_FIELDS = ('sessions_started', 'sessions', 'total_duration', 'total_depth', 'bounces')
+
+# Event attributes the aggregation pass needs (projected when streaming from DynamoDB)
+AGGREGATION_EVENT_FIELDS = (
+    'event_type', 'user_id', 'session_id', 'revenue', 'product_id', 'category', 'country',
+    'properties'
+)
+
+CENT = Decimal('0.01')
+
+# Lower bound of "all stored aggregations" queries
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def period_bounds(period: str, target: datetime) -> Tuple[datetime, datetime]:
+    """Return the [start, end) boundaries of the period containing target"""
+    if target.tzinfo is None:
+        target = target.replace(tzinfo=timezone.utc)
+
+    if period == 'minute':
+        start = target.replace(second=0, microsecond=0)
+        return start, start + timedelta(minutes=1)
+    if period == 'hour':
+        start = target.replace(minute=0, second=0, microsecond=0)
+        return start, start + timedelta(hours=1)
+    if period == 'day':
+        start = target.replace(hour=0, minute=0, second=0, microsecond=0)
+        return start, start + timedelta(days=1)
+    if period == 'week':
+        start = target.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=target.weekday())
+        return start, start + timedelta(weeks=1)
+    if period == 'month':
+        start = target.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        if start.month < 12:
+            end = start.replace(month=start.month + 1)
+        else:
+            end = start.replace(year=start.year + 1, month=1)
+        return start, end
+    raise ValueError(f"Unknown aggregation period: {period}")
+
+
+def previous_period_start(period: str, now: datetime) -> datetime:
+    """Start of the most recent fully closed period before now"""
+    current_start, _ = period_bounds(period, now)
+    return period_bounds(period, current_start - timedelta(microseconds=1))[0]
+
+
+def iter_period_starts(period: str, start: datetime, end: datetime) -> Iterator[datetime]:
+    """Yield the start of every `period` bucket within [start, end)"""
+    cursor, _ = period_bounds(period, start)
+    while cursor < end:
+        yield cursor
+        cursor = period_bounds(period, cursor)[1]
+
+
+def range_segments(start: datetime, end: datetime,
+                   periods: Tuple[str, ...] = ('day', 'hour', 'minute')) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Cover [start, end) with the fewest stored aggregations: whole days in
+    the middle, hours at the edges and minutes for the remainder. Returns
+    (period, segment_start, segment_end) tuples in time order.
+    """
+    if start >= end:
+        return []
+    period, finer = periods[0], periods[1:]
+    if not finer:
+        return [(period, period_bounds(period, start)[0], end)]
+
+    first_start, first_end = period_bounds(period, start)
+    inner_start = start if first_start == start else first_end
+    inner_end = period_bounds(period, end)[0]
+    if inner_start >= inner_end:
+        return range_segments(start, end, finer)
+    return (range_segments(start, inner_start, finer)
+            + [(period, inner_start, inner_end)]
+            + range_segments(inner_end, end, finer))
+
+
+def contiguous_runs(period: str, starts: List[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Merge sorted `period` bucket starts into contiguous [start, end) runs"""
+    runs: List[Tuple[datetime, datetime]] = []
+    for bucket_start in starts:
+        bucket_end = period_bounds(period, bucket_start)[1]
+        if runs and runs[-1][1] == bucket_start:
+            runs[-1] = (runs[-1][0], bucket_end)
+        else:
+            runs.append((bucket_start, bucket_end))
+    return runs
+
+
+def event_latency(event: Dict[str, Any]) -> Optional[float]:
+    """Latency (ms) reported by an api_call event, None for other events"""
+    if event.get('event_type') != 'api_call':
+        return None
+    properties = event.get('properties') or {}
+    for key in LATENCY_PROPERTY_KEYS:
+        value = properties.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _to_decimal(value: Any) -> Decimal:
+    """Convert stored numeric values (float, str, Decimal) to exact cents"""
+    if value is None:
+        return Decimal('0')
+    return Decimal(str(value)).quantize(CENT)
+
+
+class AggregateState:
+    """
+    Mergeable running statistics for one aggregation period
+
+    Only statistics that can be combined without the raw events are kept:
+    counts and revenue sums are added, unique users/sessions are HyperLogLog
+    sketches that merge register-wise, top products/categories/countries
+    are bounded Space-Saving summaries, and revenue and API latency
+    distributions are DDSketches that merge bucket-wise.
+    """
+
+    def __init__(self):
+        self.total_events = 0
+        self.total_revenue = Decimal('0')
+        self.users = HyperLogLog()
+        self.sessions = HyperLogLog()
+        self.event_counts: Dict[str, int] = {}
+        self.event_revenue: Dict[str, Decimal] = {}
+        self.type_users: Dict[str, HyperLogLog] = {}
+        self.type_sessions: Dict[str, HyperLogLog] = {}
+        self.heavy_hitters: Dict[str, SpaceSaving] = {
+            dimension: SpaceSaving(capacity) for dimension, (_, capacity) in HEAVY_HITTER_DIMENSIONS.items()
+        }
+        self.distributions: Dict[str, DDSketch] = {metric: DDSketch() for metric in QUANTILE_METRICS}
+        self.session_totals: Dict[str, int] = {field: 0 for field in SESSION_TOTAL_FIELDS}
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        """Account for a single raw event"""
+        event_type = event.get('event_type') or 'custom'
+        user_id = event.get('user_id')
+        session_id = event.get('session_id')
+        revenue = event.get('revenue')
+
+        self.total_events += 1
+        self.event_counts[event_type] = self.event_counts.get(event_type, 0) + 1
+        self.users.add(user_id)
+        self.sessions.add(session_id)
+
+        if revenue:
+            amount = _to_decimal(revenue)
+            self.total_revenue += amount
+            self.event_revenue[event_type] = self.event_revenue.get(event_type, Decimal('0')) + amount
+            self.distributions['revenue'].add(float(amount))
+
+        latency = event_latency(event)
+        if latency is not None:
+            self.distributions['latency_ms'].add(latency)
+
+        if event_type in TRACKED_EVENT_TYPES:
+            self.type_users.setdefault(event_type, HyperLogLog()).add(user_id)
+            self.type_sessions.setdefault(event_type, HyperLogLog()).add(session_id)
+
+        for dimension, (field, _) in HEAVY_HITTER_DIMENSIONS.items():
+            self.heavy_hitters[dimension].offer(event.get(field))
+
+    def merge(self, other: 'AggregateState') -> 'AggregateState':
+        """Fold another state into this one (in place)"""
+        self.total_events += other.total_events
+        self.total_revenue += other.total_revenue
+        self.users.merge(other.users)
+        self.sessions.merge(other.sessions)
+
+        for event_type, count in other.event_counts.items():
+            self.event_counts[event_type] = self.event_counts.get(event_type, 0) + count
+        for event_type, amount in other.event_revenue.items():
+            self.event_revenue[event_type] = self.event_revenue.get(event_type, Decimal('0')) + amount
+        for event_type, sketch in other.type_users.items():
+            self.type_users.setdefault(event_type, HyperLogLog()).merge(sketch)
+        for event_type, sketch in other.type_sessions.items():
+            self.type_sessions.setdefault(event_type, HyperLogLog()).merge(sketch)
+        for dimension, summary in other.heavy_hitters.items():
+            self.heavy_hitters[dimension].merge(summary)
+        for metric, sketch in other.distributions.items():
+            self.distributions[metric].merge(sketch)
+        self.add_session_totals(other.session_totals)
+        return self
+
+    def add_session_totals(self, totals: Dict[str, Any]) -> None:
+        """Add sessionizer totals (sessions started/closed, duration, depth, bounces)"""
+        for field in SESSION_TOTAL_FIELDS:
+            self.session_totals[field] += int(totals.get(field, 0) or 0)
+
+    def avg_session_duration(self) -> Optional[float]:
+        sessions = self.session_totals['sessions']
+        return self.session_totals['total_duration'] / sessions if sessions else None
+
+    def session_metrics(self) -> Dict[str, float]:
+        """Session totals plus average depth and bounce rate of closed sessions"""
+        metrics = dict(self.session_totals)
+        sessions = metrics['sessions']
+        metrics['avg_depth'] = metrics['total_depth'] / sessions if sessions else 0.0
+        metrics['bounce_rate'] = metrics['bounces'] / sessions * 100 if sessions else 0.0
+        return metrics
+
+    def top_items(self, dimension: str, k: int = TOP_K) -> List[Dict[str, Any]]:
+        """Top-k heavy hitters of a dimension with their Space-Saving error bound"""
+        field = HEAVY_HITTER_DIMENSIONS[dimension][0]
+        return [
+            {field: item, 'count': count, 'error': error}
+            for item, count, error in self.heavy_hitters[dimension].top(k)
+        ]
+
+    def event_type_breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Per event type totals, as exposed on the aggregation"""
+        breakdown = {}
+        for event_type, count in self.event_counts.items():
+            stats = {'total_events': count}
+            if event_type in self.event_revenue:
+                stats['total_revenue'] = float(self.event_revenue[event_type])
+            if event_type in self.type_users:
+                stats['unique_users'] = self.type_users[event_type].count()
+                stats['unique_sessions'] = self.type_sessions[event_type].count()
+            breakdown[event_type] = stats
+        return breakdown
+
+    def quantiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50/p90/p99 (plus count, mean, min, max) of each tracked distribution"""
+        return {metric: sketch.summary(QUANTILES) for metric, sketch in self.distributions.items()}
+
+    def conversion_metrics(self) -> Dict[str, float]:
+        """Funnel ratios derived from the (exactly merged) event counts"""
+        page_views = self.event_counts.get('page_view', 0)
+        add_to_carts = self.event_counts.get('add_to_cart', 0)
+        purchases = self.event_counts.get('purchase', 0)
+        return {
+            'view_to_cart_rate': (add_to_carts / page_views * 100) if page_views else 0.0,
+            'cart_to_purchase_rate': (purchases / add_to_carts * 100) if add_to_carts else 0.0,
+            'view_to_purchase_rate': (purchases / page_views * 100) if page_views else 0.0,
+        }
+
+    def sketches(self) -> Dict[str, str]:
+        """Serialized mergeable sketches carried with the aggregation"""
+        sketches = {
+            'users': self.users.to_string(),
+            'sessions': self.sessions.to_string(),
+        }
+        for event_type, sketch in self.type_users.items():
+            sketches[f'users:{event_type}'] = sketch.to_string()
+        for event_type, sketch in self.type_sessions.items():
+            sketches[f'sessions:{event_type}'] = sketch.to_string()
+        for dimension, summary in self.heavy_hitters.items():
+            sketches[f'top:{dimension}'] = summary.to_string()
+        for metric, sketch in self.distributions.items():
+            if sketch.count:
+                sketches[f'quantiles:{metric}'] = sketch.to_string()
+        return sketches
+
+    def to_aggregation(self, period: str, period_start: datetime,
+                       period_end: datetime) -> AnalyticsAggregation:
+        """Materialize the state as an AnalyticsAggregation record"""
+        return AnalyticsAggregation(
+            period=period,
+            period_start=period_start,
+            period_end=period_end,
+            total_events=self.total_events,
+            unique_users=self.users.count(),
+            unique_sessions=self.sessions.count(),
+            total_revenue=self.total_revenue,
+            avg_session_duration=self.avg_session_duration(),
+            session_metrics=self.session_metrics(),
+            conversion_metrics=self.conversion_metrics(),
+            event_type_breakdown=self.event_type_breakdown(),
+            quantiles=self.quantiles(),
+            top_products=self.top_items('products'),
+            top_categories=self.top_items('categories'),
+            geo_distribution={
+                country: count for country, count, _ in self.heavy_hitters['countries'].top()
+            },
+            sketches=self.sketches(),
+        )
+
+    def consume(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fold an event stream into the state in a single pass
+
+        Events are never retained, so memory stays constant no matter how
+        many events the iterable yields. Returns the number consumed.
+        """
+        consumed = 0
+        add_event = self.add_event
+        for event in events:
+            add_event(event)
+            consumed += 1
+        return consumed
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> 'AggregateState':
+        state = cls()
+        state.consume(events)
+        return state
+
+    @classmethod
+    def from_aggregation(cls, aggregation: Any) -> 'AggregateState':
+        """Rebuild mergeable state from a stored aggregation (model or DynamoDB item)"""
+        if isinstance(aggregation, AnalyticsAggregation):
+            aggregation = aggregation.model_dump()
+
+        state = cls()
+        state.total_events = int(aggregation.get('total_events', 0))
+        state.total_revenue = _to_decimal(aggregation.get('total_revenue'))
+
+        for event_type, stats in (aggregation.get('event_type_breakdown') or {}).items():
+            state.event_counts[event_type] = int(stats.get('total_events', 0))
+            if 'total_revenue' in stats:
+                state.event_revenue[event_type] = _to_decimal(stats['total_revenue'])
+
+        state.add_session_totals(aggregation.get('session_metrics') or {})
+
+        for name, data in (aggregation.get('sketches') or {}).items():
+            if name.startswith('top:'):
+                dimension = name.split(':', 1)[1]
+                if dimension in state.heavy_hitters:
+                    state.heavy_hitters[dimension] = SpaceSaving.from_string(data)
+                continue
+            if name.startswith('quantiles:'):
+                metric = name.split(':', 1)[1]
+                if metric in state.distributions:
+                    state.distributions[metric] = DDSketch.from_string(data)
+                continue
+            sketch = HyperLogLog.from_string(data)
+            if name == 'users':
+                state.users = sketch
+            elif name == 'sessions':
+                state.sessions = sketch
+            elif name.startswith('users:'):
+                state.type_users[name.split(':', 1)[1]] = sketch
+            elif name.startswith('sessions:'):
+                state.type_sessions[name.split(':', 1)[1]] = sketch
+        return state
+
+
+class RollupEngine:
+    """
+    Builds period aggregations hierarchically
+
+    Minute aggregations are the only level computed from raw events. Every
+    coarser period is folded from the stored aggregations of its source
+    level (see ROLLUP_SOURCE), so a monthly rollup reads ~31 daily records
+    instead of every event in the month. Missing lower-level records are
+    rebuilt (and stored) on demand: contiguous missing minutes in one
+    raw-event read, at most max_rebuild_reads reads per engine, after which
+    missing periods are skipped and logged. With from_events=True any period is
+    instead computed in one streaming pass over its raw events, which is the
+    cheaper path when nothing below it has been stored yet (e.g. backfills).
+    Session totals are not derivable from a period's events alone; minute
+    aggregations take them from the optional session_totals source
+    (see SessionMetrics.totals).
+    """
+
+    def __init__(self, dynamodb, store_missing: bool = True, kernel: Optional[str] = None,
+                 session_totals: Optional[Callable[[datetime], Dict[str, int]]] = None,
+                 on_page: Optional[Callable[[Dict], None]] = None,
+                 max_rebuild_reads: Optional[int] = None):
+        self.dynamodb = dynamodb
+        self.store_missing = store_missing
+        self.kernel = kernel or Config.AGGREGATION_KERNEL
+        self.session_totals = session_totals
+        self.on_page = on_page
+        self.max_rebuild_reads = (Config.AGGREGATION_MAX_REBUILD_READS
+                                  if max_rebuild_reads is None else max_rebuild_reads)
+        self.stats = {'aggregations_read': 0, 'aggregations_rebuilt': 0, 'aggregations_skipped': 0,
+                      'events_read': 0, 'rebuild_reads': 0}
+
+    def build(self, period: str, period_start: datetime,
+              from_events: bool = False) -> AnalyticsAggregation:
+        """Build the aggregation for the period starting at period_start"""
+        state = self.build_state(period, period_start, from_events=from_events)
+        start, end = period_bounds(period, period_start)
+        return state.to_aggregation(period, start, end)
+
+    def build_state(self, period: str, period_start: datetime,
+                    from_events: bool = False) -> AggregateState:
+        start, end = period_bounds(period, period_start)
+        if period == 'minute' or from_events:
+            state = self._state_from_events(start, end)
+            if period == 'minute' and self.session_totals:
+                state.add_session_totals(self.session_totals(start))
+            return state
+
+        source_period = ROLLUP_SOURCE[period]
+        stored = self._load_stored(source_period, start, end)
+        missing = [child_start for child_start in iter_period_starts(source_period, start, end)
+                   if child_start not in stored]
+        if source_period == 'minute':
+            stored.update(self._rebuild_minutes(missing))
+        else:
+            for child_start in missing:
+                child = self._rebuild(source_period, child_start)
+                if child is not None:
+                    stored[child_start] = child
+
+        state = AggregateState()
+        for child in stored.values():
+            state.merge(child)
+        return state
+
+    def state_for_range(self, start: datetime, end: datetime) -> AggregateState:
+        """
+        Merge the stored aggregations covering an arbitrary [start, end)
+
+        Reads whole days where possible and hours/minutes only at the edges
+        (see range_segments). A day or hour whose record is not stored yet
+        (e.g. before its rollup ran) is read from its finer records instead.
+        Nothing is rebuilt: minutes without a stored aggregation are simply
+        absent from the result.
+        """
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+
+        state = AggregateState()
+        for period, segment_start, segment_end in range_segments(start, end):
+            for child in self._load_covering(period, segment_start, segment_end):
+                state.merge(child)
+        return state
+
+    def state_to_date(self, now: datetime) -> AggregateState:
+        """
+        Merge every stored aggregation up to now: closed months from the
+        month level (one record each, the last one from its days until its
+        rollup has run), the current month via state_for_range
+        """
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        month_start = period_bounds('month', now)[0]
+        last_month = previous_period_start('month', now)
+        state = self.state_for_range(month_start, now)
+        for child in self._load_stored('month', EPOCH, last_month).values():
+            state.merge(child)
+        for child in self._load_covering('month', last_month, month_start):
+            state.merge(child)
+        return state
+
+    def _load_stored(self, period: str, start: datetime, end: datetime) -> Dict[datetime, AggregateState]:
+        """Load stored lower-level aggregations keyed by their period start"""
+        items = self.dynamodb.get_aggregations(period=period, start_time=start, end_time=end)
+        stored = {}
+        for item in items:
+            child_start = item['period_start']
+            if isinstance(child_start, str):
+                child_start = datetime.fromisoformat(child_start)
+            if start <= child_start < end:
+                stored[child_start] = AggregateState.from_aggregation(item)
+        self.stats['aggregations_read'] += len(stored)
+        return stored
+
+    def _load_covering(self, period: str, start: datetime, end: datetime) -> List[AggregateState]:
+        """
+        Stored aggregations covering [start, end) at the `period` level; a
+        missing record is replaced by its source level's records (month ->
+        days -> hours -> minutes), with one read per contiguous gap
+        """
+        stored = self._load_stored(period, start, end)
+        states = list(stored.values())
+        source_period = ROLLUP_SOURCE.get(period)
+        if source_period:
+            missing = [child_start for child_start in iter_period_starts(period, start, end)
+                       if child_start not in stored]
+            for gap_start, gap_end in contiguous_runs(period, missing):
+                states += self._load_covering(source_period, gap_start, min(gap_end, end))
+        return states
+
+    def _rebuild(self, period: str, period_start: datetime) -> Optional[AggregateState]:
+        """
+        Recompute a missing lower-level aggregation and persist it; None
+        once the rebuild budget is spent. A period rebuilt only partially
+        (budget spent on the way) is returned but not stored.
+        """
+        if self._rebuild_budget_spent():
+            self._skip(period, period_start)
+            return None
+        logger.info("Rebuilding missing aggregation", period=period,
+                    period_start=period_start.isoformat())
+        skipped = self.stats['aggregations_skipped']
+        state = self.build_state(period, period_start)
+        self.stats['aggregations_rebuilt'] += 1
+        if self.stats['aggregations_skipped'] == skipped:
+            self._store_rebuilt(period, period_start, state)
+        return state
+
+    def _rebuild_minutes(self, missing: List[datetime]) -> Dict[datetime, AggregateState]:
+        """Recompute missing minutes, one raw-event read per contiguous run"""
+        rebuilt: Dict[datetime, AggregateState] = {}
+        for run_start, run_end in contiguous_runs('minute', missing):
+            if self._rebuild_budget_spent():
+                self._skip('minute', run_start, run_end)
+                continue
+            logger.info("Rebuilding missing aggregations", period='minute',
+                        period_start=run_start.isoformat(), period_end=run_end.isoformat())
+            self.stats['rebuild_reads'] += 1
+            for minute, state in self.build_range_from_events('minute', run_start, run_end).items():
+                if self.session_totals:
+                    state.add_session_totals(self.session_totals(minute))
+                self.stats['aggregations_rebuilt'] += 1
+                self._store_rebuilt('minute', minute, state)
+                rebuilt[minute] = state
+        return rebuilt
+
+    def _rebuild_budget_spent(self) -> bool:
+        return bool(self.max_rebuild_reads) and self.stats['rebuild_reads'] >= self.max_rebuild_reads
+
+    def _skip(self, period: str, start: datetime, end: Optional[datetime] = None) -> None:
+        end = end or period_bounds(period, start)[1]
+        self.stats['aggregations_skipped'] += len(list(iter_period_starts(period, start, end)))
+        logger.warning("Rebuild budget spent, skipping missing aggregations", period=period,
+                       period_start=start.isoformat(), period_end=end.isoformat(),
+                       max_rebuild_reads=self.max_rebuild_reads)
+
+    def _store_rebuilt(self, period: str, period_start: datetime, state: AggregateState) -> None:
+        if self.store_missing:
+            start, end = period_bounds(period, period_start)
+            self.dynamodb.store_aggregation(state.to_aggregation(period, start, end))
+
+    def build_range_from_events(self, period: str, start: datetime,
+                                end: datetime) -> Dict[datetime, AggregateState]:
+        """
+        State of every `period` bucket within [start, end) from a single
+        streaming pass over the raw events (used by backfills, where one
+        read per minute would rescan the same data 1440 times a day)
+        """
+        states = {bucket: AggregateState() for bucket in iter_period_starts(period, start, end)}
+        events = self._iter_events(start, end, AGGREGATION_EVENT_FIELDS + ('timestamp',))
+
+        def bucket_of(event: Dict[str, Any]) -> datetime:
+            ts = event['timestamp']
+            if isinstance(ts, str):
+                ts = datetime.fromisoformat(ts)
+            return period_bounds(period, ts)[0]
+
+        read = 0
+        if self.kernel == 'numpy':
+            from .columnar_kernel import ColumnarAggregator, ColumnarBatch
+            batch_size = Config.AGGREGATION_BATCH_SIZE
+            aggregators = {bucket: ColumnarAggregator(state, batch_size) for bucket, state in states.items()}
+            pending: Dict[datetime, List[Dict[str, Any]]] = {}
+            buffered = 0
+            for event in events:
+                pending.setdefault(bucket_of(event), []).append(event)
+                buffered += 1
+                read += 1
+                if buffered >= batch_size:
+                    for bucket, batch in pending.items():
+                        aggregators[bucket].update(ColumnarBatch(batch))
+                    pending, buffered = {}, 0
+            for bucket, batch in pending.items():
+                aggregators[bucket].update(ColumnarBatch(batch))
+        else:
+            for event in events:
+                states[bucket_of(event)].add_event(event)
+                read += 1
+
+        self.stats['events_read'] += read
+        return states
+
+    def _iter_events(self, start: datetime, end: datetime, attributes: Tuple[str, ...]) -> Iterable[Dict[str, Any]]:
+        kwargs = {'on_page': self.on_page} if self.on_page else {}
+        return self.dynamodb.iter_events_by_timerange(start, end, attributes=attributes, **kwargs)
+
+    def _state_from_events(self, start: datetime, end: datetime) -> AggregateState:
+        events = self._iter_events(start, end, AGGREGATION_EVENT_FIELDS)
+        state = AggregateState()
+        if self.kernel == 'numpy':
+            # Vectorized batches; identical results to the per-event path
+            from .columnar_kernel import ColumnarAggregator
+            self.stats['events_read'] += ColumnarAggregator(state, Config.AGGREGATION_BATCH_SIZE).consume(events)
+        else:
+            self.stats['events_read'] += state.consume(events)
+        return state
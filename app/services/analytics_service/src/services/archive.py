@@ -0,0 +1,337 @@
+"""
+Event Archive
+Cold tier: immutable zstd NDJSON segment files with a manifest and time index
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import structlog
+
+from src.config.settings import Config
+from .rate_limit import RateLimiter
+from .retention import TTL_ATTRIBUTE, BatchDeleteEngine
+
+logger = structlog.get_logger(__name__)
+
+MANIFEST_KEY = 'manifest.json'
+CODEC = 'zstd'
+
+# Marks events restored from the archive (never re-archived; they expire after REHYDRATE_TTL_DAYS)
+REHYDRATED_ATTRIBUTE = 'rehydrated_at'
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def _as_datetime(value: Any) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class LocalArchiveStorage:
+    """Archive objects as files under a root directory (writes are atomic renames)"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or Config.ARCHIVE_DIR
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, local_path: str, key: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        shutil.copyfile(local_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), 'rb')
+
+    def read_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_json(self, key: str, data: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+class S3ArchiveStorage:
+    """Archive objects in an S3 (or S3-compatible, e.g. LocalStack) bucket"""
+
+    def __init__(self, bucket: Optional[str] = None, client=None):
+        from .aws_clients import get_aws_clients
+        self.bucket = bucket or Config.ARCHIVE_S3_BUCKET
+        self.client = client or get_aws_clients().client('s3')
+
+    def put_file(self, local_path: str, key: str) -> None:
+        self.client.upload_file(local_path, self.bucket, key)
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def read_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read())
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def write_json(self, key: str, data: Dict[str, Any]) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(data).encode('utf-8'),
+                               ContentType='application/json')
+
+
+def get_archive_storage():
+    if Config.ARCHIVE_STORAGE == 's3':
+        return S3ArchiveStorage()
+    if Config.ARCHIVE_STORAGE == 'local':
+        return LocalArchiveStorage()
+    raise ValueError(f"Unknown archive storage: {Config.ARCHIVE_STORAGE}")
+
+
+class ArchiveManifest:
+    """
+    Catalog of archived segments
+
+    Each segment records its object key, event count, time span, size and
+    checksum. The time index maps event_day -> segment ids, so a range
+    lookup only touches the segments of the days it covers.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        data = storage.read_json(MANIFEST_KEY) or {}
+        self.segments: Dict[str, Dict[str, Any]] = data.get('segments', {})
+        self.index: Dict[str, List[str]] = data.get('index', {})
+
+    def add(self, segment: Dict[str, Any]) -> None:
+        self.segments[segment['id']] = segment
+        self.index.setdefault(segment['event_day'], []).append(segment['id'])
+
+    def save(self) -> None:
+        self.storage.write_json(MANIFEST_KEY, {
+            'version': 1,
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+            'segments': self.segments,
+            'index': self.index,
+        })
+
+    def segments_for(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Segments holding events within [start_time, end_time), oldest first"""
+        start, end = start_time.isoformat(), end_time.isoformat()
+        found = []
+        day = start_time.date()
+        while day <= (end_time - timedelta(microseconds=1)).date():
+            for segment_id in self.index.get(day.isoformat(), []):
+                segment = self.segments[segment_id]
+                if segment['min_timestamp'] < end and segment['max_timestamp'] >= start:
+                    found.append(segment)
+            day += timedelta(days=1)
+        return sorted(found, key=lambda s: s['min_timestamp'])
+
+
+class SegmentWriter:
+    """One zstd NDJSON segment being written to a local temporary file"""
+
+    def __init__(self, directory: str, event_day: str):
+        self.event_day = event_day
+        self.id = f"{event_day}-{uuid.uuid4().hex[:12]}"
+        self.path = os.path.join(directory, f"{self.id}.ndjson.zst")
+        self.stream = pa.CompressedOutputStream(self.path, CODEC)
+        self.count = 0
+        self.min_timestamp = None
+        self.max_timestamp = None
+
+    def write(self, item: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(item, default=_json_default, separators=(',', ':')).encode('utf-8') + b'\n')
+        ts = item['timestamp']
+        self.min_timestamp = ts if self.min_timestamp is None else min(self.min_timestamp, ts)
+        self.max_timestamp = ts if self.max_timestamp is None else max(self.max_timestamp, ts)
+        self.count += 1
+
+    def close(self) -> Dict[str, Any]:
+        self.stream.close()
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return {
+            'id': self.id,
+            'key': f"segments/event_day={self.event_day}/{self.id}.ndjson.zst",
+            'event_day': self.event_day,
+            'events': self.count,
+            'min_timestamp': self.min_timestamp,
+            'max_timestamp': self.max_timestamp,
+            'bytes': os.path.getsize(self.path),
+            'sha256': digest.hexdigest(),
+            'codec': CODEC,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def iter_segment(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Decode the items of a segment file object, streaming"""
+    reader = pa.CompressedInputStream(pa.PythonFile(stream, mode='r'), CODEC)
+    buffer = b''
+    while True:
+        chunk = reader.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            if line:
+                yield json.loads(line, parse_float=Decimal)
+    if buffer:
+        yield json.loads(buffer, parse_float=Decimal)
+
+
+class EventArchiver:
+    """
+    Moves events older than the hot window from DynamoDB into segments
+
+    One throttled streaming scan writes events into per-day segments
+    (at most max_open_segments open at once; a day may span several
+    segments). Hot items are deleted only after their segments are
+    uploaded and the manifest is saved, so a crash can duplicate events
+    in the archive but never lose them (rehydration is idempotent).
+    """
+
+    def __init__(self, dynamodb, storage=None, hot_days: Optional[int] = None,
+                 max_segment_events: Optional[int] = None, max_open_segments: int = 32,
+                 max_read_units: Optional[float] = None, max_write_units: Optional[float] = None):
+        self.dynamodb = dynamodb
+        self.storage = storage or get_archive_storage()
+        self.hot_days = hot_days or Config.ARCHIVE_HOT_DAYS
+        self.max_segment_events = max_segment_events or Config.ARCHIVE_SEGMENT_MAX_EVENTS
+        self.max_open_segments = max_open_segments
+        self.max_read_units = max_read_units or Config.PURGE_MAX_READ_UNITS
+        self.max_write_units = max_write_units or Config.PURGE_MAX_WRITE_UNITS
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=self.hot_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        manifest = ArchiveManifest(self.storage)
+        read_limiter = RateLimiter(self.max_read_units)
+
+        workdir = tempfile.mkdtemp(prefix='archive-')
+        try:
+            open_segments: 'OrderedDict[str, SegmentWriter]' = OrderedDict()
+            closed: List[SegmentWriter] = []
+
+            def close(writer: SegmentWriter) -> None:
+                segment = writer.close()
+                self.storage.put_file(writer.path, segment['key'])
+                manifest.add(segment)
+                closed.append(writer)
+
+            events = self.dynamodb.iter_events_by_timerange(
+                datetime(1970, 1, 1, tzinfo=timezone.utc), cutoff, on_page=read_limiter.on_scan_page
+            )
+            for item in events:
+                if REHYDRATED_ATTRIBUTE in item:
+                    continue
+                event_day = _as_datetime(item['timestamp']).strftime('%Y-%m-%d')
+                writer = open_segments.get(event_day)
+                if writer is None:
+                    if len(open_segments) >= self.max_open_segments:
+                        close(open_segments.popitem(last=False)[1])
+                    writer = open_segments[event_day] = SegmentWriter(workdir, event_day)
+                open_segments.move_to_end(event_day)
+                writer.write(item)
+                if writer.count >= self.max_segment_events:
+                    close(open_segments.pop(event_day))
+            for writer in open_segments.values():
+                close(writer)
+
+            if not closed:
+                return {'cutoff': cutoff.isoformat(), 'segments': 0, 'archived_events': 0, 'deleted_events': 0}
+            manifest.save()
+
+            # Segments are durable and cataloged: remove their events from the hot table
+            engine = BatchDeleteEngine(self.dynamodb.events_table, segments=1, max_write_units=self.max_write_units)
+            for writer in closed:
+                with open(writer.path, 'rb') as f:
+                    engine.delete_keys({name: item[name] for name in engine.key_names} for item in iter_segment(f))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        result = {
+            'cutoff': cutoff.isoformat(),
+            'segments': len(closed),
+            'archived_events': sum(writer.count for writer in closed),
+            'deleted_events': engine.stats['deleted'],
+        }
+        logger.info("Event archival completed", **result)
+        return result
+
+
+def iter_archived_events(start_time: datetime, end_time: datetime,
+                         event_types: Optional[Iterable[str]] = None, storage=None) -> Iterator[Dict[str, Any]]:
+    """Stream archived events within [start_time, end_time), segment by segment"""
+    storage = storage or get_archive_storage()
+    start, end = start_time.isoformat(), end_time.isoformat()
+    event_types = set(event_types) if event_types else None
+    for segment in ArchiveManifest(storage).segments_for(start_time, end_time):
+        with storage.open(segment['key']) as stream:
+            for item in iter_segment(stream):
+                if start <= item['timestamp'] < end and (event_types is None or item.get('event_type') in event_types):
+                    yield item
+
+
+def rehydrate_events(dynamodb, start_time: datetime, end_time: datetime,
+                     event_types: Optional[Iterable[str]] = None, storage=None,
+                     ttl_days: Optional[int] = None, max_write_units: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Restore archived events of a range into the hot table
+
+    Restored items are flagged (never re-archived) and get a TTL of
+    ttl_days from now, so they drop out of the hot table on their own.
+    Writes are throttled and idempotent (items are put by primary key).
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = int((now + timedelta(days=ttl_days or Config.REHYDRATE_TTL_DAYS)).timestamp())
+    limiter = RateLimiter(max_write_units or Config.PURGE_MAX_WRITE_UNITS)
+
+    restored = 0
+    with dynamodb.events_table.batch_writer() as batch:
+        for item in iter_archived_events(start_time, end_time, event_types, storage):
+            limiter.acquire()
+            item[REHYDRATED_ATTRIBUTE] = now.isoformat()
+            item[TTL_ATTRIBUTE] = expires_at
+            batch.put_item(Item=item)
+            restored += 1
+
+    result = {
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'restored_events': restored,
+        'expires_at': expires_at,
+    }
+    logger.info("Archived events rehydrated", **result)
+    return result
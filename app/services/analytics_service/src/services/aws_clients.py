@@ -0,0 +1,173 @@
+"""
+AWS Client Factory
+Process-wide, tuned boto3 clients shared by services, tasks and threads
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable
+
+import structlog
+
+from src.config.settings import Config
+
+logger = structlog.get_logger(__name__)
+
+# Connection settings (endpoint, region, credentials) per service
+SERVICE_CONFIGS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    'dynamodb': Config.get_dynamodb_config,
+    'sns': Config.get_sns_config,
+    'sqs': Config.get_sqs_config,
+    's3': Config.get_s3_config,
+}
+
+
+def boto_config(service: str):
+    """
+    Tuned botocore config: a connection pool large enough for every thread
+    of a process, TCP keep-alive, bounded timeouts and the retry mode.
+    DynamoDB throttles, transient errors, connection errors and timeouts
+    are retried per operation by the access layer, so botocore makes a
+    single attempt there.
+    """
+    from botocore.config import Config as BotoConfig
+    
+    if service == 'dynamodb':
+        retries = {'mode': Config.AWS_RETRY_MODE, 'total_max_attempts': 1}
+    else:
+        retries = {'mode': Config.AWS_RETRY_MODE, 'total_max_attempts': Config.AWS_MAX_ATTEMPTS}
+    return BotoConfig(
+        max_pool_connections=Config.AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=Config.AWS_CONNECT_TIMEOUT,
+        read_timeout=Config.AWS_READ_TIMEOUT,
+        tcp_keepalive=True,
+        retries=retries,
+    )
+
+
+class AWSClientFactory:
+    """
+    Lazily built boto3 clients, one per service and process
+
+    Clients are thread-safe and shared, so tasks and request handlers
+    reuse their endpoint resolution and pooled keep-alive connections
+    instead of paying for them on every call. Resources are not
+    thread-safe and are kept per thread. Blocking calls made on behalf of
+    coroutines run on a bounded I/O executor. Connections must not cross a
+    fork: the factory starts over when it finds itself in a new process
+    (reset explicitly by the Celery and gunicorn worker hooks).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._session = None
+        self._clients: Dict[str, Any] = {}
+        self._local = threading.local()
+        # Threads do not survive a fork: the parent's executor is dropped, not shut down
+        self._executor = None
+
+    def _check_process(self) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _get_session(self):
+        # boto3 sessions are not thread-safe: only used under the lock
+        if self._session is None:
+            import boto3  # ~100 ms of imports, paid by the first client rather than at startup
+            self._session = boto3.session.Session()
+        return self._session
+
+    def client(self, service: str):
+        """Shared client of a service"""
+        self._check_process()
+        client = self._clients.get(service)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service)
+                if client is None:
+                    client = self._get_session().client(service, config=boto_config(service),
+                                                        **SERVICE_CONFIGS[service]())
+                    self._clients[service] = client
+        return client
+
+    def resource(self, service: str):
+        """Resource of a service for the calling thread"""
+        self._check_process()
+        resources = getattr(self._local, 'resources', None)
+        if resources is None:
+            resources = self._local.resources = {}
+        resource = resources.get(service)
+        if resource is None:
+            with self._lock:
+                resource = self._get_session().resource(service, config=boto_config(service),
+                                                        **SERVICE_CONFIGS[service]())
+            resources[service] = resource
+        return resource
+
+    def io_executor(self) -> ThreadPoolExecutor:
+        """
+        Bounded thread pool for blocking AWS calls awaited by coroutines;
+        sized to the connection pool so concurrent calls never wait for a
+        connection (excess calls queue here instead)
+        """
+        self._check_process()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=Config.AWS_IO_WORKERS,
+                                                        thread_name_prefix='aws-io')
+        return self._executor
+    
+    def reset(self) -> None:
+        """Drop every client (e.g. after a fork)"""
+        with self._lock:
+            self._reset()
+
+    def warm(self, services: Iterable[str] = ('dynamodb', 'sns', 'sqs')) -> None:
+        """Build clients up front so the first task or request does not pay for it"""
+        for service in services:
+            self.client(service)
+            if service == 'dynamodb':
+                self.resource(service)
+
+
+_factory = AWSClientFactory()
+
+
+def get_aws_clients() -> AWSClientFactory:
+    """Process-wide client factory"""
+    return _factory
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Await a blocking call on the AWS I/O executor, leaving the event loop
+    free (context variables such as the bound log context are carried over)
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_factory.io_executor(),
+                                      functools.partial(context.run, func, *args, **kwargs))
+
+
+def init_process() -> None:
+    """
+    Per-process initialization (Celery worker_process_init): drop anything
+    inherited from the parent and build this process's clients
+    """
+    _factory.reset()
+    try:
+        _factory.warm()
+    except Exception as e:
+        # Clients are built lazily on first use instead
+        logger.warning("AWS client warm-up failed", error=str(e))
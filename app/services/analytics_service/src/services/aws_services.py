@@ -3,12 +3,24 @@ AWS Services Integration
 DynamoDB, SNS, SQS services for Analytics Service
 """
 
-import boto3
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import structlog
-from typing import Dict, List, Optional, Any
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Any, Sequence, Union
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError, BotoCoreError
-from src.config.settings import Config
+from src.config.settings import get_settings
 from src.models.analytics_models import AnalyticsEvent, MetricData, AnalyticsAggregation
+from src.services.aws_clients import get_aws_clients, run_io
+from src.services.dynamodb_access import AdaptiveClient, AdaptiveTable
+from src.services.sharding import ShardPlan, scatter_gather
+from src.services.retention import (
+    TTL_ATTRIBUTE, RetentionPolicy, purge_expired_aggregations, purge_expired_events
+)
 
 
 logger = structlog.get_logger(__name__)
@@ -18,25 +30,18 @@ class AWSServices:
     """AWS services integration"""
     
     def __init__(self):
-        self.config = Config()
-        self._dynamodb = None
+        self.config = get_settings()
         self._sns = None
         self._sqs = None
         self._initialize_services()
     
     def _initialize_services(self):
-        """Initialize AWS service clients"""
+        """Get AWS service clients (shared per process, built on first use)"""
         try:
-            # DynamoDB
-            self._dynamodb = boto3.resource('dynamodb', **self.config.get_dynamodb_config())
-            
-            # SNS
-            self._sns = boto3.client('sns', **self.config.get_sns_config())
-            
-            # SQS
-            self._sqs = boto3.client('sqs', **self.config.get_sqs_config())
-            
-            logger.info("AWS services initialized successfully")
+            clients = get_aws_clients()
+            clients.resource('dynamodb')
+            self._sns = clients.client('sns')
+            self._sqs = clients.client('sqs')
             
         except Exception as e:
             logger.error("Failed to initialize AWS services", error=str(e))
@@ -44,8 +49,8 @@ class AWSServices:
     
     @property
     def dynamodb(self):
-        """Get DynamoDB resource"""
-        return self._dynamodb
+        """Get DynamoDB resource (of the calling thread: resources are not thread-safe)"""
+        return get_aws_clients().resource('dynamodb')
     
     @property
     def sns(self):
@@ -61,32 +66,63 @@ class AWSServices:
 class DynamoDBService:
     """DynamoDB operations for analytics data"""
     
-    def __init__(self, aws_services: AWSServices):
-        self.dynamodb = aws_services.dynamodb
-        self.config = Config()
+    def __init__(self, aws_services: Optional[AWSServices] = None):
+        self._aws_services = aws_services or AWSServices()
+        self.config = get_settings()
+        
+        # Table references, one set per thread (resources are not thread-safe);
+        # item operations are rate limited and retried on throttling
+        self._local = threading.local()
+        
+        # Retention windows, written as TTL attributes so DynamoDB expires items itself
+        self.retention = RetentionPolicy()
         
-        # Table references
-        self.events_table = self.dynamodb.Table(self.config.ANALYTICS_EVENTS_TABLE)
-        self.metrics_table = self.dynamodb.Table(self.config.ANALYTICS_METRICS_TABLE)
-        self.aggregations_table = self.dynamodb.Table(self.config.ANALYTICS_AGGREGATIONS_TABLE)
+        # Time-bucket keys of the events time index; with write sharding each hour's
+        # writes are spread over N hash-suffixed keys, otherwise over a single one
+        self.shards = ShardPlan() if self.config.EVENT_SHARDING_ENABLED else ShardPlan(1, schedule={})
+        self._shard_pool = None
+        self._shard_pool_lock = threading.Lock()
+    
+    @property
+    def dynamodb(self):
+        """DynamoDB resource of the calling thread"""
+        return self._aws_services.dynamodb
+    
+    def _table(self, name: str) -> AdaptiveTable:
+        tables = self._local.__dict__.setdefault('tables', {})
+        table = tables.get(name)
+        if table is None:
+            table = tables[name] = AdaptiveTable(self.dynamodb.Table(name))
+        return table
+    
+    @property
+    def events_table(self) -> AdaptiveTable:
+        return self._table(self.config.ANALYTICS_EVENTS_TABLE)
+    
+    @property
+    def metrics_table(self) -> AdaptiveTable:
+        return self._table(self.config.ANALYTICS_METRICS_TABLE)
+    
+    @property
+    def aggregations_table(self) -> AdaptiveTable:
+        return self._table(self.config.ANALYTICS_AGGREGATIONS_TABLE)
     
     async def save_event(self, event: AnalyticsEvent) -> bool:
-        """Save analytics event to DynamoDB"""
-        try:
-            event_data = event.dict()
-            event_data['timestamp'] = event_data['timestamp'].isoformat()
-            
-            self.events_table.put_item(Item=event_data)
-            logger.info("Event saved to DynamoDB", 
-                       event_type=event.event_type, 
+        """Save analytics event to DynamoDB (the item of store_event, written on the AWS I/O executor)"""
+        saved = await run_io(self.store_event, event)
+        if saved:
+            logger.info("Event saved to DynamoDB",
+                       event_type=event.event_type,
                        event_id=event.event_id)
-            return True
-            
-        except ClientError as e:
-            logger.error("Failed to save event to DynamoDB", 
-                        error=str(e), 
-                        event_type=event.event_type)
-            return False
+        return saved
+    
+    async def save_events(self, events: Sequence[AnalyticsEvent]) -> int:
+        """
+        Save events concurrently (each write runs on the AWS I/O executor);
+        returns the number saved
+        """
+        results = await asyncio.gather(*(self.save_event(event) for event in events))
+        return sum(results)
     
     async def save_metric(self, metric: MetricData) -> bool:
         """Save metric data to DynamoDB"""
@@ -94,7 +130,7 @@ class DynamoDBService:
             metric_data = metric.dict()
             metric_data['timestamp'] = metric_data['timestamp'].isoformat()
             
-            self.metrics_table.put_item(Item=metric_data)
+            await run_io(lambda: self.metrics_table.put_item(Item=metric_data))
             logger.info("Metric saved to DynamoDB", 
                        metric_name=metric.metric_name)
             return True
@@ -113,7 +149,7 @@ class DynamoDBService:
             agg_data['end_time'] = agg_data['end_time'].isoformat()
             agg_data['created_at'] = agg_data['created_at'].isoformat()
             
-            self.aggregations_table.put_item(Item=agg_data)
+            await run_io(lambda: self.aggregations_table.put_item(Item=agg_data))
             logger.info("Aggregation saved to DynamoDB", 
                        period=aggregation.period,
                        aggregation_id=aggregation.aggregation_id)
@@ -125,6 +161,103 @@ class DynamoDBService:
                         aggregation_id=aggregation.aggregation_id)
             return False
     
+    def store_event(self, event: AnalyticsEvent) -> bool:
+        """
+        Store an event with its TTL attribute (expiry from the event type's
+        retention policy)
+        """
+        try:
+            item = self._to_item(event.model_dump(mode='json'))
+            item['timestamp'] = event.timestamp.isoformat()
+            item[TTL_ATTRIBUTE] = self.retention.event_expiry(event.event_type, event.timestamp)
+            item['time_bucket'] = self.shards.partition_key(event.event_id, event.timestamp)
+            
+            self.events_table.put_item(Item=item)
+            return True
+            
+        except ClientError as e:
+            logger.error("Failed to store event in DynamoDB",
+                        error=str(e),
+                        event_type=event.event_type,
+                        event_id=event.event_id)
+            return False
+    
+    @staticmethod
+    def _to_item(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert JSON-compatible data to a DynamoDB item (floats become Decimal)"""
+        return json.loads(json.dumps(data, default=str), parse_float=Decimal)
+    
+    @staticmethod
+    def _aggregation_key(period: str, event_type: Optional[str] = None) -> str:
+        """Partition key of the aggregations table: one partition per period/event type"""
+        return f"{period}#{event_type or 'all'}"
+    
+    def store_aggregation(self, aggregation: AnalyticsAggregation) -> bool:
+        """
+        Store (upsert) an aggregation record
+        
+        Items are keyed by aggregation_key (period + event type) and
+        period_start (ISO timestamp), so a period can be re-aggregated
+        idempotently and ranges of one level can be read with a single query.
+        """
+        try:
+            item = self._to_item(aggregation.model_dump(mode='json'))
+            item['aggregation_key'] = self._aggregation_key(aggregation.period, aggregation.event_type)
+            item['period_start'] = aggregation.period_start.isoformat()
+            expires_at = self.retention.aggregation_expiry(aggregation.period, aggregation.period_start)
+            if expires_at is not None:
+                item[TTL_ATTRIBUTE] = expires_at
+            
+            self.aggregations_table.put_item(Item=item)
+            logger.info("Aggregation stored in DynamoDB",
+                       period=aggregation.period,
+                       period_start=item['period_start'])
+            return True
+            
+        except ClientError as e:
+            logger.error("Failed to store aggregation in DynamoDB",
+                        error=str(e),
+                        period=aggregation.period)
+            return False
+    
+    def get_aggregations(self, period: str,
+                         start_time: Optional[Union[datetime, str]] = None,
+                         end_time: Optional[Union[datetime, str]] = None,
+                         limit: Optional[int] = None,
+                         event_type: Optional[str] = None) -> List[Dict]:
+        """Get stored aggregations of one period within [start_time, end_time)"""
+        if isinstance(start_time, datetime):
+            start_time = start_time.isoformat()
+        if isinstance(end_time, datetime):
+            end_time = end_time.isoformat()
+        
+        condition = Key('aggregation_key').eq(self._aggregation_key(period, event_type))
+        if start_time and end_time:
+            condition &= Key('period_start').between(start_time, end_time)
+        elif start_time:
+            condition &= Key('period_start').gte(start_time)
+        elif end_time:
+            condition &= Key('period_start').lte(end_time)
+        
+        try:
+            items: List[Dict] = []
+            params = {'KeyConditionExpression': condition}
+            while True:
+                response = self.aggregations_table.query(**params)
+                items.extend(
+                    item for item in response.get('Items', [])
+                    if not end_time or item['period_start'] < end_time
+                )
+                if limit and len(items) >= limit:
+                    return items[:limit]
+                if 'LastEvaluatedKey' not in response:
+                    return items
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            
+        except ClientError as e:
+            logger.error("Failed to query aggregations", error=str(e), period=period)
+            return []
+    
     async def get_events_by_timerange(self, start_time: str, end_time: str, 
                                     event_type: Optional[str] = None) -> List[Dict]:
         """Get events within time range"""
@@ -141,10 +274,10 @@ class DynamoDBService:
                 filter_expression += " AND event_type = :event_type"
                 expression_values[':event_type'] = event_type
             
-            response = self.events_table.scan(
+            response = await run_io(lambda: self.events_table.scan(
                 FilterExpression=filter_expression,
                 ExpressionAttributeValues=expression_values
-            )
+            ))
             
             return response.get('Items', [])
             
@@ -152,15 +285,137 @@ class DynamoDBService:
             logger.error("Failed to query events", error=str(e))
             return []
     
+    def iter_events_by_timerange(self, start_time: Union[datetime, str],
+                                 end_time: Union[datetime, str],
+                                 attributes: Optional[Sequence[str]] = None,
+                                 page_size: Optional[int] = None,
+                                 on_page: Optional[Callable[[Dict], None]] = None) -> Iterator[Dict]:
+        """
+        Stream events within [start_time, end_time) page by page
+        
+        Only one DynamoDB page (per shard) is held in memory at a time, so
+        callers that consume the iterator incrementally use memory
+        independent of the number of events. Pass attributes to project only
+        the fields needed. Errors are raised rather than swallowed so that a
+        partial stream is never mistaken for a complete period. on_page is
+        called with every raw response (including ConsumedCapacity), e.g.
+        for throttling.
+        
+        The range is read from the time-bucket index (all shards of an hour
+        in parallel, merged in timestamp order). Only the part before
+        EVENT_SHARDING_SINCE, written without time_bucket, is scanned.
+        """
+        if isinstance(start_time, str):
+            start_time = datetime.fromisoformat(start_time)
+        if isinstance(end_time, str):
+            end_time = datetime.fromisoformat(end_time)
+        
+        unsharded, sharded = self.shards.split(start_time, end_time)
+        if unsharded:
+            yield from self._scan_events(*unsharded, attributes, page_size, on_page)
+        if sharded:
+            yield from self._query_sharded_events(*sharded, attributes, page_size, on_page)
+    
+    @staticmethod
+    def _projection(attributes: Optional[Sequence[str]], params: Dict[str, Any]) -> None:
+        if attributes:
+            names = {f'#a{i}': name for i, name in enumerate(attributes)}
+            params['ProjectionExpression'] = ', '.join(names)
+            params['ExpressionAttributeNames'] = names
+    
+    def _scan_events(self, start_time: datetime, end_time: datetime,
+                     attributes: Optional[Sequence[str]], page_size: Optional[int],
+                     on_page: Optional[Callable[[Dict], None]]) -> Iterator[Dict]:
+        params: Dict[str, Any] = {
+            'FilterExpression': Attr('timestamp').gte(start_time.isoformat()) & Attr('timestamp').lt(end_time.isoformat())
+        }
+        self._projection(attributes, params)
+        if page_size or self.config.EVENT_SCAN_PAGE_SIZE:
+            params['Limit'] = page_size or self.config.EVENT_SCAN_PAGE_SIZE
+        if on_page:
+            params['ReturnConsumedCapacity'] = 'TOTAL'
+        
+        while True:
+            response = self.events_table.scan(**params)
+            if on_page:
+                on_page(response)
+            yield from response.get('Items', [])
+            if 'LastEvaluatedKey' not in response:
+                return
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    def _query_sharded_events(self, start_time: datetime, end_time: datetime,
+                              attributes: Optional[Sequence[str]], page_size: Optional[int],
+                              on_page: Optional[Callable[[Dict], None]]) -> Iterator[Dict]:
+        start, end = start_time.isoformat(), end_time.isoformat()
+        if attributes and 'timestamp' not in attributes:
+            attributes = [*attributes, 'timestamp']  # needed to merge shards
+        client = AdaptiveClient(self.dynamodb.meta.client)  # thread-safe, unlike Table resources
+        
+        def query_pages(partition_key: str) -> Iterator[List[Dict]]:
+            params: Dict[str, Any] = {
+                'TableName': self.events_table.name,
+                'IndexName': self.config.EVENTS_TIME_INDEX,
+                'KeyConditionExpression': Key('time_bucket').eq(partition_key) & Key('timestamp').between(start, end),
+            }
+            self._projection(attributes, params)
+            if page_size or self.config.EVENT_SCAN_PAGE_SIZE:
+                params['Limit'] = page_size or self.config.EVENT_SCAN_PAGE_SIZE
+            if on_page:
+                params['ReturnConsumedCapacity'] = 'TOTAL'
+            while True:
+                response = client.query(**params)
+                if on_page:
+                    on_page(response)
+                yield [item for item in response.get('Items', []) if item['timestamp'] < end]
+                if 'LastEvaluatedKey' not in response:
+                    return
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        with self._shard_pool_lock:
+            if self._shard_pool is None:
+                self._shard_pool = ThreadPoolExecutor(max_workers=self.config.EVENT_SHARD_READ_WORKERS,
+                                                      thread_name_prefix='shard-read')
+        for bucket in self.shards.buckets(start_time, end_time):
+            yield from scatter_gather(query_pages, self.shards.partition_keys(bucket), self._shard_pool)
+    
+    def enable_ttl(self) -> Dict[str, str]:
+        """Enable TTL on the events and aggregations tables (idempotent); returns each table's TTL status"""
+        client = self.dynamodb.meta.client
+        statuses = {}
+        for table in (self.events_table, self.aggregations_table):
+            description = client.describe_time_to_live(TableName=table.name)['TimeToLiveDescription']
+            status = description.get('TimeToLiveStatus', 'DISABLED')
+            if status in ('DISABLED', 'DISABLING'):
+                client.update_time_to_live(
+                    TableName=table.name,
+                    TimeToLiveSpecification={'Enabled': True, 'AttributeName': TTL_ATTRIBUTE}
+                )
+                status = 'ENABLING'
+            statuses[table.name] = status
+        return statuses
+    
+    def purge_expired_events(self, days_to_keep: Optional[int] = None, **engine_options) -> Dict[str, int]:
+        """
+        Delete legacy events written before TTL attributes, past their
+        retention (per event type, or days_to_keep for all types)
+        """
+        policy = self.retention if days_to_keep is None else RetentionPolicy(event_days={}, default_days=days_to_keep)
+        return purge_expired_events(self.events_table, policy, **engine_options)
+    
+    def purge_expired_aggregations(self, **engine_options) -> Dict[str, int]:
+        """Delete legacy aggregations written before TTL attributes, past their period's retention"""
+        return purge_expired_aggregations(self.aggregations_table, self.retention, **engine_options)
+    
     async def get_recent_aggregations(self, period: str, limit: int = 10) -> List[Dict]:
         """Get recent aggregations for a period"""
         try:
             # Query aggregations by period (requires GSI in production)
-            response = self.aggregations_table.scan(
+            response = await run_io(lambda: self.aggregations_table.scan(
                 FilterExpression="period = :period",
                 ExpressionAttributeValues={':period': period},
                 Limit=limit
-            )
+            ))
             
             return response.get('Items', [])
             
@@ -172,22 +427,24 @@ class DynamoDBService:
 class SNSService:
     """SNS operations for event publishing"""
     
-    def __init__(self, aws_services: AWSServices):
+    def __init__(self, aws_services: Optional[AWSServices] = None):
+        aws_services = aws_services or AWSServices()
         self.sns = aws_services.sns
-        self.config = Config()
+        self.config = get_settings()
     
     async def publish_analytics_event(self, event: AnalyticsEvent) -> bool:
         """Publish analytics event to SNS topic"""
         try:
             message = {
                 'event_type': event.event_type,
-                'event_data': event.dict(),
+                'event_data': event.model_dump(mode='json'),
                 'source': 'analytics-service'
             }
             
-            response = self.sns.publish(
+            response = await run_io(
+                self.sns.publish,
                 TopicArn=self.config.ANALYTICS_TOPIC_ARN,
-                Message=str(message),
+                Message=json.dumps(message),
                 Subject=f"Analytics Event: {event.event_type}"
             )
             
@@ -211,7 +468,8 @@ class SNSService:
                 'source': 'analytics-service'
             }
             
-            response = self.sns.publish(
+            response = await run_io(
+                self.sns.publish,
                 TopicArn=self.config.ANALYTICS_TOPIC_ARN,
                 Message=str(message),
                 Subject=f"Metric: {metric.metric_name}"
@@ -232,14 +490,15 @@ class SNSService:
 class SQSService:
     """SQS operations for event queue processing"""
     
-    def __init__(self, aws_services: AWSServices):
+    def __init__(self, aws_services: Optional[AWSServices] = None):
+        aws_services = aws_services or AWSServices()
         self.sqs = aws_services.sqs
-        self.config = Config()
+        self.config = get_settings()
     
     async def get_queue_url(self, queue_name: str) -> Optional[str]:
         """Get SQS queue URL"""
         try:
-            response = self.sqs.get_queue_url(QueueName=queue_name)
+            response = await run_io(self.sqs.get_queue_url, QueueName=queue_name)
             return response['QueueUrl']
         except ClientError as e:
             logger.error("Failed to get queue URL", 
@@ -254,7 +513,8 @@ class SQSService:
             if not queue_url:
                 return []
             
-            response = self.sqs.receive_message(
+            response = await run_io(
+                self.sqs.receive_message,
                 QueueUrl=queue_url,
                 MaxNumberOfMessages=max_messages,
                 WaitTimeSeconds=1,
@@ -276,7 +536,8 @@ class SQSService:
             if not queue_url:
                 return False
             
-            self.sqs.delete_message(
+            await run_io(
+                self.sqs.delete_message,
                 QueueUrl=queue_url,
                 ReceiptHandle=receipt_handle
             )
@@ -306,7 +567,7 @@ class SQSService:
             if attributes:
                 params['MessageAttributes'] = attributes
             
-            response = self.sqs.send_message(**params)
+            response = await run_io(self.sqs.send_message, **params)
             
             logger.info("Message sent to SQS", 
                        queue_name=queue_name,
@@ -0,0 +1,273 @@
+"""
+Backfill
+Partitioned, resumable and throttled historical re-aggregation
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import structlog
+
+from .aggregation_engine import PERIODS, RollupEngine, iter_period_starts, period_bounds
+from .rate_limit import RateLimiter
+
+logger = structlog.get_logger(__name__)
+
+# Span of one partition per aggregation period (one task rebuilds every period in its span)
+PARTITION_SPAN = {
+    'minute': 'day',
+    'hour': 'day',
+    'day': 'month',
+    'week': 'week',
+    'month': 'month',
+}
+
+
+def plan_partitions(periods: Iterable[str], start: datetime, end: datetime) -> List[List[Dict[str, str]]]:
+    """
+    Split [start, end) into partitions, grouped into levels that must run
+    in order (minute before hour before day ...); partitions within a level
+    are independent
+    """
+    requested = set(periods)
+    unknown = requested - set(PERIODS)
+    if unknown:
+        raise ValueError(f"Unknown aggregation periods: {sorted(unknown)}")
+
+    levels = []
+    for period in PERIODS:
+        if period not in requested:
+            continue
+        range_start = period_bounds(period, start)[0]
+        range_end = end if period_bounds(period, end)[0] == end else period_bounds(period, end)[1]
+
+        partitions = []
+        for span_start in iter_period_starts(PARTITION_SPAN[period], range_start, range_end):
+            span_end = period_bounds(PARTITION_SPAN[period], span_start)[1]
+            part_start, part_end = max(span_start, range_start), min(span_end, range_end)
+            partitions.append({
+                'id': f"{period}:{part_start.isoformat()}/{part_end.isoformat()}",
+                'period': period,
+                'start': part_start.isoformat(),
+                'end': part_end.isoformat(),
+            })
+        levels.append(partitions)
+    return levels
+
+
+def run_fingerprint(start: datetime, end: datetime, periods: Iterable[str],
+                    from_events: bool = False) -> Dict[str, Any]:
+    """Parameters identifying one backfill run (what its partitions were planned from)"""
+    requested = set(periods)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'periods': [period for period in PERIODS if period in requested],
+        'from_events': from_events,
+    }
+
+
+class Checkpoint:
+    """
+    Completed partitions persisted to a JSON file, so an interrupted run
+    resumes where it stopped. Writes are atomic (temp file + rename).
+    The file records the run it belongs to (see run_fingerprint); loading
+    it for a different run raises ValueError rather than skipping
+    partitions that run never completed.
+    """
+
+    def __init__(self, path: Optional[str] = None, run: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.run = run
+        self.done: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if run is not None and data.get('run') != run:
+                raise ValueError(f"Checkpoint {path} belongs to a different backfill run "
+                                 f"({data.get('run')}); use another checkpoint file or remove it")
+            self.run = data.get('run')
+            self.done = data.get('done', {})
+
+    def is_done(self, partition_id: str) -> bool:
+        return partition_id in self.done
+
+    def mark(self, partition_id: str, stats: Dict[str, Any]) -> None:
+        self.done[partition_id] = stats
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'run': self.run, 'done': self.done,
+                       'updated_at': datetime.now(timezone.utc).isoformat()}, f)
+        os.replace(tmp_path, self.path)
+
+
+# One DynamoDB client per worker process (boto3 clients are not fork-safe)
+_dynamodb = None
+
+
+def _get_dynamodb():
+    global _dynamodb
+    if _dynamodb is None:
+        from .aws_services import DynamoDBService
+        _dynamodb = DynamoDBService()
+    return _dynamodb
+
+
+def run_partition(partition: Dict[str, str], from_events: bool = False,
+                  max_read_units: Optional[float] = None, max_writes: Optional[float] = None,
+                  dynamodb=None) -> Dict[str, Any]:
+    """
+    Rebuild and store every aggregation of one partition
+
+    Minute partitions (and any partition with from_events) are built from
+    one streaming pass over the partition's events; coarser periods are
+    rolled up from the stored level below. Session totals of re-aggregated
+    minutes are carried over from the records they replace, since they
+    cannot be derived from the events of a single minute.
+    """
+    started = time.monotonic()
+    dynamodb = dynamodb or _get_dynamodb()
+    period = partition['period']
+    start = datetime.fromisoformat(partition['start'])
+    end = datetime.fromisoformat(partition['end'])
+
+    read_limiter, write_limiter = RateLimiter(max_read_units), RateLimiter(max_writes)
+    engine = RollupEngine(dynamodb, on_page=read_limiter.on_scan_page if max_read_units else None)
+
+    if period == 'minute' or from_events:
+        states = engine.build_range_from_events(period, start, end)
+        if period == 'minute':
+            for item in dynamodb.get_aggregations(period=period, start_time=start, end_time=end):
+                child_start = item['period_start']
+                if isinstance(child_start, str):
+                    child_start = datetime.fromisoformat(child_start)
+                if child_start in states:
+                    states[child_start].add_session_totals(item.get('session_metrics') or {})
+    else:
+        states = {bucket: engine.build_state(period, bucket) for bucket in iter_period_starts(period, start, end)}
+
+    stored = 0
+    for bucket, state in states.items():
+        write_limiter.acquire()
+        bucket_start, bucket_end = period_bounds(period, bucket)
+        if dynamodb.store_aggregation(state.to_aggregation(period, bucket_start, bucket_end)):
+            stored += 1
+
+    return {
+        'id': partition['id'],
+        'aggregations': stored,
+        'events_read': engine.stats['events_read'],
+        'aggregations_read': engine.stats['aggregations_read'],
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+class ThroughputReporter:
+    """Logs progress, throughput and ETA as partitions complete"""
+
+    def __init__(self, total: int, log: Optional[Callable[..., None]] = None):
+        self.total = total
+        self.completed = 0
+        self.events = 0
+        self.aggregations = 0
+        self.started = time.monotonic()
+        self.log = log or logger.info
+
+    def update(self, stats: Dict[str, Any]) -> None:
+        self.completed += 1
+        self.events += stats.get('events_read', 0)
+        self.aggregations += stats.get('aggregations', 0)
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rate = self.completed / elapsed
+        self.log(
+            "Backfill partition completed",
+            partition=stats['id'],
+            progress=f"{self.completed}/{self.total}",
+            events_per_second=round(self.events / elapsed, 1),
+            aggregations_per_second=round(self.aggregations / elapsed, 1),
+            eta_seconds=round((self.total - self.completed) / rate, 1) if rate else None,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            'partitions': self.completed,
+            'events_read': self.events,
+            'aggregations_written': self.aggregations,
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(self.events / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def run_backfill(start: datetime, end: datetime, periods: Iterable[str] = PERIODS,
+                 executor: str = 'process', workers: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None, from_events: bool = False,
+                 max_read_units: Optional[float] = None, max_writes: Optional[float] = None,
+                 dynamodb=None) -> Dict[str, Any]:
+    """
+    Re-aggregate [start, end) for the given periods
+
+    Levels run in rollup order; the partitions of a level run in parallel
+    on a process pool ('process'), as a Celery group ('celery') or inline
+    ('serial'). Read/write limits are totals, split evenly across workers.
+    With a checkpoint_path, completed partitions are checkpointed and
+    skipped when the same run (range, periods, from_events) is repeated.
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise ValueError("start must be before end")
+
+    workers = workers or os.cpu_count() or 1
+    levels = plan_partitions(periods, start, end)
+    checkpoint = Checkpoint(checkpoint_path, run_fingerprint(start, end, periods, from_events))
+    pending_levels = [[p for p in level if not checkpoint.is_done(p['id'])] for level in levels]
+    reporter = ThroughputReporter(sum(len(level) for level in pending_levels))
+
+    per_worker_reads = max_read_units / workers if max_read_units else None
+    per_worker_writes = max_writes / workers if max_writes else None
+    options = {'from_events': from_events, 'max_read_units': per_worker_reads, 'max_writes': per_worker_writes}
+
+    logger.info("Starting backfill", start=start.isoformat(), end=end.isoformat(),
+                periods=list(periods), executor=executor, workers=workers,
+                partitions=reporter.total, skipped=sum(len(l) for l in levels) - reporter.total)
+
+    for level in pending_levels:
+        if not level:
+            continue
+        for stats in _execute(level, executor, workers, options, dynamodb):
+            checkpoint.mark(stats['id'], stats)
+            reporter.update(stats)
+
+    summary = reporter.summary()
+    logger.info("Backfill completed", **summary)
+    return summary
+
+
+def _execute(partitions: List[Dict[str, str]], executor: str, workers: int,
+             options: Dict[str, Any], dynamodb=None) -> Iterable[Dict[str, Any]]:
+    """Run one level's partitions, yielding their stats as they complete"""
+    if executor == 'serial':
+        for partition in partitions:
+            yield run_partition(partition, dynamodb=dynamodb, **options)
+    elif executor == 'process':
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_partition, partition, **options) for partition in partitions]
+            for future in as_completed(futures):
+                yield future.result()
+    elif executor == 'celery':
+        from celery import group
+        from .background_tasks import backfill_partition
+        result = group(backfill_partition.s(partition, **options) for partition in partitions).apply_async()
+        for child in result.results:
+            yield child.get(disable_sync_subtasks=False)
+    else:
+        raise ValueError(f"Unknown executor: {executor}")
@@ -1,26 +1,36 @@
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
+from collections import Counter
 from uuid import uuid4
 import json
+import math
 import redis
 import os
 
-from celery import Celery, Task
-from celery.signals import task_postrun, task_prerun, celeryd_init
+from celery import Celery, Task, chord
+from celery.signals import task_postrun, task_prerun, celeryd_init, worker_process_init
 from celery.utils.log import get_task_logger
+from celery_batches import Batches, SimpleRequest
 from kombu import Queue, Exchange
-from src.config.settings import Config
+from src.config.settings import Config, get_settings
 from celery.schedules import crontab
 import structlog
 
 from ..models.analytics_models import AnalyticsEvent, AnalyticsAggregation, EventType
 from .aws_services import DynamoDBService, SNSService
+from .aws_clients import init_process
 from .cache_service import CacheService
+from .realtime_metrics import RealtimeTopK, RealtimeUniques, SlidingWindowCounter, time_buckets
+from .aggregation_engine import RollupEngine, ROLLUP_SOURCE, period_bounds, previous_period_start
+from .backfill import run_partition
+from .funnel_engine import FunnelEngine
+from .local_store import get_local_store
+from .sessionizer import RedisSessionStore, SessionMetrics, Sessionizer
 
 # Initialize Celery app with Redis broker and backend
-settings = Config()
+settings = get_settings()
 logger = structlog.get_logger(__name__)
 
 celery_app = Celery(
@@ -58,29 +68,64 @@ celery_app.conf.update(
     task_routes=({
         'src.services.background_tasks.process_event_task': {'queue': 'high_priority'},
         'src.services.background_tasks.process_event_batch_task': {'queue': 'high_priority'},
-        'src.services.background_tasks.generate_hourly_aggregations': {'queue': 'aggregations'},
-        'src.services.background_tasks.generate_daily_aggregations': {'queue': 'aggregations'},
-        'src.services.background_tasks.generate_weekly_aggregations': {'queue': 'aggregations'},
-        'src.services.background_tasks.generate_monthly_aggregations': {'queue': 'aggregations'},
+        'src.services.background_tasks.process_single_event': {'queue': 'high_priority'},
+        'src.services.background_tasks.merge_event_batch_results': {'queue': 'high_priority'},
+        'src.services.background_tasks.generate_periodic_aggregations': {'queue': 'aggregations'},
+        'src.services.background_tasks.close_inactive_sessions': {'queue': 'aggregations'},
+        'src.services.background_tasks.backfill_partition': {'queue': 'aggregations'},
         'src.services.background_tasks.send_notification_task': {'queue': 'notifications'},
-        'src.services.background_tasks.cleanup_old_data_task': {'queue': 'maintenance'},
+        'src.services.background_tasks.cleanup_expired_data': {'queue': 'maintenance'},
         'src.services.background_tasks.cache_warmup_task': {'queue': 'maintenance'},
+        'src.services.background_tasks.export_events_task': {'queue': 'maintenance'},
+        'src.services.background_tasks.prune_local_store': {'queue': 'maintenance'},
+        'src.services.background_tasks.archive_events_task': {'queue': 'maintenance'},
+        'src.services.background_tasks.rehydrate_events_task': {'queue': 'maintenance'},
     }),
 
     # Periodic tasks (Celery Beat)
+    # Rollup hierarchy: minute (raw events) -> hour -> day -> week/month
     beat_schedule={
+        'generate-minute-aggregations': {
+            'task': 'src.services.background_tasks.generate_periodic_aggregations',
+            'schedule': crontab(minute='*'),
+            'kwargs': {'period': 'minute', 'previous_period': True},
+        },
         'generate-hourly-aggregations': {
-            'task': 'src.services.background_tasks.generate_hourly_aggregations',
+            'task': 'src.services.background_tasks.generate_periodic_aggregations',
             'schedule': crontab(minute='5'),
+            'kwargs': {'period': 'hour', 'previous_period': True},
         },
         'generate-daily-aggregations': {
-            'task': 'src.services.background_tasks.generate_daily_aggregations',
+            'task': 'src.services.background_tasks.generate_periodic_aggregations',
             'schedule': crontab(hour='1', minute='0'),
+            'kwargs': {'period': 'day', 'previous_period': True},
+        },
+        'generate-weekly-aggregations': {
+            'task': 'src.services.background_tasks.generate_periodic_aggregations',
+            'schedule': crontab(hour='1', minute='30', day_of_week='monday'),
+            'kwargs': {'period': 'week', 'previous_period': True},
+        },
+        'generate-monthly-aggregations': {
+            'task': 'src.services.background_tasks.generate_periodic_aggregations',
+            'schedule': crontab(hour='2', minute='0', day_of_month='1'),
+            'kwargs': {'period': 'month', 'previous_period': True},
+        },
+        'close-inactive-sessions': {
+            'task': 'src.services.background_tasks.close_inactive_sessions',
+            'schedule': crontab(minute='*'),
         },
         'cleanup-old-data': {
-            'task': 'src.services.background_tasks.cleanup_old_data_task',
+            'task': 'src.services.background_tasks.cleanup_expired_data',
             'schedule': crontab(hour='3', minute='0', day_of_week='sunday'),
         },
+        'archive-cold-events': {
+            'task': 'src.services.background_tasks.archive_events_task',
+            'schedule': crontab(hour='4', minute='0'),
+        },
+        'prune-local-store': {
+            'task': 'src.services.background_tasks.prune_local_store',
+            'schedule': crontab(minute='15'),
+        },
         'cache-warmup-task': {
             'task': 'src.services.background_tasks.cache_warmup_task',
             'schedule': crontab(minute='*/30'),
@@ -122,6 +167,92 @@ class BaseAnalyticsTask(Task):
 # Register base task class
 celery_app.Task = BaseAnalyticsTask
 
+def _process_events(items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+    """
+    Store, publish and fold (event data, correlation id) pairs into the
+    realtime state; returns one outcome per item ({'event_id'} or {'error'})
+    """
+    # Initialize services
+    dynamodb = DynamoDBService()
+    sns = SNSService()
+    cache = CacheService()
+    
+    outcomes = []
+    stored_events = []
+    
+    for event_data, correlation_id in items:
+        try:
+            # Validate and create event object
+            event = AnalyticsEvent(**event_data)
+            
+            # Store in DynamoDB
+            if not dynamodb.store_event(event):
+                raise RuntimeError('Event could not be stored in DynamoDB')
+            
+            outcomes.append({'event_id': event.event_id})
+            stored_events.append(event)
+            
+        except Exception as e:
+            logger.error(f'Failed to process event: {e}', 
+                       extra={'event_data': event_data, 'correlation_id': correlation_id})
+            outcomes.append({'error': str(e)})
+    
+    if stored_events:
+        # Per-user daily event counters, one round trip for the whole batch
+        counters = Counter(f"user_events:{event.user_id}:{event.event_day}" for event in stored_events)
+        cache.increment_many(dict(counters), ttls={key: 86400 for key in counters})
+        
+        # Publish to SNS for real-time processing (concurrently on the AWS I/O executor;
+        # the events are stored already, so a failed publish is logged, not retried)
+        published = asyncio.run(_publish_events(sns, stored_events))
+        if published < len(stored_events):
+            logger.warning(f'{len(stored_events) - published} of {len(stored_events)} events not published to SNS')
+    
+    # Realtime distinct users/sessions (HyperLogLog per time bucket)
+    # and heavy hitters (bounded sorted sets per time bucket)
+    if stored_events:
+        RealtimeUniques(cache).record(stored_events)
+        RealtimeTopK(cache).record(stored_events)
+        
+        # Sessionization: sessions restarted after the inactivity gap end here,
+        # idle ones are closed by close_inactive_sessions
+        started, ended = Sessionizer(RedisSessionStore(cache)).process(stored_events)
+        SessionMetrics(cache).record(started, ended)
+        
+        # Funnel step state per session and per-period step counters
+        FunnelEngine(cache).process(stored_events)
+        
+        # Recent events for ad-hoc queries (optional embedded tier)
+        local_store = get_local_store()
+        if local_store is not None:
+            local_store.ingest(stored_events)
+    
+    # Trigger aggregation updates for processed events
+    processed_events = [outcome['event_id'] for outcome in outcomes if 'event_id' in outcome]
+    if processed_events:
+        update_realtime_aggregations.delay(
+            processed_events, 
+            correlation_id=items[0][1]
+        )
+    
+    return outcomes
+
+async def _publish_events(sns: SNSService, events: List[AnalyticsEvent]) -> int:
+    results = await asyncio.gather(*(sns.publish_analytics_event(event) for event in events))
+    return sum(results)
+
+def _batch_result(items: List[Tuple[Dict[str, Any], str]], outcomes: List[Dict[str, Any]],
+                  correlation_id: str) -> Dict[str, Any]:
+    return {
+        'processed_count': sum(1 for outcome in outcomes if 'event_id' in outcome),
+        'failed_count': sum(1 for outcome in outcomes if 'error' in outcome),
+        'processed_events': [outcome['event_id'] for outcome in outcomes if 'event_id' in outcome],
+        'failed_events': [{'event_data': event_data, 'error': outcome['error']}
+                          for (event_data, _), outcome in zip(items, outcomes) if 'error' in outcome],
+        'correlation_id': correlation_id,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
 @celery_app.task(bind=True, queue='high_priority')
 def process_event_batch(self, events_data: List[Dict[str, Any]], 
                        correlation_id: Optional[str] = None) -> Dict[str, Any]:
@@ -134,55 +265,8 @@ def process_event_batch(self, events_data: List[Dict[str, Any]],
                extra={'correlation_id': correlation_id})
     
     try:
-        # Initialize services
-        dynamodb = DynamoDBService()
-        sns = SNSService()
-        cache = CacheService()
-        
-        processed_events = []
-        failed_events = []
-        
-        for event_data in events_data:
-            try:
-                # Validate and create event object
-                event = AnalyticsEvent(**event_data)
-                
-                # Store in DynamoDB
-                dynamodb.store_event(event)
-                
-                # Update real-time cache
-                cache_key = f"user_events:{event.user_id}:{event.event_day}"
-                cache.increment_counter(cache_key, ttl=86400)
-                
-                # Publish to SNS for real-time processing
-                sns.publish_event(
-                    topic_name='analytics-events',
-                    event=event,
-                    correlation_id=correlation_id
-                )
-                
-                processed_events.append(event.event_id)
-                
-            except Exception as e:
-                logger.error(f'Failed to process event: {e}', 
-                           extra={'event_data': event_data, 'correlation_id': correlation_id})
-                failed_events.append({'event_data': event_data, 'error': str(e)})
-        
-        # Trigger aggregation updates for processed events
-        if processed_events:
-            update_realtime_aggregations.delay(
-                processed_events, 
-                correlation_id=correlation_id
-            )
-        
-        result = {
-            'processed_count': len(processed_events),
-            'failed_count': len(failed_events),
-            'processed_events': processed_events,
-            'failed_events': failed_events,
-            'correlation_id': correlation_id,
-            'timestamp': datetime.now(timezone.utc).isoformat()
-        }
+        items = [(event_data, correlation_id) for event_data in events_data]
+        result = _batch_result(items, _process_events(items), correlation_id)
         
         logger.info(f'Batch processing completed: {result}')
         return result
@@ -192,6 +276,67 @@ def process_event_batch(self, events_data: List[Dict[str, Any]],
                     extra={'correlation_id': correlation_id})
         raise self.retry(countdown=60, exc=e)
 
+@celery_app.task(bind=True, queue='high_priority')
+def merge_event_batch_results(self, results: List[Dict[str, Any]],
+                              correlation_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Chord callback of a batch split into chunks: one result for the whole
+    batch, stored under the task id returned to the client
+    """
+    merged = {
+        'processed_count': sum(result['processed_count'] for result in results),
+        'failed_count': sum(result['failed_count'] for result in results),
+        'processed_events': [event_id for result in results for event_id in result['processed_events']],
+        'failed_events': [failed for result in results for failed in result['failed_events']],
+        'chunks': len(results),
+        'correlation_id': correlation_id,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+    logger.info(f'Chunked batch completed: {merged["processed_count"]} processed, '
+                f'{merged["failed_count"]} failed in {len(results)} chunks',
+                extra={'correlation_id': correlation_id})
+    return merged
+
+@celery_app.task(base=Batches, bind=True, queue='high_priority',
+                 flush_every=settings.EVENT_BATCH_MAX_SIZE, flush_interval=settings.EVENT_BATCH_MAX_WAIT)
+def process_single_event(self, requests: List[SimpleRequest]) -> None:
+    """
+    Single-event tasks (track_event), processed together: the worker buffers
+    them until EVENT_BATCH_MAX_SIZE are queued or EVENT_BATCH_MAX_WAIT
+    seconds have passed, runs the pipeline once for the whole buffer and
+    stores each original task's own result. Every original message is
+    acknowledged once the batch has run (acks_late).
+    
+    Called as process_single_event.delay(event_data, correlation_id).
+    """
+    items = []
+    for request in requests:
+        event_data, *rest = request.args
+        correlation_id = request.kwargs.get('correlation_id') or (rest[0] if rest else None) or str(uuid4())
+        items.append((event_data, correlation_id))
+    logger.info(f'Processing {len(items)} batched single-event tasks')
+    
+    try:
+        outcomes = _process_events(items)
+    except Exception as e:
+        # The original messages are acknowledged regardless: hand the events
+        # to a regular (retrying) batch task and point every original task at
+        # it (get_task_status follows the reference)
+        retry = process_event_batch.apply_async(([event_data for event_data, _ in items], items[0][1]),
+                                                countdown=60)
+        logger.error(f'Batched event processing failed, retrying as task {retry.id}: {e}')
+        for request, (_, correlation_id) in zip(requests, items):
+            self.backend.mark_as_done(request.id, {
+                'retried_as': retry.id,
+                'error': str(e),
+                'correlation_id': correlation_id,
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }, request=request)
+        return
+    
+    for request, item, outcome in zip(requests, items, outcomes):
+        self.backend.mark_as_done(request.id, _batch_result([item], [outcome], item[1]), request=request)
+
 @celery_app.task(bind=True, queue='aggregations')
 def update_realtime_aggregations(self, event_ids: List[str], 
                                 correlation_id: Optional[str] = None) -> Dict[str, Any]:
@@ -205,31 +350,23 @@ def update_realtime_aggregations(self, event_ids: List[str],
         cache = CacheService()
         current_time = datetime.now(timezone.utc)
         
-        # Update various time-based counters
-        time_buckets = {
-            'minute': current_time.strftime('%Y-%m-%d %H:%M'),
-            'hour': current_time.strftime('%Y-%m-%d %H'),
-            'day': current_time.strftime('%Y-%m-%d'),
-        }
-        
-        for period, bucket in time_buckets.items():
-            cache_key = f"events_count:{period}:{bucket}"
-            cache.increment_counter(cache_key, len(event_ids), ttl=86400)
-        
-        # Update dashboard metrics cache
-        dashboard_cache_key = "dashboard:realtime_metrics"
-        current_metrics = cache.get_json(dashboard_cache_key) or {}
-        
-        current_metrics.update({
-            'last_update': current_time.isoformat(),
-            'events_processed_last_minute': current_metrics.get('events_processed_last_minute', 0) + len(event_ids),
-            'total_events_today': current_metrics.get('total_events_today', 0) + len(event_ids),
-        })
-        
-        cache.set_json(dashboard_cache_key, current_metrics, ttl=300)  # 5 minutes TTL
+        # Minute/hour/day bucket counters backing the rolling windows
+        counter = SlidingWindowCounter(cache)
+        counter.record(len(event_ids), now=current_time)
+        buckets = time_buckets(current_time)
+        
+        # Update dashboard metrics atomically (one EVALSHA, today's counters reset daily);
+        # rolling windows are read from the counter at request time, not snapshotted here
+        cache.hash_apply_deltas(
+            "dashboard:realtime_metrics",
+            increments={'total_events_today': len(event_ids)},
+            values={'last_update': current_time.isoformat()},
+            scope=buckets['day'],
+            ttl=2 * 86400
+        )
         
         return {
-            'updated_aggregations': len(time_buckets),
+            'updated_aggregations': len(buckets),
             'event_count': len(event_ids),
             'correlation_id': correlation_id,
             'timestamp': current_time.isoformat()
@@ -242,11 +379,21 @@ def update_realtime_aggregations(self, event_ids: List[str],
 
 @celery_app.task(bind=True, queue='aggregations')
 def generate_periodic_aggregations(self, period: str = 'hour', 
-                                 target_time: Optional[str] = None) -> Dict[str, Any]:
+                                 target_time: Optional[str] = None,
+                                 previous_period: bool = False,
+                                 from_events: bool = False) -> Dict[str, Any]:
     """
-    Generate periodic aggregations (hourly, daily, weekly, monthly)
+    Generate periodic aggregations (minute, hourly, daily, weekly, monthly)
+    
+    Minute aggregations are computed from raw events; every coarser period is
+    rolled up from the stored aggregations of the level below it.
+    With previous_period=True the last fully closed period is aggregated
+    (used by Celery Beat). With from_events=True the period is computed in a
+    single streaming pass over its raw events instead.
     """
     target_datetime = datetime.fromisoformat(target_time) if target_time else datetime.now(timezone.utc)
+    if previous_period:
+        target_datetime = previous_period_start(period, target_datetime)
     logger.info(f'Generating {period} aggregations for {target_datetime}')
     
     try:
@@ -254,63 +401,26 @@ def generate_periodic_aggregations(self, period: str = 'hour',
         cache = CacheService()
         
         # Calculate period boundaries
-        if period == 'hour':
-            period_start = target_datetime.replace(minute=0, second=0, microsecond=0)
-            period_end = period_start + timedelta(hours=1)
-        elif period == 'day':
-            period_start = target_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-            period_end = period_start + timedelta(days=1)
-        elif period == 'week':
-            days_since_monday = target_datetime.weekday()
-            period_start = target_datetime.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_since_monday)
-            period_end = period_start + timedelta(weeks=1)
-        else:  # month
-            period_start = target_datetime.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            next_month = period_start.replace(month=period_start.month + 1) if period_start.month < 12 else period_start.replace(year=period_start.year + 1, month=1)
-            period_end = next_month
-        
-        # Query events for the period
-        events = dynamodb.query_events_by_timerange(period_start, period_end)
+        period_start, period_end = period_bounds(period, target_datetime)
         
-        # Calculate aggregations
-        aggregations = {}
-        for event_type in ['page_view', 'product_view', 'purchase', 'add_to_cart']:
-            type_events = [e for e in events if e.get('event_type') == event_type]
-            aggregations[event_type] = {
-                'total_events': len(type_events),
-                'unique_users': len(set(e.get('user_id') for e in type_events if e.get('user_id'))),
-                'unique_sessions': len(set(e.get('session_id') for e in type_events if e.get('session_id'))),
-            }
-            
-            # Revenue calculations for purchase events
-            if event_type == 'purchase':
-                total_revenue = sum(Decimal(str(e.get('revenue', 0))) for e in type_events if e.get('revenue'))
-                aggregations[event_type]['total_revenue'] = float(total_revenue)
-        
-        # Store aggregation in DynamoDB
-        aggregation = AnalyticsAggregation(
-            period=period,
-            period_start=period_start,
-            period_end=period_end,
-            total_events=len(events),
-            unique_users=len(set(e.get('user_id') for e in events if e.get('user_id'))),
-            unique_sessions=len(set(e.get('session_id') for e in events if e.get('session_id'))),
-            total_revenue=Decimal(str(sum(Decimal(str(e.get('revenue', 0))) for e in events if e.get('revenue')))),
-            conversion_metrics=aggregations
-        )
+        # Fold lower-level aggregations (or raw events for minutes)
+        engine = RollupEngine(dynamodb, session_totals=SessionMetrics(cache).totals)
+        aggregation = engine.build(period, period_start, from_events=from_events)
         
         dynamodb.store_aggregation(aggregation)
         
         # Cache the result
         cache_key = f"aggregation:{period}:{period_start.isoformat()}"
-        cache.set_json(cache_key, aggregation.model_dump(mode='json'), ttl=3600)
+        cache.set_json(cache_key, aggregation.model_dump(mode='json', exclude={'sketches'}), ttl=3600)
         
         return {
             'period': period,
             'period_start': period_start.isoformat(),
             'period_end': period_end.isoformat(),
-            'total_events': len(events),
-            'aggregations': aggregations,
+            'total_events': aggregation.total_events,
+            'aggregations': aggregation.event_type_breakdown,
+            'source': 'events' if from_events else ROLLUP_SOURCE.get(period, 'events'),
+            'rollup_stats': engine.stats,
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
         
@@ -318,6 +428,43 @@ def generate_periodic_aggregations(self, period: str = 'hour',
         logger.error(f'Aggregation generation failed: {e}')
         raise self.retry(countdown=120, exc=e)
 
+@celery_app.task(bind=True, queue='aggregations', max_retries=3)
+def backfill_partition(self, partition: Dict[str, str], from_events: bool = False,
+                       max_read_units: Optional[float] = None,
+                       max_writes: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Re-aggregate one backfill partition (see backfill.py / src.services.backfill)
+    """
+    try:
+        return run_partition(partition, from_events=from_events,
+                             max_read_units=max_read_units, max_writes=max_writes)
+    except Exception as e:
+        logger.error(f'Backfill partition {partition.get("id")} failed: {e}')
+        raise self.retry(countdown=60, exc=e)
+
+@celery_app.task(bind=True, queue='aggregations')
+def close_inactive_sessions(self, limit: int = 10000) -> Dict[str, Any]:
+    """
+    Close sessions idle for longer than the inactivity gap and record their
+    duration, depth and bounce in the current minute's session totals
+    """
+    try:
+        cache = CacheService()
+        current_time = datetime.now(timezone.utc)
+        
+        ended = Sessionizer(RedisSessionStore(cache)).expire(now=current_time, limit=limit)
+        SessionMetrics(cache).record([], ended, now=current_time)
+        
+        return {
+            'closed_sessions': len(ended),
+            'bounces': sum(1 for session in ended if session['bounce']),
+            'timestamp': current_time.isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f'Closing inactive sessions failed: {e}')
+        raise self.retry(countdown=30, exc=e)
+
 @celery_app.task(bind=True, queue='notifications')
 def send_alert_notifications(self, alert_type: str, data: Dict[str, Any], 
                            correlation_id: Optional[str] = None) -> Dict[str, Any]:
@@ -367,33 +514,30 @@ def send_alert_notifications(self, alert_type: str, data: Dict[str, Any],
         raise self.retry(countdown=60, exc=e)
 
 @celery_app.task(bind=True, queue='maintenance')
-def cleanup_expired_data(self, days_to_keep: int = 30) -> Dict[str, Any]:
+def cleanup_expired_data(self, days_to_keep: Optional[int] = None) -> Dict[str, Any]:
     """
-    Clean up expired data from DynamoDB and Redis cache
+    Retention cleanup: make sure TTL is enabled (DynamoDB then expires new
+    items for free) and purge legacy items written without a TTL attribute
+    
+    The purge is throttled to PURGE_MAX_READ_UNITS / PURGE_MAX_WRITE_UNITS
+    so it never competes with ingestion for table capacity. days_to_keep
+    overrides the per-event-type retention policy for all event types.
     """
-    logger.info(f'Starting cleanup of data older than {days_to_keep} days')
+    logger.info('Starting retention cleanup', days_to_keep=days_to_keep)
     
     try:
         dynamodb = DynamoDBService()
-        cache = CacheService()
-        
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
         
-        # Clean up old events
-        deleted_events = dynamodb.delete_events_before_date(cutoff_date)
-        
-        # Clean up old aggregations (keep longer)
-        aggregation_cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep * 2)
-        deleted_aggregations = dynamodb.delete_aggregations_before_date(aggregation_cutoff)
-        
-        # Clean up expired cache keys
-        expired_keys = cache.cleanup_expired_keys()
+        ttl_status = dynamodb.enable_ttl()
+        events = dynamodb.purge_expired_events(days_to_keep)
+        aggregations = dynamodb.purge_expired_aggregations()
         
         result = {
-            'deleted_events': deleted_events,
-            'deleted_aggregations': deleted_aggregations,
-            'expired_cache_keys': expired_keys,
-            'cutoff_date': cutoff_date.isoformat(),
+            'ttl_status': ttl_status,
+            'deleted_events': events['deleted'],
+            'scanned_events': events['scanned'],
+            'deleted_aggregations': aggregations['deleted'],
+            'scanned_aggregations': aggregations['scanned'],
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
         
@@ -404,6 +548,86 @@ def cleanup_expired_data(self, days_to_keep: int = 30) -> Dict[str, Any]:
         logger.error(f'Cleanup failed: {e}')
         raise self.retry(countdown=300, exc=e)
 
+@celery_app.task(bind=True, queue='maintenance')
+def export_events_task(self, start_time: str, end_time: str,
+                       event_types: Optional[List[str]] = None,
+                       output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Export raw events of [start_time, end_time) to Parquet files partitioned
+    by event_day and event_type (see src.services.event_export)
+    """
+    from .event_export import export_events
+    
+    try:
+        return export_events(DynamoDBService(), datetime.fromisoformat(start_time),
+                             datetime.fromisoformat(end_time), event_types=event_types,
+                             output_dir=output_dir)
+    except Exception as e:
+        logger.error(f'Event export failed: {e}')
+        raise self.retry(countdown=300, exc=e)
+
+@celery_app.task(bind=True, queue='maintenance')
+def archive_events_task(self) -> Dict[str, Any]:
+    """
+    Move events older than the hot window into compressed archive segments
+    (see src.services.archive)
+    """
+    if not Config.ARCHIVE_ENABLED:
+        return {'enabled': False}
+    
+    from .archive import EventArchiver
+    
+    try:
+        return EventArchiver(DynamoDBService()).run()
+    except Exception as e:
+        logger.error(f'Event archival failed: {e}')
+        raise self.retry(countdown=600, exc=e)
+
+@celery_app.task(bind=True, queue='maintenance')
+def rehydrate_events_task(self, start_time: str, end_time: str,
+                          event_types: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Restore archived events of [start_time, end_time) into the events table
+    """
+    from .archive import rehydrate_events
+    
+    try:
+        return rehydrate_events(DynamoDBService(), datetime.fromisoformat(start_time),
+                                datetime.fromisoformat(end_time), event_types=event_types)
+    except Exception as e:
+        logger.error(f'Event rehydration failed: {e}')
+        raise self.retry(countdown=300, exc=e)
+
+@celery_app.task(bind=True, queue='maintenance')
+def prune_local_store(self) -> Dict[str, Any]:
+    """
+    Drop events older than the retention window from the local query store
+    """
+    local_store = get_local_store()
+    if local_store is None:
+        return {'enabled': False}
+    
+    try:
+        deleted = local_store.prune()
+        return {
+            'enabled': True,
+            'deleted_events': deleted,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error(f'Local store pruning failed: {e}')
+        raise self.retry(countdown=300, exc=e)
+
+def batching_prefetch_multiplier(concurrency: int) -> int:
+    """
+    Prefetch multiplier of a worker consuming batched single-event tasks:
+    they wait unacknowledged in the worker's buffer, so its prefetch has to
+    hold a full batch (and the next one filling while it runs)
+    """
+    if not settings.EVENT_BATCHING_ENABLED:
+        return 1
+    return max(1, math.ceil(2 * settings.EVENT_BATCH_MAX_SIZE / max(1, concurrency)))
+
 # Signal handlers for monitoring and logging
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, **kwds):
@@ -429,9 +653,15 @@ def configure_worker(sender=None, conf=None, **kwargs):
         conf.worker_prefetch_multiplier = 2
         conf.task_default_rate_limit = '50/m'
     elif 'priority' in hostname:
-        conf.worker_prefetch_multiplier = 1
+        conf.worker_prefetch_multiplier = batching_prefetch_multiplier(
+            (kwargs.get('options') or {}).get('concurrency') or os.cpu_count())
         conf.task_default_rate_limit = '200/m'
 
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Build this pool process's shared AWS clients (none may be inherited across the fork)"""
+    init_process()
+
 # Helper functions for easy task dispatching
 class BackgroundTaskManager:
     """Manager class for dispatching background tasks"""
@@ -439,15 +669,30 @@ class BackgroundTaskManager:
     @staticmethod
     def process_events_async(events: List[Dict[str, Any]], 
                            correlation_id: Optional[str] = None) -> str:
-        """Dispatch event processing task"""
-        result = process_event_batch.delay(events, correlation_id)
+        """
+        Dispatch event processing: single events are batched on the worker,
+        batches larger than EVENT_BATCH_CHUNK_SIZE are split into chunks
+        processed in parallel (a chord whose callback merges their results
+        under the returned task id)
+        """
+        chunk_size = settings.EVENT_BATCH_CHUNK_SIZE
+        if len(events) == 1 and settings.EVENT_BATCHING_ENABLED:
+            result = process_single_event.delay(events[0], correlation_id)
+        elif chunk_size and len(events) > chunk_size:
+            chunks = [events[i:i + chunk_size] for i in range(0, len(events), chunk_size)]
+            result = chord(
+                process_event_batch.s(chunk, correlation_id) for chunk in chunks
+            )(merge_event_batch_results.s(correlation_id))
+        else:
+            result = process_event_batch.delay(events, correlation_id)
         return result.id
     
     @staticmethod
     def generate_aggregations_async(period: str, 
-                                  target_time: Optional[str] = None) -> str:
+                                  target_time: Optional[str] = None,
+                                  from_events: bool = False) -> str:
         """Dispatch aggregation generation task"""
-        result = generate_periodic_aggregations.delay(period, target_time)
+        result = generate_periodic_aggregations.delay(period, target_time, from_events=from_events)
         return result.id
     
     @staticmethod
@@ -458,15 +703,32 @@ class BackgroundTaskManager:
         return result.id
     
     @staticmethod
-    def cleanup_data_async(days_to_keep: int = 30) -> str:
+    def cleanup_data_async(days_to_keep: Optional[int] = None) -> str:
         """Dispatch data cleanup task"""
         result = cleanup_expired_data.delay(days_to_keep)
         return result.id
     
+    @staticmethod
+    def export_events_async(start_time: str, end_time: str,
+                            event_types: Optional[List[str]] = None) -> str:
+        """Dispatch Parquet event export task"""
+        result = export_events_task.delay(start_time, end_time, event_types)
+        return result.id
+    
+    @staticmethod
+    def rehydrate_events_async(start_time: str, end_time: str,
+                               event_types: Optional[List[str]] = None) -> str:
+        """Dispatch archive rehydration task"""
+        result = rehydrate_events_task.delay(start_time, end_time, event_types)
+        return result.id
+    
     @staticmethod
     def get_task_status(task_id: str) -> Dict[str, Any]:
-        """Get task status and result"""
+        """Get task status and result (of the retry task, for batched events handed to one)"""
         result = celery_app.AsyncResult(task_id)
+        if result.ready() and isinstance(result.result, dict) and result.result.get('retried_as'):
+            retry_id = result.result['retried_as']
+            return {**BackgroundTaskManager.get_task_status(retry_id), 'task_id': task_id, 'retried_as': retry_id}
         return {
             'task_id': task_id,
             'status': result.status,
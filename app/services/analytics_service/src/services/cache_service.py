@@ -4,36 +4,106 @@ Redis-based caching for Analytics Service
 """
 
 import json
+import os
+import threading
 import redis
 import structlog
-from typing import Any, Optional
-from src.config.settings import Config
+from typing import Any, Dict, Optional
+from src.config.settings import get_settings
 
 logger = structlog.get_logger(__name__)
 
+# Atomically apply counter deltas and field values to a hash.
+# KEYS[1]: hash key
+# ARGV: ttl, scope, number of increments, increment field/amount pairs, then field/value pairs to set
+# When scope is given and differs from the stored one (e.g. a new day), the hash is reset first.
+HASH_DELTAS_LUA = """
+local key = KEYS[1]
+local ttl = tonumber(ARGV[1])
+local scope = ARGV[2]
+local n_incr = tonumber(ARGV[3])
+
+if scope ~= '' and redis.call('HGET', key, '_scope') ~= scope then
+    redis.call('DEL', key)
+    redis.call('HSET', key, '_scope', scope)
+end
+
+local i = 4
+for _ = 1, n_incr do
+    local field, amount = ARGV[i], ARGV[i + 1]
+    if string.find(amount, '[.eE]') then
+        redis.call('HINCRBYFLOAT', key, field, amount)
+    else
+        redis.call('HINCRBY', key, field, amount)
+    end
+    i = i + 2
+end
+
+while i < #ARGV do
+    redis.call('HSET', key, ARGV[i], ARGV[i + 1])
+    i = i + 2
+end
+
+if ttl > 0 then
+    redis.call('EXPIRE', key, ttl)
+end
+return redis.call('HGETALL', key)
+"""
+
+# One connection-pooled client per Redis URL and process, shared by every CacheService
+_redis_clients: Dict[str, redis.Redis] = {}
+_redis_clients_pid = os.getpid()
+_redis_clients_lock = threading.Lock()
+
+
+def get_redis_client(url: str) -> redis.Redis:
+    """
+    Shared Redis client of a URL, connected and with the Lua scripts loaded
+    (once per process, so constructing a CacheService per task is free)
+    """
+    global _redis_clients_pid
+    with _redis_clients_lock:
+        if _redis_clients_pid != os.getpid():
+            # Pooled connections must not cross a fork
+            _redis_clients.clear()
+            _redis_clients_pid = os.getpid()
+        client = _redis_clients.get(url)
+        if client is None:
+            client = redis.Redis.from_url(
+                url,
+                decode_responses=True,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+                socket_keepalive=True,
+                retry_on_timeout=True
+            )
+            
+            # Test connection
+            client.ping()
+            
+            # Preload Lua scripts so hot paths only send EVALSHA
+            # (redis-py reloads them transparently after a SCRIPT FLUSH)
+            client.script_load(HASH_DELTAS_LUA)
+            _redis_clients[url] = client
+            logger.info("Redis cache service initialized", url=url)
+        return client
+
 
 class CacheService:
     """Redis cache service"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = get_settings()
         self._redis_client = None
+        self._hash_deltas_script = None
+        self._scripts = {}
         self._initialize_redis()
     
     def _initialize_redis(self):
         """Initialize Redis connection"""
         try:
-            self._redis_client = redis.Redis.from_url(
-                self.config.REDIS_URL,
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True
-            )
-            
-            # Test connection
-            self._redis_client.ping()
-            logger.info("Redis cache service initialized", url=self.config.REDIS_URL)
+            self._redis_client = get_redis_client(self.config.REDIS_URL)
+            self._hash_deltas_script = self._redis_client.register_script(HASH_DELTAS_LUA)
             
         except redis.RedisError as e:
             logger.error("Failed to initialize Redis cache", error=str(e))
@@ -89,6 +159,15 @@ class CacheService:
             logger.error("Unexpected error setting cache", key=key, error=str(e))
             return False
     
+    def get_json(self, key: str) -> Optional[Any]:
+        """Get a JSON document (dict or list) from cache; None when missing or not JSON"""
+        value = self.get(key)
+        return value if isinstance(value, (dict, list)) else None
+    
+    def set_json(self, key: str, value: Any, ttl: int = None) -> bool:
+        """Store a JSON document (datetimes and Decimals are serialized as strings)"""
+        return self.set(key, json.dumps(value, default=str), ttl=ttl)
+    
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
         if not self._redis_client:
@@ -105,6 +184,21 @@ class CacheService:
             logger.error("Unexpected error deleting from cache", key=key, error=str(e))
             return False
     
+    def delete_many(self, keys: list) -> int:
+        """Delete several keys in one call; returns how many existed"""
+        if not self._redis_client or not keys:
+            return 0
+        
+        try:
+            return int(self._redis_client.delete(*keys))
+            
+        except redis.RedisError as e:
+            logger.error("Failed to delete from cache", keys=keys, error=str(e))
+            return 0
+        except Exception as e:
+            logger.error("Unexpected error deleting from cache", keys=keys, error=str(e))
+            return 0
+    
     def exists(self, key: str) -> bool:
         """Check if key exists in cache"""
         if not self._redis_client:
@@ -150,6 +244,249 @@ class CacheService:
             logger.error("Unexpected error setting cache expiration", key=key, error=str(e))
             return False
     
+    def increment_many(self, mapping: dict, ttls: dict = None) -> bool:
+        """INCRBY several counters in one round trip, setting per-key TTLs"""
+        if not self._redis_client or not mapping:
+            return False
+        
+        try:
+            pipe = self._redis_client.pipeline(transaction=False)
+            for key, amount in mapping.items():
+                pipe.incrby(key, amount)
+                if ttls and key in ttls:
+                    pipe.expire(key, ttls[key])
+            pipe.execute()
+            return True
+            
+        except redis.RedisError as e:
+            logger.error("Failed to increment cache counters", keys=list(mapping.keys()), error=str(e))
+            return False
+        except Exception as e:
+            logger.error("Unexpected error incrementing cache counters", keys=list(mapping.keys()), error=str(e))
+            return False
+    
+    def hash_apply_deltas(self, key: str, increments: dict, values: dict = None,
+                          scope: str = None, ttl: int = None) -> dict:
+        """
+        Apply counter increments and field values to a hash in one atomic
+        server-side call (EVALSHA); returns the updated hash. With scope, the
+        hash is reset whenever the scope changes (e.g. per-day counters).
+        """
+        if not self._redis_client or not self._hash_deltas_script:
+            return {}
+        
+        try:
+            args = [ttl or 0, scope or '', len(increments)]
+            for field, amount in increments.items():
+                args.extend((field, amount))
+            for field, value in (values or {}).items():
+                args.extend((field, value if isinstance(value, str) else json.dumps(value, default=str)))
+            
+            result = self._hash_deltas_script(keys=[key], args=args)
+            return dict(zip(result[::2], result[1::2]))
+            
+        except redis.RedisError as e:
+            logger.error("Failed to apply hash deltas", key=key, error=str(e))
+            return {}
+        except Exception as e:
+            logger.error("Unexpected error applying hash deltas", key=key, error=str(e))
+            return {}
+    
+    def run_script(self, source: str, keys: list, args: list) -> Optional[Any]:
+        """
+        Run a Lua script atomically (EVALSHA, the script is loaded on first
+        use); returns its reply, or None when Redis is unavailable or the
+        script fails
+        """
+        if not self._redis_client:
+            return None
+        
+        try:
+            script = self._scripts.get(source)
+            if script is None:
+                script = self._scripts[source] = self._redis_client.register_script(source)
+            return script(keys=keys, args=args)
+            
+        except redis.RedisError as e:
+            logger.error("Failed to run Lua script", keys=keys[:10], error=str(e))
+            return None
+        except Exception as e:
+            logger.error("Unexpected error running Lua script", keys=keys[:10], error=str(e))
+            return None
+    
+    def hash_get_many(self, keys: list, fields: list) -> list:
+        """HMGET the same fields from several hashes in one round trip; a {field: value} dict per key"""
+        if not self._redis_client or not keys or not fields:
+            return []
+        
+        try:
+            pipe = self._redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, fields)
+            return [
+                {field: value for field, value in zip(fields, values) if value is not None}
+                for values in pipe.execute()
+            ]
+            
+        except redis.RedisError as e:
+            logger.error("Failed to read hashes", keys=keys[:10], error=str(e))
+            return []
+        except Exception as e:
+            logger.error("Unexpected error reading hashes", keys=keys[:10], error=str(e))
+            return []
+    
+    def hll_add(self, key: str, values: list, ttl: int = None) -> bool:
+        """Add values to a HyperLogLog (PFADD) with optional TTL"""
+        if not self._redis_client or not values:
+            return False
+        
+        try:
+            pipe = self._redis_client.pipeline(transaction=False)
+            pipe.pfadd(key, *values)
+            if ttl:
+                pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+            
+        except redis.RedisError as e:
+            logger.error("Failed to add to HyperLogLog", key=key, error=str(e))
+            return False
+        except Exception as e:
+            logger.error("Unexpected error adding to HyperLogLog", key=key, error=str(e))
+            return False
+    
+    def hll_count(self, keys: list) -> int:
+        """Estimated cardinality of the union of HyperLogLogs (PFCOUNT)"""
+        if not self._redis_client or not keys:
+            return 0
+        
+        try:
+            return int(self._redis_client.pfcount(*keys))
+            
+        except redis.RedisError as e:
+            logger.error("Failed to count HyperLogLog", keys=keys, error=str(e))
+            return 0
+        except Exception as e:
+            logger.error("Unexpected error counting HyperLogLog", keys=keys, error=str(e))
+            return 0
+    
+    def hll_merge(self, dest_key: str, source_keys: list, ttl: int = None) -> bool:
+        """Merge HyperLogLogs into dest_key (PFMERGE) with optional TTL"""
+        if not self._redis_client or not source_keys:
+            return False
+        
+        try:
+            pipe = self._redis_client.pipeline(transaction=False)
+            pipe.pfmerge(dest_key, *source_keys)
+            if ttl:
+                pipe.expire(dest_key, ttl)
+            pipe.execute()
+            return True
+            
+        except redis.RedisError as e:
+            logger.error("Failed to merge HyperLogLogs", dest_key=dest_key, error=str(e))
+            return False
+        except Exception as e:
+            logger.error("Unexpected error merging HyperLogLogs", dest_key=dest_key, error=str(e))
+            return False
+    
+    def zset_add(self, key: str, mapping: dict, ttl: int = None) -> bool:
+        """ZADD members with their scores (existing scores are overwritten)"""
+        if not self._redis_client or not mapping:
+            return False
+        
+        try:
+            pipe = self._redis_client.pipeline(transaction=False)
+            pipe.zadd(key, mapping)
+            if ttl:
+                pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+            
+        except redis.RedisError as e:
+            logger.error("Failed to add to sorted set", key=key, error=str(e))
+            return False
+        except Exception as e:
+            logger.error("Unexpected error adding to sorted set", key=key, error=str(e))
+            return False
+    
+    def zset_range_by_score(self, key: str, max_score: float, limit: int = 1000) -> list:
+        """Up to `limit` members scored <= max_score, lowest first"""
+        if not self._redis_client:
+            return []
+        
+        try:
+            return self._redis_client.zrangebyscore(key, '-inf', max_score, start=0, num=limit)
+            
+        except redis.RedisError as e:
+            logger.error("Failed to read sorted set", key=key, error=str(e))
+            return []
+        except Exception as e:
+            logger.error("Unexpected error reading sorted set", key=key, error=str(e))
+            return []
+    
+    def zset_pop_by_score(self, key: str, max_score: float, limit: int = 1000) -> list:
+        """
+        Remove and return up to `limit` members scored <= max_score.
+        Members removed concurrently by another caller are not returned,
+        so each member is claimed by exactly one caller.
+        """
+        if not self._redis_client:
+            return []
+        
+        try:
+            members = self._redis_client.zrangebyscore(key, '-inf', max_score, start=0, num=limit)
+            if not members:
+                return []
+            pipe = self._redis_client.pipeline(transaction=False)
+            for member in members:
+                pipe.zrem(key, member)
+            return [member for member, removed in zip(members, pipe.execute()) if removed]
+            
+        except redis.RedisError as e:
+            logger.error("Failed to pop from sorted set", key=key, error=str(e))
+            return []
+        except Exception as e:
+            logger.error("Unexpected error popping from sorted set", key=key, error=str(e))
+            return []
+    
+    def zset_count(self, key: str, min_score: float = '-inf', max_score: float = '+inf') -> int:
+        """Number of members scored within [min_score, max_score]"""
+        if not self._redis_client:
+            return 0
+        
+        try:
+            return self._redis_client.zcount(key, min_score, max_score)
+            
+        except redis.RedisError as e:
+            logger.error("Failed to count sorted set", key=key, error=str(e))
+            return 0
+        except Exception as e:
+            logger.error("Unexpected error counting sorted set", key=key, error=str(e))
+            return 0
+    
+    def zset_top(self, keys: list, k: int, union_key: str = None, ttl: int = None) -> list:
+        """Top-k (member, score) pairs of a sorted set or of the union of several"""
+        if not self._redis_client or not keys:
+            return []
+        
+        try:
+            key = keys[0]
+            if len(keys) > 1:
+                key = union_key or f"zunion:{':'.join(keys)}"
+                pipe = self._redis_client.pipeline(transaction=False)
+                pipe.zunionstore(key, keys)
+                pipe.expire(key, ttl or 60)
+                pipe.execute()
+            return self._redis_client.zrevrange(key, 0, k - 1, withscores=True)
+            
+        except redis.RedisError as e:
+            logger.error("Failed to read sorted set", keys=keys, error=str(e))
+            return []
+        except Exception as e:
+            logger.error("Unexpected error reading sorted set", keys=keys, error=str(e))
+            return []
+    
     def get_many(self, keys: list) -> dict:
         """Get multiple values from cache"""
         if not self._redis_client:
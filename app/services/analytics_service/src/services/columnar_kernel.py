@@ -0,0 +1,311 @@
+"""
+Columnar Aggregation Kernel
+Vectorized NumPy aggregation of event batches (used for large periods and re-aggregation)
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from .aggregation_engine import (
+    AggregateState, HEAVY_HITTER_DIMENSIONS, TRACKED_EVENT_TYPES, _to_decimal, event_latency
+)
+from .sketches import DDSketch, HyperLogLog, hash64
+
+DEFAULT_BATCH_SIZE = 50000
+
+# Distinct labels whose hashes are kept between batches (bounds aggregator memory)
+HASH_CACHE_SIZE = 1_000_000
+
+# Integer sums computed through float64 bincount are exact below this bound
+_EXACT_FLOAT_LIMIT = 2 ** 53
+
+# Cent amounts rounded in float64 are exact below this bound, unless they sit on a half-cent tie
+_EXACT_CENTS_LIMIT = 2 ** 40
+_TIE_TOLERANCE = 2 ** -9
+
+
+def encode_categorical(values: Iterable[Optional[str]]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode values to int32 codes; missing values get code -1"""
+    values = values if isinstance(values, list) else list(values)
+    try:
+        encoded = pa.array(values, type=pa.string()).dictionary_encode()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Non-string labels (e.g. numeric ids) are encoded in Python
+        index: Dict[str, int] = {}
+        codes = np.fromiter((index.setdefault(v, len(index)) if v else -1 for v in values),
+                            dtype=np.int32, count=len(values))
+        return codes, list(index)
+    codes = encoded.indices.fill_null(-1).to_numpy().astype(np.int32)
+    labels = encoded.dictionary.to_pylist()
+    if '' in labels:
+        empty = labels.index('')
+        codes[codes == empty] = -1
+        codes[codes > empty] -= 1
+        del labels[empty]
+    return codes, labels
+
+
+def to_cents(value: Any) -> int:
+    """Exact integer cents, rounded the same way as the Python aggregation path"""
+    if not value:
+        return 0
+    return int(_to_decimal(value) * 100)
+
+
+def to_cents_array(values: Sequence[Any]) -> np.ndarray:
+    """
+    Vectorized to_cents for a revenue column
+
+    Amounts are rounded half-even in float64, like Decimal.quantize. The few
+    rows where float64 could round differently (half-cent ties, very large
+    amounts) are converted exactly with to_cents.
+    """
+    amounts = np.fromiter((float(v) if v else 0.0 for v in values), dtype=np.float64, count=len(values))
+    scaled = amounts * 100
+    cents = np.rint(scaled).astype(np.int64)
+    inexact = ((np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < _TIE_TOLERANCE)
+               | (np.abs(scaled) >= _EXACT_CENTS_LIMIT))
+    for i in np.flatnonzero(inexact).tolist():
+        cents[i] = to_cents(values[i])
+    return cents
+
+
+def grouped_counts(codes: np.ndarray, n_groups: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Number of rows per group code (rows with code -1 are ignored)"""
+    valid = codes >= 0
+    if mask is not None:
+        valid &= mask
+    return np.bincount(codes[valid], minlength=n_groups).astype(np.int64)
+
+
+def grouped_sums(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Exact int64 sum of values per group code"""
+    valid = codes >= 0
+    codes, values = codes[valid], values[valid]
+    if int(np.abs(values).sum()) < _EXACT_FLOAT_LIMIT:
+        return np.bincount(codes, weights=values, minlength=n_groups).astype(np.int64)
+    sums = np.zeros(n_groups, dtype=np.int64)
+    np.add.at(sums, codes, values)
+    return sums
+
+
+def time_histogram(epoch_seconds: np.ndarray, start: int, bin_seconds: int, n_bins: int) -> np.ndarray:
+    """Row counts per fixed-width time bin starting at start (epoch seconds)"""
+    bins = (epoch_seconds - start) // bin_seconds
+    in_range = (bins >= 0) & (bins < n_bins)
+    return np.bincount(bins[in_range], minlength=n_bins).astype(np.int64)
+
+
+def hash_labels(labels: Sequence[str], cache: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """Stable 64-bit hashes of dictionary labels (same hash as HyperLogLog.add)"""
+    if cache is None:
+        return np.fromiter((hash64(str(label)) for label in labels), dtype=np.uint64, count=len(labels))
+
+    def cached_hash(label: str) -> int:
+        value = cache.get(label)
+        if value is None:
+            value = hash64(str(label))
+            if len(cache) < HASH_CACHE_SIZE:
+                cache[label] = value
+        return value
+
+    return np.fromiter((cached_hash(label) for label in labels), dtype=np.uint64, count=len(labels))
+
+
+def _bit_length_u64(x: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length() for uint64 arrays"""
+    x = x.copy()
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        length += high * shift
+        x = np.where(high, x >> np.uint64(shift), x)
+    return length + (x > 0)
+
+
+def hll_add_hashes(sketch: HyperLogLog, hashes: np.ndarray) -> None:
+    """Vectorized HyperLogLog.add for precomputed 64-bit hashes"""
+    if not len(hashes):
+        return
+    p = sketch.precision
+    registers = np.frombuffer(sketch.registers, dtype=np.uint8)
+    index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+    remaining = hashes & np.uint64((1 << (64 - p)) - 1)
+    rank = ((64 - p) + 1 - _bit_length_u64(remaining)).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+
+
+def ddsketch_add_values(sketch: DDSketch, values: np.ndarray) -> None:
+    """Vectorized DDSketch.add for a float array (NaN entries are skipped)"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return
+    positive = values[values > 0]
+    keys, counts = np.unique(np.ceil(np.log(positive) / sketch.log_gamma).astype(np.int64),
+                             return_counts=True)
+    sketch.add_bins(
+        dict(zip(keys.tolist(), counts.tolist())),
+        count=len(values),
+        total=float(values.sum()),
+        low=float(values.min()),
+        high=float(values.max()),
+        zero_count=len(values) - len(positive),
+    )
+
+
+class ColumnarBatch:
+    """
+    A batch of events in columnar form
+
+    Categorical columns are int32 dictionary codes (-1 = missing), revenue
+    is int64 cents, time is int64 epoch seconds and api_call latency is
+    float64 milliseconds (NaN for other events).
+    """
+
+    def __init__(self, events: Sequence[Dict[str, Any]] = ()):
+        self._events = events
+        self._categorical: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        self.size = len(events)
+        self.event_type_codes, self.event_types = encode_categorical(
+            [e.get('event_type') or 'custom' for e in events])
+        self.user_codes, self.users = encode_categorical([e.get('user_id') for e in events])
+        self.session_codes, self.sessions = encode_categorical([e.get('session_id') for e in events])
+        revenues = [e.get('revenue') for e in events]
+        self.revenue_cents = to_cents_array(revenues)
+        self.has_revenue = np.fromiter(map(bool, revenues), dtype=bool, count=self.size)
+
+    @classmethod
+    def from_arrays(cls, event_type_codes: np.ndarray, event_types: List[str],
+                    user_codes: np.ndarray, users: List[str],
+                    session_codes: np.ndarray, sessions: List[str],
+                    revenue_cents: np.ndarray, has_revenue: Optional[np.ndarray] = None,
+                    epoch_seconds: Optional[np.ndarray] = None,
+                    latency_ms: Optional[np.ndarray] = None,
+                    categorical: Optional[Dict[str, Tuple[np.ndarray, List[str]]]] = None) -> 'ColumnarBatch':
+        """
+        Build a batch from already-columnar data (e.g. dictionary-encoded
+        Parquet/Arrow columns), skipping the per-event conversion entirely
+        """
+        batch = cls()
+        batch.size = len(event_type_codes)
+        batch.event_type_codes, batch.event_types = event_type_codes, event_types
+        batch.user_codes, batch.users = user_codes, users
+        batch.session_codes, batch.sessions = session_codes, sessions
+        batch.revenue_cents = revenue_cents
+        batch.has_revenue = has_revenue if has_revenue is not None else revenue_cents != 0
+        batch._categorical = dict(categorical or {})
+        if epoch_seconds is not None:
+            batch.epoch_seconds = epoch_seconds
+        batch.latency_ms = latency_ms if latency_ms is not None else np.full(batch.size, np.nan)
+        return batch
+
+    def categorical(self, column: str) -> Tuple[np.ndarray, List[str]]:
+        """Dictionary-encoded codes and labels of a column (e.g. country, category), encoded on first use"""
+        if column not in self._categorical:
+            self._categorical[column] = encode_categorical([e.get(column) for e in self._events])
+        return self._categorical[column]
+
+    @cached_property
+    def latency_ms(self) -> np.ndarray:
+        latency = np.full(self.size, np.nan)
+        if 'api_call' in self.event_types:
+            # Only api_call events report latency; the other rows stay NaN
+            rows = np.flatnonzero(self.event_type_codes == self.event_types.index('api_call'))
+            latencies = (event_latency(self._events[i]) for i in rows.tolist())
+            latency[rows] = np.fromiter((np.nan if v is None else v for v in latencies),
+                                        dtype=np.float64, count=len(rows))
+        return latency
+
+    @cached_property
+    def epoch_seconds(self) -> np.ndarray:
+        def epoch(ts) -> int:
+            if isinstance(ts, str):
+                ts = datetime.fromisoformat(ts)
+            return int(ts.timestamp())
+        return np.fromiter((epoch(e['timestamp']) for e in self._events),
+                           dtype=np.int64, count=self.size)
+
+
+class ColumnarAggregator:
+    """
+    Folds event batches into an AggregateState with vectorized operations
+
+    Produces exactly the same counts, revenue totals and HyperLogLog
+    registers as AggregateState.add_event, so both paths can feed the same
+    rollups. Heavy hitters are offered as per-batch grouped counts, which is
+    equivalent within the Space-Saving error bounds; revenue and latency
+    quantile sketches are bucketed in bulk. Events are processed in
+    fixed-size batches to bound memory.
+    """
+
+    def __init__(self, state: Optional[AggregateState] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.state = state or AggregateState()
+        self.batch_size = batch_size
+        self._hash_cache: Dict[str, int] = {}
+
+    def update(self, batch: ColumnarBatch) -> None:
+        state = self.state
+        n_types = len(batch.event_types)
+        type_codes = batch.event_type_codes
+
+        counts = grouped_counts(type_codes, n_types)
+        cents = grouped_sums(type_codes, batch.revenue_cents, n_types)
+        has_revenue = grouped_counts(type_codes, n_types, mask=batch.has_revenue) > 0
+
+        state.total_events += batch.size
+        state.total_revenue += Decimal(int(cents.sum())).scaleb(-2)
+        for code, event_type in enumerate(batch.event_types):
+            state.event_counts[event_type] = state.event_counts.get(event_type, 0) + int(counts[code])
+            if has_revenue[code]:
+                state.event_revenue[event_type] = (
+                    state.event_revenue.get(event_type, Decimal('0')) + Decimal(int(cents[code])).scaleb(-2)
+                )
+
+        # Uniques: hash each distinct label once, then update registers vectorized
+        user_hashes = hash_labels(batch.users, self._hash_cache)
+        session_hashes = hash_labels(batch.sessions, self._hash_cache)
+        hll_add_hashes(state.users, user_hashes)
+        hll_add_hashes(state.sessions, session_hashes)
+
+        for code, event_type in enumerate(batch.event_types):
+            if event_type not in TRACKED_EVENT_TYPES:
+                continue
+            rows = type_codes == code
+            users = np.unique(batch.user_codes[rows & (batch.user_codes >= 0)])
+            sessions = np.unique(batch.session_codes[rows & (batch.session_codes >= 0)])
+            hll_add_hashes(state.type_users.setdefault(event_type, HyperLogLog()), user_hashes[users])
+            hll_add_hashes(state.type_sessions.setdefault(event_type, HyperLogLog()), session_hashes[sessions])
+
+        # Quantiles: bucket revenue and latency values in bulk
+        ddsketch_add_values(state.distributions['revenue'],
+                            batch.revenue_cents[batch.has_revenue] / 100)
+        ddsketch_add_values(state.distributions['latency_ms'], batch.latency_ms)
+
+        # Heavy hitters: exact per-batch counts offered as weighted updates
+        for dimension, (field, _) in HEAVY_HITTER_DIMENSIONS.items():
+            codes, labels = batch.categorical(field)
+            if not labels:
+                continue
+            summary = state.heavy_hitters[dimension]
+            for label, count in zip(labels, grouped_counts(codes, len(labels)).tolist()):
+                summary.offer(label, count)
+
+    def consume(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Fold an event stream in batches of batch_size; returns the number consumed"""
+        consumed = 0
+        batch: List[Dict[str, Any]] = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                self.update(ColumnarBatch(batch))
+                consumed += len(batch)
+                batch = []
+        if batch:
+            self.update(ColumnarBatch(batch))
+            consumed += len(batch)
+        return consumed
@@ -0,0 +1,270 @@
+"""
+DynamoDB Access Layer
+Throttle-aware DynamoDB calls: per-operation retries with decorrelated jitter,
+consumed-capacity tracking and an adaptive (AIMD) rate limit shared by all threads
+"""
+
+import random
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import structlog
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from prometheus_client import Counter, Gauge
+
+from src.config.settings import Config
+from .rate_limit import RateLimiter
+
+logger = structlog.get_logger(__name__)
+
+# Error codes of requests rejected for exceeding capacity: retried, and slow the rate limit down
+THROTTLE_ERRORS = frozenset({
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+})
+# Transient server-side failures: retried without adapting the rate
+TRANSIENT_ERRORS = frozenset({'InternalServerError', 'ServiceUnavailable'})
+# Connection failures and timeouts (EndpointConnectionError, ReadTimeoutError ...): retried the same way
+NETWORK_ERRORS = (BotoConnectionError, HTTPClientError)
+
+READ_OPERATIONS = frozenset({'get_item', 'query', 'scan', 'batch_get_item', 'transact_get_items'})
+WRITE_OPERATIONS = frozenset({'put_item', 'update_item', 'delete_item', 'batch_write_item', 'transact_write_items'})
+OPERATIONS = READ_OPERATIONS | WRITE_OPERATIONS
+
+# Batch operations report the part DynamoDB did not process (throttled) instead of failing
+UNPROCESSED = {'batch_write_item': 'UnprocessedItems', 'batch_get_item': 'UnprocessedKeys'}
+
+DYNAMODB_THROTTLES = Counter(
+    'analytics_dynamodb_throttles_total', 'DynamoDB requests rejected by throttling',
+    ['table', 'operation']
+)
+DYNAMODB_RETRIES = Counter(
+    'analytics_dynamodb_retries_total', 'DynamoDB requests (or unprocessed batch parts) retried',
+    ['table', 'operation']
+)
+DYNAMODB_CONSUMED_CAPACITY = Counter(
+    'analytics_dynamodb_consumed_capacity_units_total', 'Capacity units consumed by DynamoDB requests',
+    ['table', 'operation']
+)
+DYNAMODB_RATE_LIMIT = Gauge(
+    'analytics_dynamodb_rate_limit_units', 'Current adaptive client-side rate limit (capacity units/second)',
+    ['table', 'kind']
+)
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """Next retry delay: uniform between base and three times the previous delay, capped"""
+    return min(cap, random.uniform(base, previous * 3))
+
+
+def consumed_units(response: Dict[str, Any]) -> Optional[float]:
+    """Capacity units reported by a response (a dict, or a list for batch/transact operations)"""
+    consumed = response.get('ConsumedCapacity')
+    if consumed is None:
+        return None
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(entry.get('CapacityUnits', 0) for entry in consumed))
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket whose rate follows the capacity the table actually grants (AIMD)
+
+    Successful requests raise the rate by `increase` units/second up to
+    max_rate, at most once per `cooldown` seconds (so the ramp does not
+    speed up with the request rate); a throttle multiplies it by
+    `decrease` (down to min_rate) and empties the bucket. Concurrent
+    throttles caused by the same overload only cut the rate once per
+    `cooldown` seconds. Requests
+    acquire one unit up front and are charged the rest of their consumed
+    capacity afterwards, so a large scan page puts the bucket in debt and
+    delays the requests that follow it.
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = 1.0, increase: float = 1.0,
+                 decrease: float = 0.5, cooldown: float = 1.0):
+        super().__init__(max_rate or None)
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate else min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.last_decrease = float('-inf')
+        self.last_increase = float('-inf')
+
+    def charge(self, amount: float) -> None:
+        """Debit (or refund) capacity without waiting; the next acquire pays for it"""
+        if not self.rate:
+            return
+        with self.lock:
+            self.tokens = min(self.rate, self.tokens - amount)
+
+    def on_success(self) -> None:
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_increase < self.cooldown:
+                return
+            self.last_increase = now
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> None:
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(table_name: str, kind: str) -> AdaptiveRateLimiter:
+    """Process-wide limiter of a table's reads or writes, shared by every thread and client"""
+    with _limiters_lock:
+        limiter = _limiters.get((table_name, kind))
+        if limiter is None:
+            max_rate = Config.DYNAMODB_MAX_READ_UNITS if kind == 'read' else Config.DYNAMODB_MAX_WRITE_UNITS
+            limiter = AdaptiveRateLimiter(max_rate, min_rate=Config.DYNAMODB_MIN_RATE_UNITS,
+                                          increase=Config.DYNAMODB_RATE_INCREASE)
+            _limiters[(table_name, kind)] = limiter
+        return limiter
+
+
+class DynamoDBAccess:
+    """
+    Runs single DynamoDB operations under the adaptive rate limit
+
+    Only the throttled operation is retried (or, for batch operations,
+    only its unprocessed part), sleeping with decorrelated jitter between
+    attempts; transient server errors, connection errors and timeouts are
+    retried the same way (botocore makes a single attempt). Once retries
+    are exhausted the error is raised as before. Every call asks for its consumed capacity, which is charged to
+    the table's limiter and exported as a metric.
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, resend_unprocessed: bool = True):
+        self.max_retries = max_retries if max_retries is not None else Config.DYNAMODB_MAX_RETRIES
+        self.base_delay = base_delay or Config.DYNAMODB_RETRY_BASE_DELAY
+        self.max_delay = max_delay or Config.DYNAMODB_RETRY_MAX_DELAY
+        self.resend_unprocessed = resend_unprocessed
+
+    def call(self, method: Callable[..., Dict[str, Any]], operation: str, table_name: str,
+             **params) -> Dict[str, Any]:
+        kind = 'read' if operation in READ_OPERATIONS else 'write'
+        limiter = get_rate_limiter(table_name, kind)
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        unprocessed_key = UNPROCESSED.get(operation) if self.resend_unprocessed else None
+        merged: Optional[Dict[str, Any]] = None
+        delay = self.base_delay
+
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            try:
+                response = method(**params)
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in THROTTLE_ERRORS and code not in TRANSIENT_ERRORS:
+                    raise
+                if code in THROTTLE_ERRORS:
+                    self._throttled(limiter, table_name, operation, kind)
+                if attempt == self.max_retries:
+                    logger.warning("DynamoDB retries exhausted", table=table_name,
+                                   operation=operation, error_code=code)
+                    raise
+            except NETWORK_ERRORS as e:
+                if attempt == self.max_retries:
+                    logger.warning("DynamoDB retries exhausted", table=table_name,
+                                   operation=operation, error=str(e))
+                    raise
+            else:
+                units = consumed_units(response)
+                if units is not None:
+                    limiter.charge(units - 1)
+                    DYNAMODB_CONSUMED_CAPACITY.labels(table=table_name, operation=operation).inc(units)
+                merged = self._merge(merged, response) if unprocessed_key else response
+                unprocessed = response.get(unprocessed_key) if unprocessed_key else None
+                if not unprocessed:
+                    limiter.on_success()
+                    DYNAMODB_RATE_LIMIT.labels(table=table_name, kind=kind).set(limiter.rate or 0)
+                    return merged
+                # Partially throttled batch: resend just the unprocessed requests
+                self._throttled(limiter, table_name, operation, kind)
+                if attempt == self.max_retries:
+                    return merged
+                params['RequestItems'] = unprocessed
+
+            DYNAMODB_RETRIES.labels(table=table_name, operation=operation).inc()
+            delay = decorrelated_jitter(delay, self.base_delay, self.max_delay)
+            time.sleep(delay)
+
+    @staticmethod
+    def _throttled(limiter: AdaptiveRateLimiter, table_name: str, operation: str, kind: str) -> None:
+        limiter.on_throttle()
+        DYNAMODB_THROTTLES.labels(table=table_name, operation=operation).inc()
+        DYNAMODB_RATE_LIMIT.labels(table=table_name, kind=kind).set(limiter.rate or 0)
+
+    @staticmethod
+    def _merge(merged: Optional[Dict[str, Any]], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine the responses of a batch and its resends (items read, what is still unprocessed)"""
+        if merged is None:
+            return dict(response)
+        for table_name, items in response.get('Responses', {}).items():
+            merged.setdefault('Responses', {}).setdefault(table_name, []).extend(items)
+        for key in ('UnprocessedItems', 'UnprocessedKeys'):
+            if key in response:
+                merged[key] = response[key]
+        return merged
+
+
+class AdaptiveTable:
+    """
+    Table resource whose item operations go through the access layer
+
+    Everything else (name, key_schema, batch_writer, meta ...) is the
+    wrapped table's own.
+    """
+
+    def __init__(self, table, access: Optional[DynamoDBAccess] = None):
+        self._table = table
+        self._access = access or DynamoDBAccess()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._table, name)
+        if name in OPERATIONS:
+            return partial(self._access.call, attr, name, self._table.name)
+        return attr
+
+
+class AdaptiveClient:
+    """Low-level DynamoDB client whose data operations go through the access layer"""
+
+    def __init__(self, client, access: Optional[DynamoDBAccess] = None):
+        self._client = client
+        self._access = access or DynamoDBAccess()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name in OPERATIONS:
+            return partial(self._call, attr, name)
+        return attr
+
+    def _call(self, method: Callable[..., Dict[str, Any]], operation: str, **params) -> Dict[str, Any]:
+        if 'TableName' in params:
+            table_name = params['TableName']
+        else:
+            # Batch/transact operations: label by the first table involved
+            requests = params.get('RequestItems') or params.get('TransactItems') or {}
+            table_name = next(iter(requests), 'unknown') if isinstance(requests, dict) else 'transaction'
+        return self._access.call(method, operation, table_name, **params)
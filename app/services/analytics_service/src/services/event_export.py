@@ -0,0 +1,280 @@
+"""
+Event Export
+Columnar Parquet/Arrow export of raw events (partitioned files and streaming downloads)
+"""
+
+import io
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import structlog
+
+from src.config.settings import Config
+
+logger = structlog.get_logger(__name__)
+
+MONEY = pa.decimal128(18, 2)
+
+# Columns of exported files; event_day/event_type are Hive partition keys
+# (directory names) in partitioned exports and regular columns in streams
+EVENT_SCHEMA = pa.schema([
+    ('event_id', pa.string()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('user_id', pa.string()),
+    ('session_id', pa.string()),
+    ('product_id', pa.string()),
+    ('product_name', pa.string()),
+    ('category', pa.string()),
+    ('price', MONEY),
+    ('quantity', pa.int32()),
+    ('currency', pa.string()),
+    ('revenue', MONEY),
+    ('country', pa.string()),
+    ('city', pa.string()),
+    ('page_url', pa.string()),
+    ('referrer', pa.string()),
+    ('search_query', pa.string()),
+    ('user_agent', pa.string()),
+    ('properties', pa.string()),  # JSON
+])
+
+STREAM_SCHEMA = EVENT_SCHEMA.append(pa.field('event_day', pa.string())).append(pa.field('event_type', pa.string()))
+
+# Low-cardinality columns written with dictionary encoding
+DICTIONARY_COLUMNS = ['user_id', 'session_id', 'product_id', 'product_name', 'category',
+                      'currency', 'country', 'city', 'event_day', 'event_type']
+
+CENT = Decimal('0.01')
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _money(value: Any) -> Optional[Decimal]:
+    if value is None or value == '':
+        return None
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+# Column -> converter from a stored DynamoDB item value
+CONVERTERS = {
+    'timestamp': _timestamp,
+    'price': _money,
+    'revenue': _money,
+    'quantity': _int,
+    'properties': lambda v: json.dumps(v, default=str, separators=(',', ':')) if v else None,
+}
+
+
+def event_partition(event: Dict[str, Any]) -> Tuple[str, str]:
+    """(event_day, event_type) of a stored event"""
+    event_day = event.get('event_day')
+    if not event_day:
+        event_day = _timestamp(event['timestamp']).strftime('%Y-%m-%d')
+    return event_day, event.get('event_type') or 'custom'
+
+
+class ColumnBuffer:
+    """Rows of one partition accumulated column-wise until they form a row group"""
+
+    def __init__(self, schema: pa.Schema):
+        self.schema = schema
+        self.columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        self.rows = 0
+
+    def append(self, event: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> None:
+        for name, values in self.columns.items():
+            value = extra[name] if extra and name in extra else event.get(name)
+            values.append(CONVERTERS.get(name, _text)(value))
+        self.rows += 1
+
+    def to_table(self) -> pa.Table:
+        table = pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+        return table
+
+
+def _writer_options() -> Dict[str, Any]:
+    return {
+        'compression': Config.EXPORT_COMPRESSION,
+        'use_dictionary': DICTIONARY_COLUMNS,
+    }
+
+
+class PartitionedParquetExporter:
+    """
+    Writes events into Hive-style partitioned Parquet files
+
+        {output_dir}/event_day=YYYY-MM-DD/event_type=.../part-{run}-{n}.parquet
+
+    Memory is bounded: each partition buffers at most row_group_size rows,
+    the total buffered rows are capped at max_buffered_rows (the largest
+    buffer is flushed first) and at most max_open_files writers are kept
+    open (the least recently used one is closed; later rows for that
+    partition go to a new part file).
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, row_group_size: Optional[int] = None,
+                 max_buffered_rows: Optional[int] = None, max_open_files: int = 64):
+        self.output_dir = output_dir or Config.EXPORT_OUTPUT_DIR
+        self.row_group_size = row_group_size or Config.EXPORT_ROW_GROUP_SIZE
+        self.max_buffered_rows = max_buffered_rows or 4 * self.row_group_size
+        self.max_open_files = max_open_files
+        self.run_id = uuid.uuid4().hex[:8]
+        self.buffers: Dict[Tuple[str, str], ColumnBuffer] = {}
+        self.writers: 'OrderedDict[Tuple[str, str], pq.ParquetWriter]' = OrderedDict()
+        self.part_numbers: Dict[Tuple[str, str], int] = {}
+        self.files: Dict[str, int] = {}  # path -> rows
+        self.buffered = 0
+        self.rows = 0
+
+    def write(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add events to the export; returns the number written"""
+        count = 0
+        for event in events:
+            partition = event_partition(event)
+            buffer = self.buffers.get(partition)
+            if buffer is None:
+                buffer = self.buffers[partition] = ColumnBuffer(EVENT_SCHEMA)
+            buffer.append(event)
+            self.buffered += 1
+            count += 1
+            if buffer.rows >= self.row_group_size:
+                self._flush(partition)
+            elif self.buffered >= self.max_buffered_rows:
+                self._flush(max(self.buffers, key=lambda p: self.buffers[p].rows))
+        self.rows += count
+        return count
+
+    def _path(self, partition: Tuple[str, str]) -> str:
+        event_day, event_type = partition
+        number = self.part_numbers.get(partition, 0)
+        self.part_numbers[partition] = number + 1
+        directory = os.path.join(self.output_dir, f"event_day={event_day}", f"event_type={event_type}")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"part-{self.run_id}-{number:05d}.parquet")
+
+    def _flush(self, partition: Tuple[str, str]) -> None:
+        buffer = self.buffers.pop(partition, None)
+        if buffer is None or not buffer.rows:
+            return
+        self.buffered -= buffer.rows
+
+        writer = self.writers.get(partition)
+        if writer is None:
+            if len(self.writers) >= self.max_open_files:
+                _, oldest = self.writers.popitem(last=False)
+                oldest.close()
+            path = self._path(partition)
+            writer = pq.ParquetWriter(path, EVENT_SCHEMA, **_writer_options())
+            self.writers[partition] = writer
+            self.files[path] = 0
+        self.writers.move_to_end(partition)
+
+        rows = buffer.rows
+        writer.write_table(buffer.to_table(), row_group_size=self.row_group_size)
+        self.files[writer.where] += rows
+
+    def close(self) -> Dict[str, Any]:
+        """Flush all buffers, close the files and return an export summary"""
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+        return {
+            'output_dir': self.output_dir,
+            'run_id': self.run_id,
+            'rows': self.rows,
+            'files': [{'path': path, 'rows': rows} for path, rows in sorted(self.files.items())],
+        }
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are drained as response chunks"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_events(events: Iterable[Dict[str, Any]], fmt: str = 'parquet',
+                  row_group_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Encode events as a single Parquet file or Arrow IPC stream, yielding
+    bytes one row group/record batch at a time (memory bounded by
+    row_group_size rows)
+    """
+    row_group_size = row_group_size or Config.EXPORT_ROW_GROUP_SIZE
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, STREAM_SCHEMA, **_writer_options())
+    elif fmt == 'arrow':
+        writer = pa.ipc.new_stream(sink, STREAM_SCHEMA)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    buffer = ColumnBuffer(STREAM_SCHEMA)
+    for event in events:
+        event_day, event_type = event_partition(event)
+        buffer.append(event, {'event_day': event_day, 'event_type': event_type})
+        if buffer.rows >= row_group_size:
+            writer.write_table(buffer.to_table())
+            yield sink.drain()
+    if buffer.rows:
+        writer.write_table(buffer.to_table())
+    writer.close()
+    yield sink.drain()
+
+
+def export_events(dynamodb, start_time: datetime, end_time: datetime,
+                  event_types: Optional[List[str]] = None,
+                  output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Batch job: export [start_time, end_time) into partitioned Parquet files"""
+    exporter = PartitionedParquetExporter(output_dir)
+    events = dynamodb.iter_events_by_timerange(start_time, end_time)
+    if event_types:
+        events = (e for e in events if e.get('event_type') in event_types)
+    exporter.write(events)
+    summary = exporter.close()
+    logger.info("Event export completed", rows=summary['rows'], files=len(summary['files']),
+                output_dir=summary['output_dir'])
+    return summary
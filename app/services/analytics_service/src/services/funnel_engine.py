@@ -0,0 +1,243 @@
+"""
+Funnel Engine
+Incremental conversion funnels: per-session step state and per-period step counters
+"""
+
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from src.config.settings import Config
+from src.models.analytics_models import FunnelDefinition
+from .aggregation_engine import period_bounds
+from .cache_service import CacheService
+from .realtime_metrics import BUCKET_STEPS, time_bucket
+from .sessionizer import event_epoch, event_field
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_FUNNELS = [
+    {
+        'name': 'checkout',
+        'steps': ['page_view', 'add_to_cart', 'checkout_start', 'purchase'],
+        'step_window_seconds': [1800, 1800, 3600],
+    },
+]
+
+# Periods step counters are kept for, with their retention
+COUNTER_TTL = {
+    'hour': 8 * 86400,
+    'day': 400 * 86400,
+}
+
+# Attempts to apply a batch's transitions before sessions changed concurrently are given up
+MAX_CAS_ATTEMPTS = 5
+
+# Compare-and-set of funnel states: a session's new state is written, and its step counters
+# incremented, only if the stored state is still the one the transitions were computed from.
+# KEYS: one state key per session
+# ARGV: state ttl, then per session: expected step ('' = no state), expected ts, new state (JSON),
+#       number of counters, and (counter key, ttl) per counter
+# Returns the 1-based indexes of the sessions whose state had changed (nothing written for them).
+FUNNEL_CAS_LUA = """
+local ttl = tonumber(ARGV[1])
+local conflicts = {}
+local i = 2
+for k = 1, #KEYS do
+    local expected_step, expected_ts, new_state = ARGV[i], ARGV[i + 1], ARGV[i + 2]
+    local n = tonumber(ARGV[i + 3])
+    i = i + 4
+    local raw = redis.call('GET', KEYS[k])
+    local matches = expected_step == ''
+    if raw then
+        local state = cjson.decode(raw)
+        matches = expected_step ~= '' and state['step'] == tonumber(expected_step)
+            and state['ts'] == tonumber(expected_ts)
+    end
+    if matches then
+        redis.call('SET', KEYS[k], new_state, 'EX', ttl)
+        for c = 0, n - 1 do
+            local counter = ARGV[i + 2 * c]
+            redis.call('INCR', counter)
+            redis.call('EXPIRE', counter, ARGV[i + 2 * c + 1])
+        end
+    else
+        table.insert(conflicts, k)
+    end
+    i = i + 2 * n
+end
+return conflicts
+"""
+
+# Upper bound on buckets summed by one range query (keeps queries O(steps x buckets))
+MAX_QUERY_BUCKETS = {
+    'hour': 24 * 31,
+    'day': 366,
+}
+
+
+def load_funnels(raw: Optional[str] = None) -> Dict[str, FunnelDefinition]:
+    """Funnel definitions from FUNNEL_DEFINITIONS (JSON list), falling back to the defaults"""
+    raw = raw if raw is not None else Config.FUNNEL_DEFINITIONS
+    definitions = json.loads(raw) if raw else DEFAULT_FUNNELS
+    funnels = [FunnelDefinition(**definition) for definition in definitions]
+    return {funnel.name: funnel for funnel in funnels}
+
+
+class FunnelEngine:
+    """
+    Incremental funnel tracking
+
+    Every session keeps, per funnel, the index of the last step it reached
+    and when (funnel:{name}:state:{session_id}, TTL = the funnel's maximum
+    duration). An event advances the session only if it is the next step
+    and arrives within that step's window; a late event restarts the
+    attempt if it is the first step. Each step reached increments the
+    step counter of the hour and day bucket of the event, so a funnel
+    query is one MGET of len(steps) x buckets counters, independent of
+    traffic. State changes and their counters are committed together by
+    a compare-and-set script, so concurrent workers never count a step
+    twice or lose one.
+    """
+
+    def __init__(self, cache: Optional[CacheService] = None,
+                 funnels: Optional[Dict[str, FunnelDefinition]] = None):
+        self.cache = cache or CacheService()
+        self.funnels = funnels if funnels is not None else load_funnels()
+
+    @staticmethod
+    def state_key(funnel: str, session_id: str) -> str:
+        return f"funnel:{funnel}:state:{session_id}"
+
+    @staticmethod
+    def counter_key(funnel: str, step: int, period: str, bucket: str) -> str:
+        return f"funnel:{funnel}:step{step}:{period}:{bucket}"
+
+    def process(self, events: Iterable[Any]) -> int:
+        """Advance every funnel with a batch of events; returns the number of steps reached"""
+        by_session: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        for event in events:
+            session_id = event_field(event, 'session_id')
+            if session_id:
+                ts = event_epoch(event_field(event, 'timestamp'))
+                by_session[session_id].append((ts, event_field(event, 'event_type')))
+        if not by_session:
+            return 0
+
+        reached = 0
+        for funnel in self.funnels.values():
+            reached += self._advance(funnel, by_session)
+        return reached
+
+    def _advance(self, funnel: FunnelDefinition, by_session: Dict[str, List[Tuple[float, str]]]) -> int:
+        """
+        Apply a batch to one funnel. Transitions are computed from the
+        states read, then committed by a compare-and-set script; sessions
+        another worker advanced in between are re-read and recomputed.
+        """
+        pending = dict(by_session)
+        reached = 0
+        for _ in range(MAX_CAS_ATTEMPTS):
+            keys = {self.state_key(funnel.name, sid): sid for sid in pending}
+            stored = {keys[key]: state for key, state in self.cache.get_many(list(keys)).items()}
+
+            sessions, args = [], [funnel.max_duration_seconds]
+            for session_id, timed_events in pending.items():
+                expected = state = stored.get(session_id)
+                counters = []
+                for ts, event_type in sorted(timed_events):
+                    step = self._next_step(funnel, state, ts, event_type)
+                    if step is None:
+                        continue
+                    state = {'step': step, 'ts': ts}
+                    when = datetime.fromtimestamp(ts, timezone.utc)
+                    for period, ttl in COUNTER_TTL.items():
+                        counters.extend((self.counter_key(funnel.name, step, period, time_bucket(period, when)), ttl))
+                if not counters:
+                    continue
+                sessions.append((session_id, len(counters) // (2 * len(COUNTER_TTL))))
+                args.extend(('', '') if expected is None else (expected['step'], repr(expected['ts'])))
+                args.extend((json.dumps(state), len(counters) // 2, *counters))
+            if not sessions:
+                return reached
+
+            conflicts = self.cache.run_script(
+                FUNNEL_CAS_LUA, [self.state_key(funnel.name, sid) for sid, _ in sessions], args)
+            if conflicts is None:
+                return reached
+            conflicted = {sessions[index - 1][0] for index in conflicts}
+            reached += sum(steps for sid, steps in sessions if sid not in conflicted)
+            pending = {sid: pending[sid] for sid in conflicted}
+            if not pending:
+                return reached
+
+        logger.warning("Funnel states kept changing, transitions dropped",
+                       funnel=funnel.name, sessions=len(pending))
+        return reached
+
+    @staticmethod
+    def _next_step(funnel: FunnelDefinition, state: Optional[Dict[str, Any]],
+                   ts: float, event_type: str) -> Optional[int]:
+        """Step index the event moves the session to, or None if it doesn't advance"""
+        if state is not None:
+            current = state['step']
+            if current + 1 < len(funnel.steps) and ts - state['ts'] <= funnel.step_window_seconds[current]:
+                # Attempt in progress: only the next step advances it
+                return current + 1 if event_type == funnel.steps[current + 1] else None
+        # No attempt in progress (none yet, completed or timed out): the first step starts one
+        return 0 if event_type == funnel.steps[0] else None
+
+    def step_counts(self, name: str, period: str, start: datetime, end: datetime) -> List[int]:
+        """Sessions that reached each step in the period buckets within [start, end)"""
+        funnel = self.funnels[name]
+        if period not in COUNTER_TTL:
+            raise ValueError(f"Unknown funnel period: {period}")
+
+        step = BUCKET_STEPS[period]
+        buckets, cursor = [], period_bounds(period, start)[0]
+        while cursor < end:
+            buckets.append(time_bucket(period, cursor))
+            cursor += step
+        if len(buckets) > MAX_QUERY_BUCKETS[period]:
+            raise ValueError(f"Range too large for {period} buckets (max {MAX_QUERY_BUCKETS[period]})")
+
+        keys = [
+            [self.counter_key(name, i, period, bucket) for bucket in buckets]
+            for i in range(len(funnel.steps))
+        ]
+        values = self.cache.get_many([key for step_keys in keys for key in step_keys])
+        return [sum(int(values.get(key, 0)) for key in step_keys) for step_keys in keys]
+
+    def get_conversion_funnel(self, name: str = 'checkout', start_time: Optional[datetime] = None,
+                              end_time: Optional[datetime] = None, period: str = 'day') -> Dict[str, Any]:
+        """Step counts, step-to-step conversion and drop-off of a funnel over [start_time, end_time)"""
+        if name not in self.funnels:
+            raise ValueError(f"Unknown funnel: {name}")
+
+        end_time = end_time or datetime.now(timezone.utc)
+        start_time = start_time or end_time - timedelta(days=1)
+        funnel = self.funnels[name]
+        counts = self.step_counts(name, period, start_time, end_time)
+
+        steps = []
+        for i, (event_type, count) in enumerate(zip(funnel.steps, counts)):
+            previous = counts[i - 1] if i else count
+            steps.append({
+                'step': i + 1,
+                'event_type': event_type,
+                'sessions': count,
+                'conversion_rate': (count / previous * 100) if previous else 0.0,
+                'drop_off': max(previous - count, 0),
+            })
+
+        return {
+            'funnel': name,
+            'period': period,
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'steps': steps,
+            'overall_conversion_rate': (counts[-1] / counts[0] * 100) if counts[0] else 0.0,
+        }
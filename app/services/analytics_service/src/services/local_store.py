@@ -0,0 +1,264 @@
+"""
+Local Event Store
+Optional embedded SQLite tier holding the most recent days of events for ad-hoc queries
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+
+from src.config.settings import Config
+from .sessionizer import event_epoch, event_field
+
+logger = structlog.get_logger(__name__)
+
+# Columns usable in filters and GROUP BY (whitelist: names are interpolated into SQL)
+DIMENSIONS = ('event_type', 'user_id', 'session_id', 'product_id', 'category',
+              'country', 'city', 'currency', 'event_day', 'event_hour')
+
+METRICS = {
+    'events': 'COUNT(*)',
+    'unique_users': 'COUNT(DISTINCT user_id)',
+    'unique_sessions': 'COUNT(DISTINCT session_id)',
+    'revenue': 'COALESCE(SUM(revenue), 0)',
+    'avg_revenue': 'AVG(revenue)',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    event_day TEXT NOT NULL,
+    event_hour INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    user_id TEXT,
+    session_id TEXT,
+    product_id TEXT,
+    category TEXT,
+    country TEXT,
+    city TEXT,
+    currency TEXT,
+    revenue REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_user_ts ON events (user_id, ts);
+CREATE INDEX IF NOT EXISTS events_type_ts ON events (event_type, ts);
+"""
+
+INSERT = """
+INSERT OR IGNORE INTO events
+    (event_id, ts, event_day, event_hour, event_type, user_id, session_id,
+     product_id, category, country, city, currency, revenue, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# VM instructions between deadline checks of a running query
+PROGRESS_INTERVAL = 10000
+
+
+class QueryTimeout(Exception):
+    """A local store query ran past its deadline and was interrupted"""
+
+
+def _value(value: Any) -> Any:
+    """Plain value of enum members for storage and comparison"""
+    return getattr(value, 'value', value)
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    return None if value is None else event_epoch(value)
+
+
+def _event_row(event: Any) -> Tuple:
+    if isinstance(event, dict):
+        data = event
+    else:
+        data = event.model_dump(mode='json')
+    ts = event_epoch(event_field(event, 'timestamp'))
+    when = datetime.fromtimestamp(ts, timezone.utc)
+    revenue = event_field(event, 'revenue')
+    return (
+        str(event_field(event, 'event_id')),
+        ts,
+        when.strftime('%Y-%m-%d'),
+        when.hour,
+        _value(event_field(event, 'event_type')),
+        event_field(event, 'user_id'),
+        event_field(event, 'session_id'),
+        event_field(event, 'product_id'),
+        event_field(event, 'category'),
+        event_field(event, 'country'),
+        event_field(event, 'city'),
+        event_field(event, 'currency'),
+        float(revenue) if revenue is not None else None,
+        json.dumps(data, default=str, separators=(',', ':')),
+    )
+
+
+class LocalEventStore:
+    """
+    Recent events in a local SQLite file (WAL mode, one connection per thread)
+
+    Fed incrementally by the event pipeline and pruned to the last
+    retention_days, so searches, counts and group-bys over recent data are
+    answered from indexes instead of DynamoDB scans. Every query runs with
+    a deadline (interrupted via the progress handler) and a row cap.
+    """
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[int] = None,
+                 max_rows: Optional[int] = None, timeout_ms: Optional[int] = None):
+        self.path = path or Config.LOCAL_STORE_PATH
+        self.retention_days = retention_days or Config.LOCAL_STORE_RETENTION_DAYS
+        self.max_rows = max_rows or Config.LOCAL_STORE_MAX_ROWS
+        self.timeout_ms = timeout_ms or Config.LOCAL_STORE_QUERY_TIMEOUT_MS
+        self._local = threading.local()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ingest(self, events: Iterable[Any]) -> int:
+        """Insert events (AnalyticsEvent or stored dicts); duplicates are ignored"""
+        cutoff = self.cutoff()
+        rows = [row for row in map(_event_row, events) if row[1] >= cutoff]
+        if not rows:
+            return 0
+        with self.connection as conn:
+            cursor = conn.executemany(INSERT, rows)
+        return cursor.rowcount
+
+    def cutoff(self, now: Optional[datetime] = None) -> float:
+        """Oldest timestamp (epoch seconds) kept in the store"""
+        now = now or datetime.now(timezone.utc)
+        return (now - timedelta(days=self.retention_days)).timestamp()
+
+    def covers(self, start_time: Optional[datetime]) -> bool:
+        """Whether a range starting at start_time is within the retained window"""
+        return start_time is not None and _epoch(start_time) >= self.cutoff()
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Delete events older than the retention window"""
+        with self.connection as conn:
+            cursor = conn.execute('DELETE FROM events WHERE ts < ?', (self.cutoff(now),))
+        return cursor.rowcount
+
+    def _execute(self, sql: str, params: Sequence[Any], timeout_ms: Optional[int] = None) -> List[sqlite3.Row]:
+        timeout_ms = min(timeout_ms or self.timeout_ms, self.timeout_ms)
+        deadline = time.monotonic() + timeout_ms / 1000
+        conn = self.connection
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_INTERVAL)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if 'interrupted' in str(e):
+                raise QueryTimeout(f"Query exceeded {timeout_ms} ms") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    @staticmethod
+    def _where(filters: Optional[Dict[str, Any]], start_time: Optional[datetime],
+               end_time: Optional[datetime]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for name, value in (filters or {}).items():
+            if name not in DIMENSIONS:
+                raise ValueError(f"Unknown filter: {name}")
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            clauses.append(f"{name} IN ({', '.join('?' * len(values))})")
+            params.extend(_value(v) for v in values)
+        if start_time is not None:
+            clauses.append('ts >= ?')
+            params.append(_epoch(start_time))
+        if end_time is not None:
+            clauses.append('ts < ?')
+            params.append(_epoch(end_time))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def search_events(self, user_id: Optional[str] = None, event_type: Optional[Any] = None,
+               start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+               limit: int = 100, offset: int = 0, timeout_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events matching the filters, newest first (same filters as EventSearchRequest)"""
+        where, params = self._where({'user_id': user_id, 'event_type': event_type}, start_time, end_time)
+        rows = self._execute(
+            f"SELECT data FROM events{where} ORDER BY ts DESC LIMIT ? OFFSET ?",
+            params + [self._row_limit(limit), max(0, offset)], timeout_ms,
+        )
+        return [json.loads(row['data']) for row in rows]
+
+    def _row_limit(self, limit: int) -> int:
+        # SQLite treats a negative LIMIT as no limit at all
+        return max(1, min(int(limit), self.max_rows))
+
+    def count_events(self, user_id: Optional[str] = None, event_type: Optional[Any] = None,
+              start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+              timeout_ms: Optional[int] = None) -> int:
+        where, params = self._where({'user_id': user_id, 'event_type': event_type}, start_time, end_time)
+        return self._execute(f"SELECT COUNT(*) FROM events{where}", params, timeout_ms)[0][0]
+
+    def group_by(self, dimensions: Sequence[str], metrics: Sequence[str] = ('events',),
+                 filters: Optional[Dict[str, Any]] = None, start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None, order_by: Optional[str] = None,
+                 limit: int = 100, timeout_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Aggregate metrics grouped by dimensions, ordered by order_by (a
+        metric, descending; defaults to the first metric). At most `limit`
+        rows (clamped to [1, max_rows]) are returned; `truncated` flags more.
+        """
+        unknown = [d for d in dimensions if d not in DIMENSIONS] + [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions/metrics: {unknown}")
+        if not metrics:
+            raise ValueError("At least one metric is required")
+        order_by = order_by or metrics[0]
+        if order_by not in metrics:
+            raise ValueError(f"order_by must be one of the requested metrics: {list(metrics)}")
+
+        limit = self._row_limit(limit)
+        where, params = self._where(filters, start_time, end_time)
+        select = [*dimensions, *(f"{METRICS[m]} AS {m}" for m in metrics)]
+        sql = f"SELECT {', '.join(select)} FROM events{where}"
+        if dimensions:
+            sql += f" GROUP BY {', '.join(dimensions)}"
+        sql += f" ORDER BY {order_by} DESC LIMIT ?"
+
+        rows = self._execute(sql, params + [limit + 1], timeout_ms)
+        return {
+            'rows': [dict(row) for row in rows[:limit]],
+            'truncated': len(rows) > limit,
+        }
+
+
+# One store per process, created on first use when the tier is enabled
+_local_store = None
+_local_store_lock = threading.Lock()
+
+
+def get_local_store() -> Optional[LocalEventStore]:
+    """The process' local event store, or None when LOCAL_STORE_ENABLED is off"""
+    global _local_store
+    if not Config.LOCAL_STORE_ENABLED:
+        return None
+    if _local_store is None:
+        with _local_store_lock:
+            if _local_store is None:
+                _local_store = LocalEventStore()
+    return _local_store
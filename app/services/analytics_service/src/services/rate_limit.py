@@ -0,0 +1,43 @@
+"""
+Rate Limiting
+Token bucket shared by throttled DynamoDB readers and writers (backfills, purges, archiving)
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class RateLimiter:
+    """
+    Token bucket limiting consumption to `rate` units per second
+
+    Used to cap DynamoDB read capacity (consumed RCUs reported by each scan
+    page) and aggregation writes per worker. A rate of None disables it.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = rate
+        self.tokens = rate or 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            deficit = -self.tokens
+        if deficit > 0:
+            time.sleep(deficit / self.rate)
+
+    def on_scan_page(self, response: Dict[str, Any]) -> None:
+        """Charge the capacity consumed by a DynamoDB scan page"""
+        capacity = (response.get('ConsumedCapacity') or {}).get('CapacityUnits')
+        if capacity is None:
+            # No capacity reported (e.g. local emulators): assume 1 RCU per 8 scanned items
+            capacity = response.get('ScannedCount', 0) / 8
+        self.acquire(float(capacity))
@@ -0,0 +1,332 @@
+"""
+Realtime Metrics
+Redis-backed realtime counters and distinct counts for the dashboard
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from .cache_service import CacheService
+
+logger = structlog.get_logger(__name__)
+
+# Bucket key formats shared by all realtime time-bucketed keys
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H',
+    'day': '%Y-%m-%d',
+}
+
+BUCKET_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+# Space-Saving update of one top-k bucket, atomic so concurrent workers share the summary.
+# A member not tracked by a full bucket replaces the one with the smallest count, which
+# becomes its overestimate.
+# KEYS[1]: sorted set of counts, KEYS[2]: hash of each member's overestimate
+# ARGV: capacity, ttl (0 = none), then (member, weight) pairs
+TOPK_OFFER_LUA = """
+local capacity = tonumber(ARGV[1])
+for i = 3, #ARGV, 2 do
+    local member, weight = ARGV[i], tonumber(ARGV[i + 1])
+    if redis.call('ZSCORE', KEYS[1], member) or redis.call('ZCARD', KEYS[1]) < capacity then
+        redis.call('ZINCRBY', KEYS[1], weight, member)
+    else
+        local min = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        redis.call('ZREM', KEYS[1], min[1])
+        redis.call('HDEL', KEYS[2], min[1])
+        redis.call('ZADD', KEYS[1], tonumber(min[2]) + weight, member)
+        redis.call('HSET', KEYS[2], member, min[2])
+    end
+end
+local ttl = tonumber(ARGV[2])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return 1
+"""
+
+
+def time_bucket(period: str, ts: datetime) -> str:
+    """Bucket label of ts for the given period"""
+    return ts.strftime(BUCKET_FORMATS[period])
+
+
+def time_buckets(ts: datetime) -> Dict[str, str]:
+    """Bucket labels of ts for every realtime period"""
+    return {period: time_bucket(period, ts) for period in BUCKET_FORMATS}
+
+
+def recent_buckets(period: str, count: int, now: datetime) -> List[str]:
+    """Labels of the last `count` buckets ending with the one containing now (newest first)"""
+    step = BUCKET_STEPS[period]
+    return [time_bucket(period, now - step * i) for i in range(count)]
+
+
+class SlidingWindowCounter:
+    """
+    Rolling event counts at minute resolution
+
+    Every increment lands in the minute, hour and day bucket of the
+    processing time (one pipelined INCRBY per bucket). A rolling window is
+    read back with a single MGET over the buckets that tile it: minutes at
+    the edges and closed hours in between, so a 24h window costs at most
+    ~140 keys instead of a table scan. The oldest minute is weighted by the
+    part of it still inside the window.
+    """
+
+    BUCKET_TTL = {
+        'minute': 25 * 3600,
+        'hour': 3 * 86400,
+        'day': 8 * 86400,
+    }
+
+    WINDOWS = {
+        '1m': timedelta(minutes=1),
+        '5m': timedelta(minutes=5),
+        '1h': timedelta(hours=1),
+        '24h': timedelta(hours=24),
+    }
+
+    MAX_SERIES_MINUTES = 24 * 60
+
+    def __init__(self, cache: Optional[CacheService] = None, name: str = 'events_count'):
+        self.cache = cache or CacheService()
+        self.name = name
+
+    def bucket_key(self, period: str, bucket: str) -> str:
+        return f"{self.name}:{period}:{bucket}"
+
+    def record(self, amount: int, now: Optional[datetime] = None) -> bool:
+        """Add amount to the current minute, hour and day buckets"""
+        now = now or datetime.now(timezone.utc)
+        keys = {period: self.bucket_key(period, bucket) for period, bucket in time_buckets(now).items()}
+        return self.cache.increment_many(
+            {key: amount for key in keys.values()},
+            ttls={key: self.BUCKET_TTL[period] for period, key in keys.items()}
+        )
+
+    def window_keys(self, start: datetime, now: datetime) -> List[Tuple[str, float]]:
+        """(bucket key, weight) pairs tiling [start, now]"""
+        first_minute = start.replace(second=0, microsecond=0)
+        current_minute = now.replace(second=0, microsecond=0)
+        step = BUCKET_STEPS['minute']
+
+        elapsed = (start - first_minute) / step
+        keys = [(self.bucket_key('minute', time_bucket('minute', first_minute)), 1.0 - elapsed)]
+
+        cursor = first_minute + step
+        while cursor <= current_minute:
+            if cursor.minute == 0 and cursor + BUCKET_STEPS['hour'] <= current_minute:
+                keys.append((self.bucket_key('hour', time_bucket('hour', cursor)), 1.0))
+                cursor += BUCKET_STEPS['hour']
+            else:
+                keys.append((self.bucket_key('minute', time_bucket('minute', cursor)), 1.0))
+                cursor += step
+        return keys
+
+    def total(self, window: str, now: Optional[datetime] = None) -> int:
+        """Events counted over a rolling window ('1m', '5m', '1h' or '24h')"""
+        if window not in self.WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        now = now or datetime.now(timezone.utc)
+        keys = self.window_keys(now - self.WINDOWS[window], now)
+        values = self.cache.get_many([key for key, _ in keys])
+        return int(round(sum(int(values.get(key, 0)) * weight for key, weight in keys)))
+
+    def series(self, minutes: int = 60, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Per-minute counts of the last `minutes` minutes (oldest first, current minute last)"""
+        if not 1 <= minutes <= self.MAX_SERIES_MINUTES:
+            raise ValueError(f"minutes must be between 1 and {self.MAX_SERIES_MINUTES}")
+
+        now = now or datetime.now(timezone.utc)
+        buckets = list(reversed(recent_buckets('minute', minutes, now)))
+        keys = [self.bucket_key('minute', bucket) for bucket in buckets]
+        values = self.cache.get_many(keys)
+        return [{'minute': bucket, 'count': int(values.get(key, 0))} for bucket, key in zip(buckets, keys)]
+
+
+class RealtimeUniques:
+    """
+    Distinct users/sessions per minute, hour and day bucket
+
+    Each event is PFADDed into the HyperLogLog of its minute, hour and day
+    bucket (~12KB per key, constant regardless of traffic). Rolling windows
+    are answered from those buckets: closed buckets are PFMERGEd once into a
+    short-lived window key and PFCOUNTed together with the open bucket.
+    """
+
+    DIMENSIONS = {'users': 'user_id', 'sessions': 'session_id'}
+
+    BUCKET_TTL = {
+        'minute': 2 * 3600,
+        'hour': 2 * 86400,
+        'day': 8 * 86400,
+    }
+
+    # window -> (bucket period, number of buckets)
+    WINDOWS = {
+        '1h': ('minute', 60),
+        '24h': ('hour', 24),
+        '7d': ('day', 7),
+    }
+
+    def __init__(self, cache: Optional[CacheService] = None):
+        self.cache = cache or CacheService()
+
+    @staticmethod
+    def bucket_key(dimension: str, period: str, bucket: str) -> str:
+        return f"hll:{dimension}:{period}:{bucket}"
+
+    def record(self, events: Iterable) -> int:
+        """Add the users/sessions of processed events to their buckets"""
+        pending: Dict[str, set] = defaultdict(set)
+        for event in events:
+            buckets = time_buckets(event.timestamp.astimezone(timezone.utc))
+            for dimension, field in self.DIMENSIONS.items():
+                value = getattr(event, field, None)
+                if not value:
+                    continue
+                for period, bucket in buckets.items():
+                    pending[self.bucket_key(dimension, period, bucket)].add(value)
+
+        for key, values in pending.items():
+            period = key.split(':')[2]
+            self.cache.hll_add(key, list(values), ttl=self.BUCKET_TTL[period])
+        return len(pending)
+
+    def bucket_count(self, dimension: str, period: str, ts: datetime) -> int:
+        """Distinct count of a single bucket"""
+        return self.cache.hll_count([self.bucket_key(dimension, period, time_bucket(period, ts))])
+
+    def rolling(self, dimension: str, window: str, now: Optional[datetime] = None) -> int:
+        """Distinct count over a rolling window ('1h', '24h' or '7d')"""
+        if dimension not in self.DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        if window not in self.WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        now = now or datetime.now(timezone.utc)
+        period, count = self.WINDOWS[window]
+        buckets = recent_buckets(period, count, now)
+        open_key = self.bucket_key(dimension, period, buckets[0])
+
+        # Closed buckets don't change anymore: merge them once per open bucket
+        closed_key = f"hll:{dimension}:window:{window}:{buckets[0]}"
+        if not self.cache.exists(closed_key):
+            closed_keys = [self.bucket_key(dimension, period, bucket) for bucket in buckets[1:]]
+            ttl = int(BUCKET_STEPS[period].total_seconds())
+            if not self.cache.hll_merge(closed_key, closed_keys, ttl=ttl):
+                return self.cache.hll_count([open_key] + closed_keys)
+
+        return self.cache.hll_count([open_key, closed_key])
+
+    def rolling_summary(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """Rolling distinct users and sessions for every window"""
+        now = now or datetime.now(timezone.utc)
+        return {
+            dimension: {window: self.rolling(dimension, window, now) for window in self.WINDOWS}
+            for dimension in self.DIMENSIONS
+        }
+
+
+class RealtimeTopK:
+    """
+    Realtime top products/categories/countries per minute and hour bucket
+
+    Each batch is reduced to exact per-item counts locally, then offered
+    to the bucket's Space-Saving summary (a sorted set of at most CAPACITY
+    counts plus a hash of overestimates) by TOPK_OFFER_LUA, like the
+    SpaceSaving sketch of the stored aggregations. Memory is bounded by
+    capacity per bucket regardless of catalog size, and every reported
+    count overestimates the true count by at most its reported error.
+    """
+
+    DIMENSIONS = {
+        'products': 'product_id',
+        'categories': 'category',
+        'countries': 'country',
+    }
+
+    CAPACITY = 500
+
+    BUCKET_TTL = {
+        'minute': 2 * 3600,
+        'hour': 2 * 86400,
+    }
+
+    # window -> (bucket period, number of buckets)
+    WINDOWS = {
+        '1h': ('minute', 60),
+        '24h': ('hour', 24),
+    }
+
+    def __init__(self, cache: Optional[CacheService] = None):
+        self.cache = cache or CacheService()
+
+    @staticmethod
+    def bucket_key(dimension: str, period: str, bucket: str) -> str:
+        return f"topk:{dimension}:{period}:{bucket}"
+
+    @staticmethod
+    def error_key(bucket_key: str) -> str:
+        return f"{bucket_key}:error"
+
+    def record(self, events: Iterable) -> int:
+        """Add the products/categories/countries of processed events to their buckets"""
+        pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for event in events:
+            ts = event.timestamp.astimezone(timezone.utc)
+            for dimension, field in self.DIMENSIONS.items():
+                value = getattr(event, field, None)
+                if not value:
+                    continue
+                for period in self.BUCKET_TTL:
+                    pending[self.bucket_key(dimension, period, time_bucket(period, ts))][value] += 1
+
+        for key, counts in pending.items():
+            period = key.split(':')[2]
+            args: List[Any] = [self.CAPACITY, self.BUCKET_TTL[period]]
+            # Heaviest first: the batch's rarest items are offered last, when they can only evict each other
+            for member, weight in sorted(counts.items(), key=lambda kv: -kv[1]):
+                args += [member, weight]
+            self.cache.run_script(TOPK_OFFER_LUA, [key, self.error_key(key)], args)
+        return len(pending)
+
+    def top(self, dimension: str, window: str = '1h', k: int = 10,
+            now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k items of a dimension over a rolling window ('1h' or '24h'),
+        with the Space-Saving error bound of each count (summed over buckets)
+        """
+        if dimension not in self.DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        if window not in self.WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        now = now or datetime.now(timezone.utc)
+        period, count = self.WINDOWS[window]
+        buckets = recent_buckets(period, count, now)
+        keys = [self.bucket_key(dimension, period, bucket) for bucket in buckets]
+        union_key = f"topk:{dimension}:window:{window}:{buckets[0]}"
+
+        field = self.DIMENSIONS[dimension]
+        ranked = self.cache.zset_top(keys, k, union_key=union_key, ttl=30)
+        errors: Dict[str, float] = defaultdict(float)
+        for bucket_errors in self.cache.hash_get_many([self.error_key(key) for key in keys],
+                                                      [member for member, _ in ranked]):
+            for member, error in bucket_errors.items():
+                errors[member] += float(error)
+        return [
+            {field: member, 'count': int(score), 'error': int(errors[member])}
+            for member, score in ranked
+        ]
@@ -0,0 +1,216 @@
+"""
+Service Registry
+Lazily created, process-wide service instances and the warm-up that primes them before readiness
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+WARM_UP_STATES = ('cold', 'warming', 'ready')
+
+
+class ServiceRegistry:
+    """
+    Named service factories, each instantiated once per process on first use
+
+    Nothing is constructed at import time: services are created by the
+    first request that needs them, or ahead of traffic by warm_up (which
+    runs in a background thread, off the import path). Instances and the
+    warm-up state are per process, so a registry inherited through a fork
+    starts over cold.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[['ServiceRegistry'], Any]] = {}
+        self._warm_up_steps: List[Tuple[str, Callable[['ServiceRegistry'], None]]] = []
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._instances: Dict[str, Any] = {}
+        # One lock per service, so a slow dependency only blocks its own users
+        self._locks: Dict[str, threading.RLock] = {}
+        self.state = 'cold'
+        self.warm_up_report: Dict[str, Dict[str, Any]] = {}
+        self._warm_up_thread: Optional[threading.Thread] = None
+
+    def _check_process(self) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def register(self, name: str, factory: Callable[['ServiceRegistry'], Any]) -> None:
+        """Register (or replace) the factory of a service; it receives the registry to get its dependencies"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def add_warm_up(self, name: str, step: Callable[['ServiceRegistry'], None]) -> None:
+        """Add a warm-up step (run in registration order)"""
+        with self._lock:
+            if name not in [existing for existing, _ in self._warm_up_steps]:
+                self._warm_up_steps.append((name, step))
+
+    def get(self, name: str) -> Any:
+        """The process's instance of a service, created on first use"""
+        self._check_process()
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+            lock = self._locks.setdefault(name, threading.RLock())
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name](self)
+                self._instances[name] = instance
+                logger.debug("Service created", service=name,
+                             duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        return instance
+
+    def lazy(self, name: str) -> 'LazyService':
+        """Module-level stand-in for a service that is only created when first used"""
+        return LazyService(self, name)
+
+    def reset(self) -> None:
+        """Drop every instance (e.g. in tests or after a fork)"""
+        with self._lock:
+            self._reset()
+
+    @property
+    def ready(self) -> bool:
+        self._check_process()
+        return self.state == 'ready'
+
+    def warm_up(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every warm-up step, recording its duration and error (a failing
+        step does not stop the others: readiness checks report the
+        dependencies that are actually down)
+        """
+        self._check_process()
+        self.state = 'warming'
+        started = time.perf_counter()
+        report: Dict[str, Dict[str, Any]] = {}
+        for name, step in list(self._warm_up_steps):
+            step_started = time.perf_counter()
+            try:
+                step(self)
+                report[name] = {'ok': True}
+            except Exception as e:
+                logger.warning("Warm-up step failed", step=name, error=str(e))
+                report[name] = {'ok': False, 'error': str(e)}
+            report[name]['duration_ms'] = round((time.perf_counter() - step_started) * 1000, 1)
+        self.warm_up_report = report
+        self.state = 'ready'
+        logger.info("Warm-up completed", duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                    failed_steps=[name for name, result in report.items() if not result['ok']])
+        return report
+
+    def start_warm_up(self) -> None:
+        """Run the warm-up in a background thread (once per process)"""
+        self._check_process()
+        with self._lock:
+            if self.state != 'cold' or self._warm_up_thread is not None:
+                return
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name='service-warm-up', daemon=True)
+            self._warm_up_thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        self._check_process()
+        return {
+            'state': self.state,
+            'services': sorted(self._instances),
+            'warm_up': self.warm_up_report,
+        }
+
+
+class LazyService:
+    """Proxy resolving attribute access to the registry's instance of a service"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._registry.get(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name}>"
+
+
+def _create_aws(registry: ServiceRegistry):
+    from .aws_services import AWSServices
+    return AWSServices()
+
+
+def _create_dynamodb(registry: ServiceRegistry):
+    from .aws_services import DynamoDBService
+    return DynamoDBService(registry.get('aws'))
+
+
+def _create_sns(registry: ServiceRegistry):
+    from .aws_services import SNSService
+    return SNSService(registry.get('aws'))
+
+
+def _create_cache(registry: ServiceRegistry):
+    from .cache_service import CacheService
+    return CacheService()
+
+
+def _warm_aws_clients(registry: ServiceRegistry) -> None:
+    from .aws_clients import get_aws_clients
+    get_aws_clients().warm()
+
+
+def _warm_dynamodb_tables(registry: ServiceRegistry) -> None:
+    """Load table metadata (key schema, indexes); also opens the client's first pooled connection"""
+    dynamodb = registry.get('dynamodb')
+    for table in (dynamodb.events_table, dynamodb.metrics_table, dynamodb.aggregations_table):
+        table.load()
+
+
+def _warm_cache(registry: ServiceRegistry) -> None:
+    """Connect to Redis and load the Lua scripts"""
+    registry.get('cache')
+
+
+def _warm_schemas(registry: ServiceRegistry) -> None:
+    """Build the request/response models' JSON schemas and run one validation/serialization round trip"""
+    from src.models.analytics_models import (
+        AnalyticsEvent, EventBatchRequest, EventSearchRequest, EventSearchResponse, MetricData
+    )
+    for model in (AnalyticsEvent, EventBatchRequest, EventSearchRequest, EventSearchResponse, MetricData):
+        model.model_json_schema()
+    event = AnalyticsEvent.model_validate({'event_type': 'page_view', 'user_id': 'warm-up'})
+    EventBatchRequest(events=[event]).model_dump(mode='json')
+
+
+_registry = ServiceRegistry()
+_registry.register('aws', _create_aws)
+_registry.register('dynamodb', _create_dynamodb)
+_registry.register('sns', _create_sns)
+_registry.register('cache', _create_cache)
+_registry.add_warm_up('schemas', _warm_schemas)
+_registry.add_warm_up('aws_clients', _warm_aws_clients)
+_registry.add_warm_up('dynamodb_tables', _warm_dynamodb_tables)
+_registry.add_warm_up('cache', _warm_cache)
+
+
+def get_services() -> ServiceRegistry:
+    """Process-wide service registry"""
+    return _registry
@@ -0,0 +1,226 @@
+"""
+Retention
+Per-event-type retention policies, TTL expiry attributes and throttled purges of legacy items
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import structlog
+from boto3.dynamodb.conditions import Attr
+
+from src.config.settings import Config
+from .rate_limit import RateLimiter
+from .dynamodb_access import AdaptiveClient, DynamoDBAccess
+
+logger = structlog.get_logger(__name__)
+
+# Epoch-seconds attribute DynamoDB TTL expires items on (free, no write capacity)
+TTL_ATTRIBUTE = 'expires_at'
+
+# Days raw events are kept per event type (anything else: EVENT_RETENTION_DAYS)
+DEFAULT_EVENT_RETENTION_DAYS = {
+    'api_call': 30,
+    'error': 90,
+    'page_view': 180,
+    'product_view': 180,
+    'search': 180,
+}
+
+# Days aggregations are kept per period (None: kept forever)
+AGGREGATION_RETENTION_DAYS = {
+    'minute': 14,
+    'hour': 180,
+    'day': None,
+    'week': None,
+    'month': None,
+}
+
+# BatchWriteItem accepts at most 25 requests
+BATCH_SIZE = 25
+
+
+def load_retention_policy(raw: Optional[str] = None) -> Dict[str, int]:
+    """Event retention in days per event type: defaults overridden by RETENTION_POLICIES (JSON object)"""
+    raw = raw if raw is not None else Config.RETENTION_POLICIES
+    policy = dict(DEFAULT_EVENT_RETENTION_DAYS)
+    if raw:
+        policy.update({event_type: int(days) for event_type, days in json.loads(raw).items()})
+    return policy
+
+
+def _as_datetime(value: Any) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class RetentionPolicy:
+    """Retention windows of events and aggregations, and their TTL expiry times"""
+
+    def __init__(self, event_days: Optional[Dict[str, int]] = None, default_days: Optional[int] = None,
+                 aggregation_days: Optional[Dict[str, Optional[int]]] = None):
+        self.event_days = event_days if event_days is not None else load_retention_policy()
+        self.default_days = default_days or Config.EVENT_RETENTION_DAYS
+        self.aggregation_days = aggregation_days if aggregation_days is not None else AGGREGATION_RETENTION_DAYS
+
+    def event_retention(self, event_type: Optional[str]) -> int:
+        return self.event_days.get(event_type, self.default_days)
+
+    def event_expiry(self, event_type: Optional[str], timestamp: Any) -> int:
+        """TTL attribute value (epoch seconds) of an event"""
+        expires = _as_datetime(timestamp) + timedelta(days=self.event_retention(event_type))
+        return int(expires.timestamp())
+
+    def aggregation_expiry(self, period: str, period_start: Any) -> Optional[int]:
+        """TTL attribute value of an aggregation, None if the period is kept forever"""
+        days = self.aggregation_days.get(period)
+        if days is None:
+            return None
+        return int((_as_datetime(period_start) + timedelta(days=days)).timestamp())
+
+    def min_event_retention(self) -> int:
+        return min([self.default_days, *self.event_days.values()])
+
+
+class BatchDeleteEngine:
+    """
+    Parallel, throttled purge of expired items without a TTL attribute
+
+    The table is scanned as `segments` parallel segments projecting only
+    the attributes needed to decide expiry; expired keys are deleted with
+    BatchWriteItem (25 per request). Unprocessed items are retried with
+    exponential backoff and jitter. Reads and writes draw from token
+    buckets shared by all segments, so a purge consumes at most
+    max_read_units / max_write_units per second and leaves the remaining
+    capacity to ingestion.
+    """
+
+    def __init__(self, table, segments: Optional[int] = None,
+                 max_read_units: Optional[float] = None, max_write_units: Optional[float] = None,
+                 key_names: Optional[Sequence[str]] = None, max_retries: int = 8):
+        self.table = table
+        # Throttled scans are retried by the access layer; unprocessed deletes are resent below
+        self.client = AdaptiveClient(table.meta.client, DynamoDBAccess(resend_unprocessed=False))
+        self.segments = segments or Config.PURGE_SEGMENTS
+        self.read_limiter = RateLimiter(max_read_units or Config.PURGE_MAX_READ_UNITS)
+        self.write_limiter = RateLimiter(max_write_units or Config.PURGE_MAX_WRITE_UNITS)
+        self.key_names = list(key_names) if key_names else [k['AttributeName'] for k in table.key_schema]
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.stats = {'scanned': 0, 'deleted': 0, 'retries': 0}
+
+    def purge(self, is_expired: Callable[[Dict[str, Any]], bool], filter_expression=None,
+              attributes: Sequence[str] = ()) -> Dict[str, int]:
+        """Delete every item for which is_expired(item) holds; returns scan/delete counts"""
+        names = {f'#a{i}': name for i, name in enumerate(dict.fromkeys([*self.key_names, *attributes]))}
+        params: Dict[str, Any] = {
+            'TableName': self.table.name,
+            'ProjectionExpression': ', '.join(names),
+            'ExpressionAttributeNames': names,
+            'ReturnConsumedCapacity': 'TOTAL',
+            'TotalSegments': self.segments,
+        }
+        if filter_expression is not None:
+            params['FilterExpression'] = filter_expression
+
+        with ThreadPoolExecutor(max_workers=self.segments) as pool:
+            for future in [pool.submit(self._purge_segment, dict(params, Segment=s), is_expired)
+                           for s in range(self.segments)]:
+                future.result()
+        return dict(self.stats)
+
+    def _purge_segment(self, params: Dict[str, Any], is_expired: Callable[[Dict[str, Any]], bool]) -> None:
+        self.delete_keys(
+            {name: item[name] for name in self.key_names}
+            for item in self._scan_segment(params) if is_expired(item)
+        )
+
+    def _scan_segment(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        while True:
+            response = self.client.scan(**params)
+            self.read_limiter.on_scan_page(response)
+            items = response.get('Items', [])
+            with self.lock:
+                self.stats['scanned'] += len(items)
+            yield from items
+            if 'LastEvaluatedKey' not in response:
+                return
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def delete_keys(self, keys: Iterable[Dict[str, Any]]) -> None:
+        """Delete items by primary key in throttled batches of 25"""
+        pending: List[Dict[str, Any]] = []
+        for key in keys:
+            pending.append(key)
+            if len(pending) == BATCH_SIZE:
+                self._delete_batch(pending)
+                pending = []
+        if pending:
+            self._delete_batch(pending)
+
+    def _delete_batch(self, keys: List[Dict[str, Any]]) -> None:
+        requests = [{'DeleteRequest': {'Key': key}} for key in keys]
+        for attempt in range(self.max_retries + 1):
+            self.write_limiter.acquire(len(requests))
+            response = self.client.batch_write_item(RequestItems={self.table.name: requests})
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table.name, [])
+            with self.lock:
+                self.stats['deleted'] += len(requests) - len(unprocessed)
+            if not unprocessed:
+                return
+            requests = unprocessed
+            with self.lock:
+                self.stats['retries'] += 1
+            time.sleep(random.uniform(0, min(20.0, 0.05 * 2 ** attempt)))
+        raise RuntimeError(f"{len(requests)} deletes still unprocessed after {self.max_retries} retries")
+
+
+def purge_expired_events(table, policy: Optional[RetentionPolicy] = None,
+                         now: Optional[datetime] = None, **engine_options) -> Dict[str, int]:
+    """Delete legacy events (no TTL attribute) older than their event type's retention"""
+    policy = policy or RetentionPolicy()
+    now = now or datetime.now(timezone.utc)
+    # Nothing younger than the shortest retention can be expired: filter it out server-side
+    oldest_kept = (now - timedelta(days=policy.min_event_retention())).isoformat()
+
+    def is_expired(item: Dict[str, Any]) -> bool:
+        retention = timedelta(days=policy.event_retention(item.get('event_type')))
+        return _as_datetime(item['timestamp']) < now - retention
+
+    engine = BatchDeleteEngine(table, **engine_options)
+    stats = engine.purge(
+        is_expired,
+        filter_expression=Attr(TTL_ATTRIBUTE).not_exists() & Attr('timestamp').lt(oldest_kept),
+        attributes=('timestamp', 'event_type'),
+    )
+    logger.info("Expired events purged", **stats)
+    return stats
+
+
+def purge_expired_aggregations(table, policy: Optional[RetentionPolicy] = None,
+                               now: Optional[datetime] = None, **engine_options) -> Dict[str, int]:
+    """Delete legacy aggregations (no TTL attribute) older than their period's retention"""
+    policy = policy or RetentionPolicy()
+    now = now or datetime.now(timezone.utc)
+    expiring = [period for period, days in policy.aggregation_days.items() if days is not None]
+    if not expiring:
+        return {'scanned': 0, 'deleted': 0, 'retries': 0}
+
+    def is_expired(item: Dict[str, Any]) -> bool:
+        expiry = policy.aggregation_expiry(item.get('period'), item['period_start'])
+        return expiry is not None and expiry < now.timestamp()
+
+    engine = BatchDeleteEngine(table, **engine_options)
+    stats = engine.purge(
+        is_expired,
+        filter_expression=Attr(TTL_ATTRIBUTE).not_exists() & Attr('period').is_in(expiring),
+        attributes=('period', 'period_start'),
+    )
+    logger.info("Expired aggregations purged", **stats)
+    return stats
@@ -0,0 +1,328 @@
+"""
+Sessionizer
+Incremental sessionization of the event stream with an inactivity gap
+"""
+
+import json
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from src.config.settings import Config
+from .aggregation_engine import SESSION_TOTAL_FIELDS
+from .cache_service import CacheService
+from .realtime_metrics import time_bucket
+
+logger = structlog.get_logger(__name__)
+
+# Event types that count towards page depth
+PAGE_EVENT_TYPES = ('page_view', 'product_view')
+
+# Fold a batch of activity into open sessions in one atomic call (same rules as fold_session).
+# KEYS: one session key per session (RedisSessionStore.key), then the activity index (sorted set)
+# ARGV: gap, ttl, then per session: session_id, number of events, and per event (time order)
+#       ts, is_page ('1'/'0'), user_id ('' for none)
+# Returns JSON arrays of the started sessions and of the states of sessions ended by a gap.
+SESSION_FOLD_LUA = """
+local gap, ttl = tonumber(ARGV[1]), tonumber(ARGV[2])
+local active = KEYS[#KEYS]
+local started, ended = {}, {}
+local i = 3
+for k = 1, #KEYS - 1 do
+    local session_id, n = ARGV[i], tonumber(ARGV[i + 1])
+    i = i + 2
+    local raw = redis.call('GET', KEYS[k])
+    local state = nil
+    if raw then
+        state = cjson.decode(raw)
+    end
+    for _ = 1, n do
+        local ts = tonumber(ARGV[i])
+        if state == nil or ts - state['last'] > gap then
+            if state ~= nil then
+                table.insert(ended, state)
+            end
+            local user_id = ARGV[i + 2]
+            if user_id == '' then
+                user_id = cjson.null
+            end
+            state = {session_id = session_id, user_id = user_id, start = ts, last = ts, events = 0, depth = 0}
+            table.insert(started, {session_id = session_id, user_id = user_id, start = ts})
+        end
+        state['start'] = math.min(state['start'], ts)
+        state['last'] = math.max(state['last'], ts)
+        state['events'] = state['events'] + 1
+        if ARGV[i + 1] == '1' then
+            state['depth'] = state['depth'] + 1
+        end
+        i = i + 3
+    end
+    redis.call('SET', KEYS[k], cjson.encode(state), 'EX', ttl)
+    redis.call('ZADD', active, state['last'], session_id)
+end
+return {cjson.encode(started), cjson.encode(ended)}
+"""
+
+# Claim sessions read from the activity index as idle: a session still idle (scored
+# ARGV[1] or earlier) is removed from the index and its state deleted, so concurrent
+# claimers close it exactly once.
+# KEYS: the activity index, then one session key per session
+# ARGV: cutoff, then the session ids (in the order of their keys)
+# Returns the claimed states (JSON).
+SESSION_CLAIM_LUA = """
+local cutoff = tonumber(ARGV[1])
+local states = {}
+for k = 2, #KEYS do
+    local session_id = ARGV[k]
+    local last = redis.call('ZSCORE', KEYS[1], session_id)
+    if last and tonumber(last) <= cutoff then
+        local raw = redis.call('GET', KEYS[k])
+        if raw then
+            table.insert(states, raw)
+        end
+        redis.call('DEL', KEYS[k])
+        redis.call('ZREM', KEYS[1], session_id)
+    end
+end
+return states
+"""
+
+# Activity of one session in a batch: (epoch seconds, is a page event, user_id), in time order
+Activity = List[Tuple[float, bool, Optional[str]]]
+
+
+def event_field(event: Any, name: str) -> Any:
+    """Read a field from an AnalyticsEvent or a raw event dict"""
+    if isinstance(event, dict):
+        return event.get(name)
+    return getattr(event, name, None)
+
+
+def event_epoch(ts: Any) -> float:
+    """Epoch seconds of a datetime or ISO timestamp (naive values are UTC)"""
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def session_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Completed-session record: duration, page depth and bounce flag"""
+    return {
+        'session_id': state['session_id'],
+        'user_id': state.get('user_id'),
+        'start': state['start'],
+        'end': state['last'],
+        'duration': state['last'] - state['start'],
+        'events': state['events'],
+        'depth': state['depth'],
+        'bounce': state['depth'] <= 1,
+    }
+
+
+def fold_session(state: Optional[Dict[str, Any]], session_id: str, activity: Activity, gap: float,
+                 started: List[Dict[str, Any]], ended: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fold one session's activity into its open state; an event after more
+    than gap seconds closes the state (appended to ended) and starts a new
+    one (appended to started). Returns the resulting open state.
+    """
+    for ts, is_page, user_id in activity:
+        if state is None or ts - state['last'] > gap:
+            if state is not None:
+                ended.append(state)
+            state = {'session_id': session_id, 'user_id': user_id,
+                     'start': ts, 'last': ts, 'events': 0, 'depth': 0}
+            started.append({'session_id': session_id, 'user_id': user_id, 'start': ts})
+        state['start'] = min(state['start'], ts)
+        state['last'] = max(state['last'], ts)
+        state['events'] += 1
+        if is_page:
+            state['depth'] += 1
+    return state
+
+
+class InMemorySessionStore:
+    """
+    Compact in-worker session store (backfills and single-process replays)
+
+    Sessions are kept in least-recently-active order. At most max_sessions
+    are held; beyond that the least recently active session is evicted and
+    reported as ended, so memory stays bounded.
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.max_sessions = max_sessions or Config.SESSION_STORE_MAX_SESSIONS
+        self.sessions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    def get_many(self, session_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return {sid: self.sessions[sid] for sid in session_ids if sid in self.sessions}
+
+    def put_many(self, states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store session states; returns states evicted to stay within bounds"""
+        for state in states:
+            self.sessions[state['session_id']] = state
+            self.sessions.move_to_end(state['session_id'])
+        evicted = []
+        while len(self.sessions) > self.max_sessions:
+            evicted.append(self.sessions.popitem(last=False)[1])
+        return evicted
+
+    def fold(self, activity: Dict[str, Activity], gap: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fold per-session activity into the stored sessions; returns (started, ended states)"""
+        states = self.get_many(list(activity))
+        started, ended, updated = [], [], []
+        for session_id, session_activity in activity.items():
+            updated.append(fold_session(states.get(session_id), session_id, session_activity, gap, started, ended))
+        ended.extend(self.put_many(updated))
+        return started, ended
+
+    def pop_inactive(self, cutoff: float, limit: int) -> List[Dict[str, Any]]:
+        """Remove and return sessions whose last activity is before cutoff"""
+        expired = []
+        while self.sessions and len(expired) < limit:
+            state = next(iter(self.sessions.values()))
+            if state['last'] >= cutoff:
+                break
+            expired.append(self.sessions.popitem(last=False)[1])
+        return expired
+
+
+class RedisSessionStore:
+    """
+    Shared session store in Redis
+
+    Each open session is a small JSON state under session:{sessions}:<id>
+    with a TTL of twice the inactivity gap, and its last activity is
+    indexed in the sessions:{sessions}:active sorted set. Memory is
+    proportional to concurrently open sessions; abandoned state expires on
+    its own. Folding a batch and claiming idle sessions are single Lua
+    scripts that declare every key they touch, so workers sharing a
+    session never overwrite each other's updates and an idle session is
+    closed exactly once. The {sessions} hash tag keeps the index and the
+    states in one Redis Cluster slot, as the scripts require.
+    """
+
+    ACTIVE_KEY = 'sessions:{sessions}:active'
+    KEY_PREFIX = 'session:{sessions}:'
+
+    def __init__(self, cache: Optional[CacheService] = None, gap_seconds: Optional[int] = None):
+        self.cache = cache or CacheService()
+        self.gap = gap_seconds or Config.SESSION_INACTIVITY_GAP
+        self.ttl = 2 * self.gap
+
+    @classmethod
+    def key(cls, session_id: str) -> str:
+        return f"{cls.KEY_PREFIX}{session_id}"
+
+    def fold(self, activity: Dict[str, Activity], gap: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fold per-session activity into the stored sessions atomically; returns (started, ended states)"""
+        keys, args = [], [gap, self.ttl]
+        for session_id, session_activity in activity.items():
+            keys.append(self.key(session_id))
+            args.extend((session_id, len(session_activity)))
+            for ts, is_page, user_id in session_activity:
+                args.extend((repr(ts), '1' if is_page else '0', user_id or ''))
+        result = self.cache.run_script(SESSION_FOLD_LUA, keys + [self.ACTIVE_KEY], args)
+        if result is None:
+            return [], []
+        started, ended = (json.loads(part) or [] for part in result)
+        return started, ended
+
+    def count_active(self, now: Optional[datetime] = None) -> int:
+        """Open sessions with activity within the inactivity gap"""
+        now = now or datetime.now(timezone.utc)
+        return self.cache.zset_count(self.ACTIVE_KEY, event_epoch(now) - self.gap)
+
+    def pop_inactive(self, cutoff: float, limit: int) -> List[Dict[str, Any]]:
+        """Claim and return sessions whose last activity is at or before cutoff"""
+        session_ids = self.cache.zset_range_by_score(self.ACTIVE_KEY, cutoff, limit)
+        if not session_ids:
+            return []
+        keys = [self.ACTIVE_KEY] + [self.key(session_id) for session_id in session_ids]
+        states = self.cache.run_script(SESSION_CLAIM_LUA, keys, [cutoff] + session_ids)
+        return [json.loads(state) for state in states or []]
+
+
+class Sessionizer:
+    """
+    Incremental sessionizer keyed by session_id
+
+    A session ends after gap_seconds without activity; an event arriving
+    after a longer gap closes the previous session and starts a new one
+    under the same session_id. Events are grouped per session so each
+    batch costs a single fold call to the store.
+    """
+
+    def __init__(self, store=None, gap_seconds: Optional[int] = None):
+        self.store = store if store is not None else InMemorySessionStore()
+        self.gap = gap_seconds or Config.SESSION_INACTIVITY_GAP
+
+    def process(self, events: Iterable[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fold events into open sessions; returns (started, ended) sessions"""
+        activity: Dict[str, Activity] = defaultdict(list)
+        for event in events:
+            session_id = event_field(event, 'session_id')
+            if session_id:
+                activity[session_id].append((
+                    event_epoch(event_field(event, 'timestamp')),
+                    event_field(event, 'event_type') in PAGE_EVENT_TYPES,
+                    event_field(event, 'user_id'),
+                ))
+        if not activity:
+            return [], []
+
+        for session_activity in activity.values():
+            session_activity.sort(key=lambda item: item[0])
+        started, ended = self.store.fold(activity, self.gap)
+        return started, [session_summary(state) for state in ended]
+
+    def expire(self, now: Optional[datetime] = None, limit: int = 10000) -> List[Dict[str, Any]]:
+        """Close sessions inactive for longer than the gap"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now.timestamp() - self.gap
+        return [session_summary(state) for state in self.store.pop_inactive(cutoff, limit)]
+
+
+class SessionMetrics:
+    """
+    Per-minute session totals consumed by minute aggregations
+
+    Sessions are attributed to the minute they were started or closed in
+    (processing time), so the totals of a minute are final once the
+    minute's aggregation is built and roll up like any other count.
+    """
+
+    TTL = 3 * 86400
+
+    def __init__(self, cache: Optional[CacheService] = None):
+        self.cache = cache or CacheService()
+
+    @staticmethod
+    def key(field: str, bucket: str) -> str:
+        return f"session_stats:{field}:{bucket}"
+
+    def record(self, started: List[Dict[str, Any]], ended: List[Dict[str, Any]],
+               now: Optional[datetime] = None) -> bool:
+        if not started and not ended:
+            return False
+        bucket = time_bucket('minute', now or datetime.now(timezone.utc))
+        totals = {
+            'sessions_started': len(started),
+            'sessions': len(ended),
+            'total_duration': int(round(sum(s['duration'] for s in ended))),
+            'total_depth': sum(s['depth'] for s in ended),
+            'bounces': sum(1 for s in ended if s['bounce']),
+        }
+        mapping = {self.key(field, bucket): value for field, value in totals.items() if value}
+        return self.cache.increment_many(mapping, ttls={key: self.TTL for key in mapping})
+
+    def totals(self, minute_start: datetime) -> Dict[str, int]:
+        """Session totals recorded during the minute starting at minute_start"""
+        bucket = time_bucket('minute', minute_start)
+        keys = {field: self.key(field, bucket) for field in SESSION_TOTAL_FIELDS}
+        values = self.cache.get_many(list(keys.values()))
+        return {field: int(values.get(key, 0)) for field, key in keys.items()}
@@ -0,0 +1,117 @@
+"""
+Write Sharding
+Hash-suffixed time-bucket partition keys for events, and their scatter-gather reads
+"""
+
+import bisect
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.config.settings import Config
+from .sketches import hash64
+
+BUCKET_SPAN = timedelta(hours=1)
+
+
+def _as_datetime(value: Any) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def bucket_start(ts: Any) -> datetime:
+    """Start of the hour bucket containing ts"""
+    return _as_datetime(ts).replace(minute=0, second=0, microsecond=0)
+
+
+class ShardPlan:
+    """
+    Number of write shards per hour bucket
+
+    Events of one hour are spread over N partition keys
+    "{bucket}#{shard}" with shard = hash(event_id) mod N, so peak ingestion
+    is not capped by one partition's throughput. N can change over time:
+    the schedule maps a bucket start to the shard count used from that
+    bucket on (e.g. raise it ahead of a sale, lower it afterwards). Since
+    readers derive N from the same schedule, changes only apply to future
+    buckets. Buckets before `since` (if set) were written unsharded.
+    """
+
+    def __init__(self, default_shards: Optional[int] = None,
+                 schedule: Optional[Dict[str, int]] = None, since: Optional[str] = None):
+        self.default_shards = default_shards or Config.EVENT_SHARDS
+        if schedule is None:
+            schedule = json.loads(Config.EVENT_SHARD_SCHEDULE) if Config.EVENT_SHARD_SCHEDULE else {}
+        entries = sorted((bucket_start(start), int(shards)) for start, shards in schedule.items())
+        self.starts = [start for start, _ in entries]
+        self.counts = [shards for _, shards in entries]
+        since = since if since is not None else Config.EVENT_SHARDING_SINCE
+        self.since = bucket_start(since) if since else None
+
+    def shards_for(self, bucket: datetime) -> int:
+        i = bisect.bisect_right(self.starts, bucket)
+        return self.counts[i - 1] if i else self.default_shards
+
+    @staticmethod
+    def bucket_label(bucket: datetime) -> str:
+        return bucket.strftime('%Y-%m-%dT%H')
+
+    def partition_key(self, event_id: str, timestamp: Any) -> str:
+        """Sharded time-bucket key of an event"""
+        bucket = bucket_start(timestamp)
+        shard = hash64(str(event_id)) % self.shards_for(bucket)
+        return f"{self.bucket_label(bucket)}#{shard:03d}"
+
+    def partition_keys(self, bucket: datetime) -> List[str]:
+        """Every shard key of one bucket"""
+        label = self.bucket_label(bucket)
+        return [f"{label}#{shard:03d}" for shard in range(self.shards_for(bucket))]
+
+    def buckets(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """Hour buckets overlapping [start, end)"""
+        bucket = bucket_start(start)
+        end = _as_datetime(end)
+        while bucket < end:
+            yield bucket
+            bucket += BUCKET_SPAN
+
+    def split(self, start: datetime, end: datetime) -> Tuple[Optional[Tuple[datetime, datetime]],
+                                                              Optional[Tuple[datetime, datetime]]]:
+        """(unsharded, sharded) sub-ranges of [start, end), either may be None"""
+        start, end = _as_datetime(start), _as_datetime(end)
+        if self.since is None or start >= self.since:
+            return None, (start, end)
+        if end <= self.since:
+            return (start, end), None
+        return (start, self.since), (self.since, end)
+
+
+def _prefetched(pool: ThreadPoolExecutor, pages: Iterator[List[Dict]]) -> Iterator[Dict]:
+    """
+    Items of one shard, fetching its next page in the background while the
+    current one is consumed (the first page is requested immediately, so
+    all shards start in parallel)
+    """
+    return _drain(pool, pages, pool.submit(next, pages, None))
+
+
+def _drain(pool: ThreadPoolExecutor, pages: Iterator[List[Dict]], future) -> Iterator[Dict]:
+    while True:
+        page = future.result()
+        if page is None:
+            return
+        future = pool.submit(next, pages, None)
+        yield from page
+
+
+def scatter_gather(query_pages: Callable[[str], Iterator[List[Dict]]], partition_keys: Iterable[str],
+                   pool: ThreadPoolExecutor) -> Iterator[Dict]:
+    """
+    Read every shard of a bucket in parallel and merge the items in
+    timestamp order (each shard's query returns its items sorted)
+    """
+    streams = [_prefetched(pool, query_pages(key)) for key in partition_keys]
+    return heapq.merge(*streams, key=lambda item: item['timestamp'])
@@ -0,0 +1,327 @@
+"""
+Probabilistic Sketches
+Mergeable, fixed-size summaries used by aggregations and rollups
+"""
+
+import base64
+import hashlib
+import heapq
+import json
+import math
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+
+def hash64(value: str) -> int:
+    """Stable 64-bit hash (identical across processes and workers)"""
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter
+
+    Uses 2^precision one-byte registers, so memory is constant regardless of
+    how many values are added. Two sketches with the same precision merge by
+    taking the register-wise maximum, which makes unique counts composable
+    across periods and workers.
+    """
+
+    DEFAULT_PRECISION = 12  # 4096 registers, ~1.6% standard error
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        if registers is not None:
+            if len(registers) != self.num_registers:
+                raise ValueError("Register count does not match precision")
+            self.registers = bytearray(registers)
+        else:
+            self.registers = bytearray(self.num_registers)
+
+    def add(self, value: Optional[str]) -> None:
+        """Add a value to the sketch (None and empty values are ignored)"""
+        if not value:
+            return
+        x = hash64(str(value))
+        index = x >> (64 - self.precision)
+        remaining = (x << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = (64 - self.precision) + 1 if remaining == 0 else 65 - remaining.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Optional[str]]) -> None:
+        """Add many values"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Merge another sketch into this one (in place)"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        registers = self.registers
+        for i, rank in enumerate(other.registers):
+            if rank > registers[i]:
+                registers[i] = rank
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct values"""
+        m = self.num_registers
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+
+        harmonic_sum = 0.0
+        zeros = 0
+        for rank in self.registers:
+            harmonic_sum += 2.0 ** -rank
+            if rank == 0:
+                zeros += 1
+
+        estimate = alpha * m * m / harmonic_sum
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def is_empty(self) -> bool:
+        return not any(self.registers)
+
+    def to_string(self) -> str:
+        """Compact serialized form for DynamoDB / JSON storage"""
+        payload = bytes([self.precision]) + zlib.compress(bytes(self.registers))
+        return base64.b64encode(payload).decode('ascii')
+
+    @classmethod
+    def from_string(cls, data: str) -> 'HyperLogLog':
+        """Restore a sketch serialized with to_string()"""
+        payload = base64.b64decode(data)
+        return cls(precision=payload[0], registers=zlib.decompress(payload[1:]))
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary
+
+    Keeps at most `capacity` counters no matter how many distinct items are
+    offered. When a new item arrives and the summary is full, it replaces the
+    item with the smallest count and inherits that count as its error, so
+    every reported count overestimates the true count by at most `error`.
+    Summaries merge by adding counters and keeping the largest `capacity`.
+    """
+
+    DEFAULT_CAPACITY = 200
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("SpaceSaving capacity must be positive")
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self._heap = []     # lazy min-heap of (count, item); stale entries skipped
+
+    def offer(self, item: Optional[str], weight: int = 1) -> None:
+        """Count `weight` occurrences of item (None and empty items are ignored)"""
+        if not item or weight <= 0:
+            return
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            self._push(counter[0], item)
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            self._push(weight, item)
+            return
+
+        min_count = self._pop_min()
+        self.counters[item] = [min_count + weight, min_count]
+        self._push(min_count + weight, item)
+
+    def update(self, items: Iterable[Optional[str]]) -> None:
+        for item in items:
+            self.offer(item)
+
+    def _push(self, count: int, item: str) -> None:
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c[0], i) for i, c in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> int:
+        """Evict the item with the smallest count and return that count"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                del self.counters[item]
+                return count
+
+    def min_count(self) -> int:
+        """Smallest tracked count (0 while the summary is not full)"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(c[0] for c in self.counters.values())
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Merge another summary into this one (in place)"""
+        # An item missing from a full summary occurred at most min_count times there
+        self_floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            mine = self.counters.get(item, [self_floor, self_floor])
+            theirs = other.counters.get(item, [other_floor, other_floor])
+            merged[item] = [mine[0] + theirs[0], mine[1] + theirs[1]]
+
+        top = sorted(merged.items(), key=lambda kv: (-kv[1][0], kv[0]))[:self.capacity]
+        self.counters = {item: counter for item, counter in top}
+        self._heap = [(c[0], i) for i, c in self.counters.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """Items with the largest counts as (item, count, error), descending"""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(item, count, error) for item, (count, error) in ranked[:k]]
+
+    def to_string(self) -> str:
+        payload = json.dumps({'capacity': self.capacity, 'counters': self.top()}, separators=(',', ':'))
+        return base64.b64encode(zlib.compress(payload.encode('utf-8'))).decode('ascii')
+
+    @classmethod
+    def from_string(cls, data: str) -> 'SpaceSaving':
+        payload = json.loads(zlib.decompress(base64.b64decode(data)))
+        summary = cls(capacity=payload['capacity'])
+        summary.counters = {item: [count, error] for item, count, error in payload['counters']}
+        summary._heap = [(c[0], i) for i, c in summary.counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+
+class DDSketch:
+    """
+    DDSketch quantile summary with relative-error guarantees
+
+    Positive values are mapped to logarithmic buckets of width gamma, so any
+    reported quantile is within `relative_accuracy` of the true value. The
+    number of buckets is capped (lowest buckets collapse first), keeping the
+    sketch small; sketches with the same accuracy merge by adding buckets.
+    """
+
+    DEFAULT_RELATIVE_ACCURACY = 0.01
+    DEFAULT_MAX_BINS = 2048
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}        # bucket index -> count
+        self.zero_count = 0   # values <= 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def key(self, value: float) -> int:
+        """Bucket index of a positive value"""
+        return int(math.ceil(math.log(value) / self.log_gamma))
+
+    def add(self, value: float, weight: int = 1) -> None:
+        value = float(value)
+        if value > 0:
+            k = self.key(value)
+            self.bins[k] = self.bins.get(k, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_bins(self, bins: dict, count: int, total: float, low: float, high: float,
+                 zero_count: int = 0) -> None:
+        """Add pre-bucketed values (used by the vectorized kernel)"""
+        for k, c in bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += zero_count
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets together until within max_bins"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        self.bins[target] += sum(self.bins.pop(k) for k in keys[:excess])
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        """Merge another sketch into this one (in place)"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge DDSketches with different accuracy")
+        if other.count:
+            self.add_bins(other.bins, other.count, other.sum, other.min, other.max, other.zero_count)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0..1), None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                value = 2 * self.gamma ** k / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)) -> dict:
+        """Count, mean, min/max and the requested percentiles (p50, p90, ...)"""
+        result = {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+        for q in quantiles:
+            result[f'p{q * 100:g}'] = self.quantile(q)
+        return result
+
+    def to_string(self) -> str:
+        payload = json.dumps({
+            'a': self.relative_accuracy, 'm': self.max_bins, 'b': sorted(self.bins.items()),
+            'z': self.zero_count, 'n': self.count, 's': self.sum,
+            'lo': self.min if self.count else None, 'hi': self.max if self.count else None,
+        }, separators=(',', ':'))
+        return base64.b64encode(zlib.compress(payload.encode('utf-8'))).decode('ascii')
+
+    @classmethod
+    def from_string(cls, data: str) -> 'DDSketch':
+        payload = json.loads(zlib.decompress(base64.b64decode(data)))
+        sketch = cls(relative_accuracy=payload['a'], max_bins=payload['m'])
+        sketch.bins = {int(k): c for k, c in payload['b']}
+        sketch.zero_count = payload['z']
+        sketch.count = payload['n']
+        sketch.sum = payload['s']
+        if sketch.count:
+            sketch.min, sketch.max = payload['lo'], payload['hi']
+        return sketch
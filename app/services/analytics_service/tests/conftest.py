@@ -0,0 +1,19 @@
+import pytest
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import cache_service
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Redis server in memory (fakeredis, with Lua) behind every CacheService created in the test"""
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache_service.redis.Redis, 'from_url',
+                        lambda url, **kwargs: fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(cache_service, '_redis_clients', {})
+    return fakeredis.FakeRedis(server=server, decode_responses=True)
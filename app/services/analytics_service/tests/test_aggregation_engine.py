@@ -0,0 +1,427 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.aggregation_engine import (
+    AggregateState, RollupEngine, period_bounds, previous_period_start, range_segments
+)
+from src.services.columnar_kernel import (
+    ColumnarAggregator, ColumnarBatch, grouped_sums, time_histogram, to_cents, to_cents_array
+)
+from src.services.sketches import DDSketch, HyperLogLog, SpaceSaving
+
+
+class FakeDynamoDB:
+    """In-memory stand-in for DynamoDBService used by the rollup engine"""
+
+    def __init__(self, events=None):
+        self.events = events or []
+        self.aggregations = {}
+        self.event_queries = 0
+
+    def iter_events_by_timerange(self, start, end, attributes=None, page_size=None):
+        self.event_queries += 1
+        return (e for e in self.events if start <= e['timestamp'] < end)
+
+    def store_aggregation(self, aggregation):
+        item = aggregation.model_dump(mode='json')
+        self.aggregations[(aggregation.period, item['period_start'])] = item
+        return True
+
+    def get_aggregations(self, period, start_time=None, end_time=None, limit=None):
+        return [
+            item for (p, _), item in self.aggregations.items()
+            if p == period and start_time <= datetime.fromisoformat(item['period_start']) < end_time
+        ]
+
+
+def make_events(start, minutes, per_minute=3):
+    events = []
+    for m in range(minutes):
+        for i in range(per_minute):
+            events.append({
+                'timestamp': start + timedelta(minutes=m, seconds=i),
+                'event_type': 'purchase' if i == 0 else 'page_view',
+                'user_id': f'user{(m * per_minute + i) % 50}',
+                'session_id': f'session{m}',
+                'revenue': '10.10' if i == 0 else None,
+            })
+    return events
+
+
+class TestPeriodBounds:
+    """Test period boundary helpers"""
+
+    def test_month_rollover(self):
+        start, end = period_bounds('month', datetime(2025, 12, 15, 8, tzinfo=timezone.utc))
+        assert start == datetime(2025, 12, 1, tzinfo=timezone.utc)
+        assert end == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def test_week_starts_monday(self):
+        start, end = period_bounds('week', datetime(2025, 6, 5, 12, tzinfo=timezone.utc))
+        assert start.weekday() == 0
+        assert end - start == timedelta(weeks=1)
+
+    def test_previous_period(self):
+        now = datetime(2025, 6, 5, 12, 30, 10, tzinfo=timezone.utc)
+        assert previous_period_start('minute', now) == datetime(2025, 6, 5, 12, 29, tzinfo=timezone.utc)
+        assert previous_period_start('hour', now) == datetime(2025, 6, 5, 11, tzinfo=timezone.utc)
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            period_bounds('year', datetime.now(timezone.utc))
+
+
+class TestHyperLogLog:
+    """Test HyperLogLog distinct counting"""
+
+    def test_estimate_accuracy(self):
+        sketch = HyperLogLog()
+        sketch.update(f'user{i}' for i in range(20000))
+        assert abs(sketch.count() - 20000) / 20000 < 0.05
+
+    def test_merge_and_serialization(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        a.update(f'user{i}' for i in range(0, 600))
+        b.update(f'user{i}' for i in range(400, 1000))
+        merged = HyperLogLog.from_string(a.to_string()).merge(b)
+        assert abs(merged.count() - 1000) / 1000 < 0.05
+
+
+class TestSpaceSaving:
+    """Test Space-Saving heavy hitters"""
+
+    @staticmethod
+    def skewed_stream(n, offset=0):
+        # sku0 is most frequent, then sku1, ...; plus a long tail of unique SKUs
+        for i in range(n):
+            yield f'sku{i % 7}' if i % 2 == 0 else f'tail{offset + i}'
+
+    def test_finds_heavy_hitters_with_bounded_counters(self):
+        summary = SpaceSaving(capacity=50)
+        summary.update(self.skewed_stream(20000))
+        assert len(summary.counters) == 50
+        top = {item for item, _, _ in summary.top(7)}
+        assert top == {f'sku{i}' for i in range(7)}
+        true_counts = {}
+        for item in self.skewed_stream(20000):
+            true_counts[item] = true_counts.get(item, 0) + 1
+        for item, count, error in summary.top(7):
+            assert count - error <= true_counts[item] <= count
+
+    def test_merge_keeps_heavy_hitters(self):
+        a, b = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+        a.update(self.skewed_stream(10000))
+        b.update(self.skewed_stream(10000, offset=10000))
+        merged = SpaceSaving.from_string(a.to_string()).merge(b)
+        assert {item for item, _, _ in merged.top(7)} == {f'sku{i}' for i in range(7)}
+        assert len(merged.counters) <= 50
+
+
+class TestDDSketch:
+    """Test DDSketch quantile summaries"""
+
+    def test_relative_accuracy(self):
+        values = [i * 0.37 for i in range(1, 10001)]
+        sketch = DDSketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+    def test_merge_and_serialization(self):
+        a, b, whole = DDSketch(), DDSketch(), DDSketch()
+        for i in range(1, 2001):
+            (a if i % 2 else b).add(i)
+            whole.add(i)
+        merged = DDSketch.from_string(a.to_string()).merge(DDSketch.from_string(b.to_string()))
+        assert merged.count == 2000
+        assert merged.bins == whole.bins
+        assert merged.summary() == whole.summary()
+
+    def test_bins_are_bounded(self):
+        sketch = DDSketch(max_bins=64)
+        for i in range(1, 100000, 7):
+            sketch.add(i / 1000)
+        assert len(sketch.bins) <= 64
+        assert sketch.quantile(0.99) == pytest.approx(99, rel=0.02)
+
+
+class TestRollupEngine:
+    """Test hierarchical rollups"""
+
+    def test_hour_rolled_up_from_minutes(self):
+        hour = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(hour, 60))
+
+        # Store minute level from raw events
+        for m in range(60):
+            db.store_aggregation(RollupEngine(db).build('minute', hour + timedelta(minutes=m)))
+        queries_after_minutes = db.event_queries
+
+        aggregation = RollupEngine(db).build('hour', hour)
+
+        assert db.event_queries == queries_after_minutes  # no raw event reads
+        assert aggregation.total_events == 180
+        assert aggregation.total_revenue == Decimal('606.00')
+        assert aggregation.event_type_breakdown['purchase']['total_events'] == 60
+        assert aggregation.unique_users == pytest.approx(50, rel=0.05)
+        assert aggregation.unique_sessions == pytest.approx(60, rel=0.05)
+
+    def test_missing_children_are_rebuilt(self):
+        day = datetime(2025, 6, 5, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(day + timedelta(hours=3), 2))
+
+        engine = RollupEngine(db)
+        aggregation = engine.build('day', day)
+
+        assert aggregation.total_events == 6
+        assert engine.stats['aggregations_rebuilt'] == 24 + 24 * 60
+        assert db.event_queries == 24  # one raw-event read per missing hour, not per minute
+        # Rebuilt hours are now stored and reused
+        second = RollupEngine(db)
+        assert second.build('day', day).total_events == 6
+        assert second.stats['aggregations_rebuilt'] == 0
+        assert second.stats['aggregations_read'] == 24
+
+    def test_rebuild_reads_are_capped(self):
+        day = datetime(2025, 6, 5, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(day, 4 * 60))
+        for m in range(30):  # half of hour 0 already stored
+            db.store_aggregation(RollupEngine(db).build('minute', day + timedelta(minutes=m)))
+        queries_before = db.event_queries
+
+        engine = RollupEngine(db, max_rebuild_reads=2)
+        aggregation = engine.build('day', day)
+
+        assert db.event_queries - queries_before == 2
+        assert aggregation.total_events == 2 * 60 * 3
+        assert engine.stats['aggregations_skipped'] == 22
+        # Only complete hours are stored; skipped ones are rebuilt by a later build
+        assert {datetime.fromisoformat(start) for period, start in db.aggregations if period == 'hour'} == {
+            day + timedelta(hours=h) for h in range(2)}
+
+    def test_streaming_from_events(self):
+        month = datetime(2025, 6, 1, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(month + timedelta(days=10), 30, per_minute=10))
+
+        engine = RollupEngine(db)
+        aggregation = engine.build('month', month, from_events=True)
+
+        assert db.event_queries == 1
+        assert engine.stats['events_read'] == 300
+        assert aggregation.total_events == 300
+        assert aggregation.total_revenue == Decimal('303.00')
+        assert db.aggregations == {}
+
+    def test_consume_is_single_pass(self):
+        def events():
+            for i in range(1000):
+                yield {'event_type': 'page_view', 'user_id': f'user{i % 10}'}
+
+        state = AggregateState()
+        assert state.consume(events()) == 1000
+        assert state.event_counts == {'page_view': 1000}
+        assert state.users.count() == 10
+
+    def test_heavy_hitters_rolled_up(self):
+        hour = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+        events = make_events(hour, 60)
+        for i, event in enumerate(events):
+            event.update(product_id=f'p{i % 3}', country='DE' if i % 4 else 'US')
+        db = FakeDynamoDB(events)
+
+        aggregation = RollupEngine(db).build('hour', hour)
+
+        assert [p['product_id'] for p in aggregation.top_products] == ['p0', 'p1', 'p2']
+        assert aggregation.top_products[0]['count'] == 60
+        assert aggregation.geo_distribution == {'DE': 135, 'US': 45}
+
+    def test_quantiles_rolled_up(self):
+        hour = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+        events = make_events(hour, 60)
+        for m in range(60):
+            events.append({
+                'timestamp': hour + timedelta(minutes=m, seconds=30),
+                'event_type': 'api_call',
+                'properties': {'latency_ms': 10 + m},
+            })
+        db = FakeDynamoDB(events)
+        for m in range(60):
+            db.store_aggregation(RollupEngine(db).build('minute', hour + timedelta(minutes=m)))
+
+        aggregation = RollupEngine(db).build('hour', hour)
+
+        assert aggregation.quantiles['revenue']['count'] == 60
+        assert aggregation.quantiles['revenue']['p50'] == pytest.approx(10.10, rel=0.01)
+        assert aggregation.quantiles['latency_ms']['count'] == 60
+        assert aggregation.quantiles['latency_ms']['p50'] == pytest.approx(39, rel=0.02)
+        assert aggregation.quantiles['latency_ms']['p99'] == pytest.approx(68, rel=0.02)
+
+    def test_range_segments(self):
+        start = datetime(2025, 6, 1, 22, 30, tzinfo=timezone.utc)
+        end = datetime(2025, 6, 4, 1, 7, tzinfo=timezone.utc)
+        assert [(p, s.isoformat(), e.isoformat()) for p, s, e in range_segments(start, end)] == [
+            ('minute', '2025-06-01T22:30:00+00:00', '2025-06-01T23:00:00+00:00'),
+            ('hour', '2025-06-01T23:00:00+00:00', '2025-06-02T00:00:00+00:00'),
+            ('day', '2025-06-02T00:00:00+00:00', '2025-06-04T00:00:00+00:00'),
+            ('hour', '2025-06-04T00:00:00+00:00', '2025-06-04T01:00:00+00:00'),
+            ('minute', '2025-06-04T01:00:00+00:00', '2025-06-04T01:07:00+00:00'),
+        ]
+
+    def test_state_for_range_reads_stored_levels(self):
+        hour = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(hour, 90))
+        db.store_aggregation(RollupEngine(db).build('hour', hour))
+        for m in range(60, 90):
+            db.store_aggregation(RollupEngine(db).build('minute', hour + timedelta(minutes=m)))
+        queries = db.event_queries
+
+        state = RollupEngine(db).state_for_range(hour, hour + timedelta(minutes=75))
+
+        assert db.event_queries == queries
+        assert state.total_events == 75 * 3
+        assert state.distributions['revenue'].count == 75
+
+    def test_missing_day_record_is_read_from_finer_levels(self):
+        day = datetime(2025, 6, 5, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(day - timedelta(days=1), 10) + make_events(day, 90)
+                          + make_events(day + timedelta(days=1), 10))
+        for other_day in (day - timedelta(days=1), day + timedelta(days=1)):
+            db.store_aggregation(RollupEngine(db).build('day', other_day, from_events=True))
+        # The day's rollup has not run: its first hour is stored, the rest only as minutes
+        db.store_aggregation(RollupEngine(db).build('hour', day))
+        for m in range(60, 90):
+            db.store_aggregation(RollupEngine(db).build('minute', day + timedelta(minutes=m)))
+        queries = db.event_queries
+
+        state = RollupEngine(db).state_for_range(day - timedelta(days=1), day + timedelta(days=2))
+
+        assert db.event_queries == queries
+        assert state.total_events == (10 + 90 + 10) * 3
+
+    def test_missing_last_month_is_read_from_its_days(self):
+        june, now = datetime(2025, 6, 1, tzinfo=timezone.utc), datetime(2025, 7, 1, 0, 30, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(june + timedelta(days=29), 20))
+        db.store_aggregation(RollupEngine(db).build('day', june + timedelta(days=29), from_events=True))
+
+        assert RollupEngine(db).state_to_date(now).total_events == 20 * 3
+
+    def test_state_to_date_reads_closed_months_once(self):
+        june, now = datetime(2025, 6, 1, tzinfo=timezone.utc), datetime(2025, 7, 2, 0, 30, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_events(june, 60) + make_events(now - timedelta(minutes=20), 10))
+        db.store_aggregation(RollupEngine(db).build('month', june, from_events=True))
+        db.store_aggregation(RollupEngine(db).build('day', datetime(2025, 7, 1, tzinfo=timezone.utc), from_events=True))
+        for m in range(10, 20):
+            db.store_aggregation(RollupEngine(db).build('minute', now.replace(minute=m)))
+        queries = db.event_queries
+
+        engine = RollupEngine(db)
+        state = engine.state_to_date(now)
+
+        assert db.event_queries == queries
+        assert state.total_events == 70 * 3
+        assert engine.stats['aggregations_read'] == 1 + 1 + 10
+
+    def test_state_roundtrip_through_aggregation(self):
+        minute = datetime(2025, 6, 5, 10, 1, tzinfo=timezone.utc)
+        state = AggregateState.from_events(make_events(minute, 1))
+        aggregation = state.to_aggregation('minute', *period_bounds('minute', minute))
+
+        restored = AggregateState.from_aggregation(aggregation.model_dump(mode='json'))
+        assert restored.total_events == state.total_events
+        assert restored.total_revenue == state.total_revenue
+        assert restored.users.count() == state.users.count()
+
+
+class TestColumnarKernel:
+    """Test the vectorized kernel against the per-event Python path"""
+
+    def test_matches_python_path(self):
+        events = make_events(datetime(2025, 6, 5, tzinfo=timezone.utc), 120, per_minute=7)
+        events.append({'event_type': 'purchase', 'user_id': None, 'revenue': 0.1 + 0.2})
+        events.append({'event_type': None, 'session_id': 'x', 'revenue': Decimal('0.005')})
+
+        expected = AggregateState.from_events(events)
+        aggregator = ColumnarAggregator(batch_size=100)
+        assert aggregator.consume(events) == len(events)
+        actual = aggregator.state
+
+        assert actual.total_events == expected.total_events
+        assert actual.total_revenue == expected.total_revenue
+        assert actual.event_counts == expected.event_counts
+        assert actual.event_revenue == expected.event_revenue
+        assert actual.users.registers == expected.users.registers
+        assert actual.sessions.registers == expected.sessions.registers
+        for event_type, sketch in expected.type_users.items():
+            assert actual.type_users[event_type].registers == sketch.registers
+        assert actual.distributions['revenue'].bins == expected.distributions['revenue'].bins
+        assert actual.distributions['revenue'].zero_count == expected.distributions['revenue'].zero_count
+
+    def test_latency_quantiles_match_python_path(self):
+        events = [
+            {'event_type': 'api_call', 'properties': {'duration_ms': (i * 7) % 500 + 1}}
+            for i in range(1000)
+        ]
+        events.append({'event_type': 'page_view', 'properties': {'latency_ms': 10 ** 6}})
+
+        expected = AggregateState.from_events(events)
+        aggregator = ColumnarAggregator(batch_size=128)
+        aggregator.consume(events)
+
+        actual = aggregator.state.distributions['latency_ms']
+        assert actual.count == 1000
+        assert actual.bins == expected.distributions['latency_ms'].bins
+        assert actual.summary() == pytest.approx(expected.distributions['latency_ms'].summary())
+
+    def test_grouped_sums_are_exact_for_large_values(self):
+        import numpy as np
+        codes = np.array([0, 0, 1], dtype=np.int32)
+        values = np.array([2 ** 60, 1, 5], dtype=np.int64)
+        assert grouped_sums(codes, values, 2).tolist() == [2 ** 60 + 1, 5]
+
+    def test_revenue_cents_match_exact_conversion(self):
+        values = [None, '', 0, '10.10', 0.1 + 0.2, Decimal('0.005'), 0.015, 1.005, 2.675, '-3.335',
+                  19.999, 10 ** 15 + 0.125, 7]
+        assert to_cents_array(values).tolist() == [to_cents(v) for v in values]
+
+    def test_batch_from_arrays_matches_events(self):
+        events = make_events(datetime(2025, 6, 5, tzinfo=timezone.utc), 30, per_minute=5)
+        batch = ColumnarBatch(events)
+        columnar = ColumnarBatch.from_arrays(
+            batch.event_type_codes, batch.event_types, batch.user_codes, batch.users,
+            batch.session_codes, batch.sessions, batch.revenue_cents,
+            epoch_seconds=batch.epoch_seconds,
+        )
+
+        expected, actual = ColumnarAggregator(), ColumnarAggregator()
+        expected.update(batch)
+        actual.update(columnar)
+
+        assert actual.state.total_revenue == expected.state.total_revenue == Decimal('303.00')
+        assert actual.state.event_type_breakdown() == expected.state.event_type_breakdown()
+        assert actual.state.sketches() == expected.state.sketches()
+
+    def test_time_histogram(self):
+        start = datetime(2025, 6, 5, tzinfo=timezone.utc)
+        events = make_events(start, 5, per_minute=3)
+        events.append({'timestamp': (start - timedelta(minutes=1)).isoformat()})
+
+        epoch = ColumnarBatch(events).epoch_seconds
+        assert time_histogram(epoch, int(start.timestamp()), 60, 6).tolist() == [3, 3, 3, 3, 3, 0]
+
+    def test_categorical_columns(self):
+        batch = ColumnarBatch([{'country': 'DE'}, {'country': 'US'}, {'country': 'DE'}, {}])
+        codes, labels = batch.categorical('country')
+        assert labels == ['DE', 'US']
+        assert codes.tolist() == [0, 1, 0, -1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.archive import (
+    REHYDRATED_ATTRIBUTE, ArchiveManifest, EventArchiver, LocalArchiveStorage,
+    iter_archived_events, rehydrate_events
+)
+
+NOW = datetime(2025, 6, 30, 12, tzinfo=timezone.utc)
+
+
+class FakeEventsTable:
+    """Events table stand-in: items by event_id, batch deletes and a batch writer"""
+
+    def __init__(self, items):
+        self.name = 'analytics-events'
+        self.items = {item['event_id']: item for item in items}
+        self.key_schema = [{'AttributeName': 'event_id', 'KeyType': 'HASH'}]
+        self.meta = SimpleNamespace(client=self)
+
+    def batch_write_item(self, RequestItems, **params):
+        for request in RequestItems[self.name]:
+            self.items.pop(request['DeleteRequest']['Key']['event_id'], None)
+        return {}
+
+    @contextmanager
+    def batch_writer(self):
+        yield SimpleNamespace(put_item=lambda Item: self.items.__setitem__(Item['event_id'], Item))
+
+
+class FakeDynamoDB:
+    def __init__(self, items):
+        self.events_table = FakeEventsTable(items)
+
+    def iter_events_by_timerange(self, start, end, on_page=None):
+        start, end = start.isoformat(), end.isoformat()
+        return (dict(item) for item in list(self.events_table.items.values())
+                if start <= item['timestamp'] < end)
+
+
+def make_items(day, count, event_type='page_view'):
+    return [{
+        'event_id': f'{day:%m%d}-{event_type}-{i}',
+        'event_type': event_type,
+        'timestamp': (day + timedelta(minutes=i)).isoformat(),
+        'revenue': Decimal('10.10'),
+        'quantity': Decimal('2'),
+    } for i in range(count)]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalArchiveStorage(str(tmp_path / 'archive'))
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr('src.services.backfill.time.sleep', lambda s: None)
+
+
+class TestArchiver:
+    """Test moving aged events into segments"""
+
+    def test_moves_only_events_older_than_hot_window(self, storage):
+        old = make_items(datetime(2025, 6, 1, tzinfo=timezone.utc), 30) + \
+            make_items(datetime(2025, 6, 2, tzinfo=timezone.utc), 20, 'purchase')
+        hot = make_items(datetime(2025, 6, 25, tzinfo=timezone.utc), 10)
+        db = FakeDynamoDB(old + hot)
+
+        result = EventArchiver(db, storage, hot_days=14).run(now=NOW)
+
+        assert result['archived_events'] == 50
+        assert result['deleted_events'] == 50
+        assert sorted(db.events_table.items) == sorted(item['event_id'] for item in hot)
+
+        manifest = ArchiveManifest(storage)
+        assert sorted(manifest.index) == ['2025-06-01', '2025-06-02']
+        assert sum(segment['events'] for segment in manifest.segments.values()) == 50
+
+    def test_segments_are_split(self, storage):
+        db = FakeDynamoDB(make_items(datetime(2025, 6, 1, tzinfo=timezone.utc), 25))
+        result = EventArchiver(db, storage, hot_days=14, max_segment_events=10).run(now=NOW)
+        assert result['segments'] == 3
+
+    def test_rehydrated_events_are_not_archived_again(self, storage):
+        items = make_items(datetime(2025, 6, 1, tzinfo=timezone.utc), 3)
+        items[0][REHYDRATED_ATTRIBUTE] = NOW.isoformat()
+        db = FakeDynamoDB(items)
+        assert EventArchiver(db, storage, hot_days=14).run(now=NOW)['archived_events'] == 2
+
+
+class TestRehydration:
+    """Test reading and restoring archived ranges"""
+
+    def test_range_read_uses_time_index(self, storage):
+        day = datetime(2025, 6, 1, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_items(day, 30) + make_items(day + timedelta(days=1), 30))
+        EventArchiver(db, storage, hot_days=14).run(now=NOW)
+
+        events = list(iter_archived_events(day + timedelta(minutes=10), day + timedelta(minutes=20), storage=storage))
+        assert len(events) == 10
+        assert events[0]['revenue'] == Decimal('10.1')
+        assert events[0]['quantity'] == 2
+
+        segments = ArchiveManifest(storage).segments_for(day, day + timedelta(hours=1))
+        assert [segment['event_day'] for segment in segments] == ['2025-06-01']
+
+    def test_rehydrate_restores_with_ttl(self, storage):
+        day = datetime(2025, 6, 1, tzinfo=timezone.utc)
+        db = FakeDynamoDB(make_items(day, 30, 'purchase') + make_items(day, 5, 'search'))
+        EventArchiver(db, storage, hot_days=14).run(now=NOW)
+        assert not db.events_table.items
+
+        result = rehydrate_events(db, day, day + timedelta(days=1), event_types=['purchase'],
+                                  storage=storage, ttl_days=7)
+
+        assert result['restored_events'] == 30
+        restored = list(db.events_table.items.values())
+        assert {item['event_type'] for item in restored} == {'purchase'}
+        assert all(item['expires_at'] == result['expires_at'] and REHYDRATED_ATTRIBUTE in item for item in restored)
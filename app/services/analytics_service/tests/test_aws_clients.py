@@ -0,0 +1,124 @@
+import pytest
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services import aws_clients
+from src.services.aws_clients import AWSClientFactory, boto_config, run_io
+from src.models.analytics_models import AnalyticsEvent
+from src.services.aws_services import AWSServices, DynamoDBService, SNSService
+from src.services.retention import TTL_ATTRIBUTE
+
+
+class TestBotoConfig:
+    """Test tuned client settings"""
+
+    def test_pool_keepalive_and_timeouts(self):
+        config = boto_config('sns')
+        assert config.max_pool_connections >= 10
+        assert config.tcp_keepalive is True
+        assert config.connect_timeout and config.read_timeout
+        assert config.retries['mode'] == 'standard'
+
+    def test_dynamodb_throttles_are_not_retried_by_botocore(self):
+        assert boto_config('dynamodb').retries['total_max_attempts'] == 1
+
+
+class TestAWSClientFactory:
+    """Test process-wide client sharing"""
+
+    def test_clients_are_shared_across_threads(self):
+        factory = AWSClientFactory()
+        with ThreadPoolExecutor(8) as pool:
+            clients = list(pool.map(lambda _: factory.client('sqs'), range(32)))
+        assert all(client is clients[0] for client in clients)
+
+    def test_resources_are_per_thread(self):
+        factory = AWSClientFactory()
+        assert factory.resource('dynamodb') is factory.resource('dynamodb')
+        with ThreadPoolExecutor(1) as pool:
+            other = pool.submit(factory.resource, 'dynamodb').result()
+        assert other is not factory.resource('dynamodb')
+
+    def test_clients_are_rebuilt_after_fork(self, monkeypatch):
+        factory = AWSClientFactory()
+        parent = factory.client('sns')
+        monkeypatch.setattr(aws_clients.os, 'getpid', lambda: -1)
+        assert factory.client('sns') is not parent
+
+    def test_services_reuse_shared_clients(self):
+        assert AWSServices().sns is AWSServices().sns
+        assert SNSService().sns is aws_clients.get_aws_clients().client('sns')
+
+    def test_dynamodb_tables_are_per_thread(self):
+        service = DynamoDBService()
+        table = service.events_table
+        assert service.events_table is table
+        with ThreadPoolExecutor(1) as pool:
+            other = pool.submit(lambda: service.events_table).result()
+        assert other is not table
+
+
+class TestAsyncIO:
+    """Test blocking AWS calls awaited off the event loop"""
+
+    def test_run_io_does_not_block_the_loop(self):
+        async def main():
+            ticks = []
+
+            async def ticker():
+                for _ in range(5):
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            started = time.monotonic()
+            await asyncio.gather(*(run_io(time.sleep, 0.1) for _ in range(10)), ticker())
+            return time.monotonic() - started, ticks
+
+        elapsed, ticks = asyncio.run(main())
+        assert elapsed < 0.5
+        assert ticks[-1] - ticks[0] < 0.09
+
+    def test_run_io_runs_on_the_io_executor(self):
+        name = asyncio.run(run_io(lambda: threading.current_thread().name))
+        assert name.startswith('aws-io')
+
+    def test_save_events_writes_concurrently(self):
+        written = []
+
+        def put_item(Item, **params):
+            time.sleep(0.05)
+            written.append(Item['event_id'])
+            return {}
+
+        table = SimpleNamespace(name='analytics-events', put_item=put_item)
+        resource = SimpleNamespace(Table=lambda name: table, meta=SimpleNamespace(client=None))
+        service = DynamoDBService(SimpleNamespace(dynamodb=resource))
+        events = [AnalyticsEvent(event_type='page_view', user_id=f'user-{i}') for i in range(20)]
+
+        started = time.monotonic()
+        saved = asyncio.run(service.save_events(events))
+        assert saved == 20
+        assert sorted(written) == sorted(e.event_id for e in events)
+        assert time.monotonic() - started < 0.5
+
+    def test_save_event_writes_the_item_of_store_event(self):
+        written = []
+        table = SimpleNamespace(name='analytics-events', put_item=lambda Item, **params: written.append(Item) or {})
+        resource = SimpleNamespace(Table=lambda name: table, meta=SimpleNamespace(client=None))
+        service = DynamoDBService(SimpleNamespace(dynamodb=resource))
+        event = AnalyticsEvent(event_type='page_view', user_id='user-1', properties={'scroll_depth': 0.75})
+
+        assert asyncio.run(service.save_event(event)) is True
+        assert service.store_event(event) is True
+        assert written[0] == written[1]
+        assert [type(item['properties']['scroll_depth']) for item in written] == [Decimal, Decimal]
+        assert {TTL_ATTRIBUTE, 'time_bucket'} <= written[0].keys()
@@ -0,0 +1,118 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.aggregation_engine import RollupEngine
+from src.services import backfill
+from src.services.backfill import Checkpoint, plan_partitions, run_backfill
+from test_aggregation_engine import FakeDynamoDB, make_events
+
+DAY = datetime(2025, 6, 5, tzinfo=timezone.utc)
+
+
+def stored_key(period, start):
+    """Key of an aggregation in FakeDynamoDB (period_start as serialized by pydantic)"""
+    return period, start.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class TestPlanPartitions:
+    """Test backfill partitioning"""
+
+    def test_levels_in_rollup_order(self):
+        levels = plan_partitions(['day', 'minute', 'hour'], DAY, DAY + timedelta(days=3))
+        assert [level[0]['period'] for level in levels] == ['minute', 'hour', 'day']
+        assert len(levels[0]) == 3  # one partition per day
+        assert len(levels[2]) == 1  # one partition per month
+
+    def test_partial_range_is_widened_to_whole_periods(self):
+        levels = plan_partitions(['hour'], DAY + timedelta(minutes=30), DAY + timedelta(hours=2, minutes=5))
+        assert levels[0] == [{
+            'id': 'hour:2025-06-05T00:00:00+00:00/2025-06-05T03:00:00+00:00',
+            'period': 'hour',
+            'start': '2025-06-05T00:00:00+00:00',
+            'end': '2025-06-05T03:00:00+00:00',
+        }]
+
+    def test_partition_ids_include_the_end(self):
+        half, whole = (plan_partitions(['minute'], DAY, DAY + timedelta(hours=h))[0][0] for h in (12, 24))
+        assert half['id'] != whole['id']
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            plan_partitions(['year'], DAY, DAY + timedelta(days=1))
+
+
+class TestBackfill:
+    """Test serial backfill runs"""
+
+    def test_minutes_built_in_one_pass(self):
+        db = FakeDynamoDB(make_events(DAY + timedelta(hours=3), 30))
+        summary = run_backfill(DAY, DAY + timedelta(days=1), periods=['minute', 'hour', 'day'],
+                               executor='serial', dynamodb=db)
+
+        assert db.event_queries == 1
+        assert summary['events_read'] == 90
+        assert summary['aggregations_written'] == 1440 + 24 + 1
+        day = db.aggregations[stored_key('day', DAY)]
+        assert day['total_events'] == 90
+
+    def test_matches_incremental_aggregation(self):
+        events = make_events(DAY + timedelta(hours=5), 5, per_minute=4)
+        db = FakeDynamoDB(events)
+        run_backfill(DAY, DAY + timedelta(days=1), periods=['minute'], executor='serial', dynamodb=db)
+
+        minute = DAY + timedelta(hours=5, minutes=2)
+        expected = RollupEngine(FakeDynamoDB(events), kernel='python').build('minute', minute)
+        stored = db.aggregations[stored_key('minute', minute)]
+        assert stored['total_events'] == expected.total_events
+        assert stored['sketches']['users'] == expected.sketches['users']
+
+    def test_resume_skips_completed_partitions(self, tmp_path, monkeypatch):
+        checkpoint = str(tmp_path / 'checkpoint.json')
+        db = FakeDynamoDB(make_events(DAY, 10))
+        run_partition = backfill.run_partition
+
+        def interrupted(partition, **options):
+            if partition['start'] == (DAY + timedelta(days=2)).isoformat():
+                raise KeyboardInterrupt
+            return run_partition(partition, **options)
+
+        monkeypatch.setattr(backfill, 'run_partition', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            run_backfill(DAY, DAY + timedelta(days=3), periods=['minute'], executor='serial',
+                         checkpoint_path=checkpoint, dynamodb=db)
+        assert len(Checkpoint(checkpoint).done) == 2
+
+        monkeypatch.setattr(backfill, 'run_partition', run_partition)
+        summary = run_backfill(DAY, DAY + timedelta(days=3), periods=['minute'], executor='serial',
+                               checkpoint_path=checkpoint, dynamodb=db)
+        assert summary['partitions'] == 1
+
+    def test_checkpoint_of_another_run_is_rejected(self, tmp_path):
+        checkpoint = str(tmp_path / 'checkpoint.json')
+        db = FakeDynamoDB(make_events(DAY, 10))
+        run_backfill(DAY, DAY + timedelta(hours=12), periods=['minute', 'hour'], executor='serial',
+                     checkpoint_path=checkpoint, dynamodb=db)
+
+        # Same first partitions, but the previous run covered only half of them
+        for periods in (['minute', 'hour'], ['minute']):
+            with pytest.raises(ValueError, match='different backfill run'):
+                run_backfill(DAY, DAY + timedelta(days=1), periods=periods, executor='serial',
+                             checkpoint_path=checkpoint, dynamodb=db)
+
+    def test_session_totals_are_preserved(self):
+        db = FakeDynamoDB(make_events(DAY, 1))
+        aggregation = RollupEngine(db).build('minute', DAY)
+        aggregation.session_metrics = {'sessions': 3, 'total_duration': 90}
+        db.store_aggregation(aggregation)
+
+        run_backfill(DAY, DAY + timedelta(days=1), periods=['minute'], executor='serial', dynamodb=db)
+        assert db.aggregations[stored_key('minute', DAY)]['avg_session_duration'] == 30
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
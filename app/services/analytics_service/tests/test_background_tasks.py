@@ -0,0 +1,253 @@
+import pytest
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from celery_batches import SimpleRequest
+
+from src.services import background_tasks
+from src.services.aws_services import DynamoDBService, SNSService
+from src.services.background_tasks import (
+    BackgroundTaskManager, _process_events, batching_prefetch_multiplier, generate_periodic_aggregations,
+    merge_event_batch_results, process_single_event
+)
+
+
+def make_request(task_id, event_data, correlation_id=None):
+    return SimpleRequest(
+        id=task_id, name=process_single_event.name, args=(event_data, correlation_id), kwargs={},
+        delivery_info={}, hostname='worker', ignore_result=False, reply_to=None,
+        correlation_id=None, request_dict={},
+    )
+
+
+class FakeBackend:
+    def __init__(self):
+        self.done = {}
+
+    def mark_as_done(self, task_id, result, request=None):
+        self.done[task_id] = result
+
+
+class FakeEventsTable:
+    name = 'analytics-events'
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item, **params):
+        self.items[Item['event_id']] = Item
+        return {}
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """DynamoDB and SNS stand-ins behind the services the pipeline creates"""
+    table = FakeEventsTable()
+    published = []
+    resource = SimpleNamespace(Table=lambda name: table, meta=SimpleNamespace(client=None))
+    sns = SimpleNamespace(publish=lambda **params: published.append(params) or {'MessageId': 'm'})
+    monkeypatch.setattr(background_tasks, 'DynamoDBService',
+                        lambda: DynamoDBService(SimpleNamespace(dynamodb=resource)))
+    monkeypatch.setattr(background_tasks, 'SNSService', lambda: SNSService(SimpleNamespace(sns=sns)))
+    aggregations = []
+    monkeypatch.setattr(background_tasks.update_realtime_aggregations, 'delay',
+                        lambda event_ids, **kwargs: aggregations.append(event_ids))
+    return SimpleNamespace(table=table, published=published, aggregations=aggregations)
+
+
+def event_data(event_id, minutes=0, event_type='page_view', user_id='user-1', session_id='session-1'):
+    timestamp = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=10 - minutes)
+    return {'event_id': event_id, 'event_type': event_type, 'user_id': user_id,
+            'session_id': session_id, 'timestamp': timestamp.isoformat(),
+            'product_id': 'p-1', 'product_name': 'Product 1', 'category': 'books'}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(process_single_event, 'backend', fake)
+    return fake
+
+
+class TestSingleEventBatching:
+    """Test batched processing of single-event tasks"""
+
+    def test_buffer_is_processed_once_with_a_result_per_task(self, monkeypatch, backend):
+        calls = []
+
+        def process(items):
+            calls.append(items)
+            return [{'error': 'invalid'} if data.get('bad') else {'event_id': data['event_id']}
+                    for data, _ in items]
+
+        monkeypatch.setattr(background_tasks, '_process_events', process)
+        requests = [make_request('task-1', {'event_id': 'e1'}, 'corr-1'),
+                    make_request('task-2', {'event_id': 'e2', 'bad': True}, 'corr-2'),
+                    make_request('task-3', {'event_id': 'e3'})]
+
+        process_single_event.run(requests)
+
+        assert len(calls) == 1
+        assert [data['event_id'] for data, _ in calls[0]] == ['e1', 'e2', 'e3']
+        assert calls[0][0][1] == 'corr-1' and calls[0][2][1]
+        assert backend.done['task-1']['processed_events'] == ['e1']
+        assert backend.done['task-1']['correlation_id'] == 'corr-1'
+        assert backend.done['task-2']['failed_count'] == 1
+        assert backend.done['task-2']['failed_events'][0]['error'] == 'invalid'
+        assert backend.done['task-3']['processed_count'] == 1
+
+    def test_failed_batch_is_retried_as_a_batch_task(self, monkeypatch, backend):
+        def process(items):
+            raise ConnectionError('DynamoDB unavailable')
+
+        dispatched = []
+        monkeypatch.setattr(background_tasks, '_process_events', process)
+        monkeypatch.setattr(background_tasks.process_event_batch, 'apply_async',
+                            lambda args, **options: dispatched.append((args, options)) or SimpleNamespace(id='retry'))
+        requests = [make_request('task-1', {'event_id': 'e1'}, 'corr-1'),
+                    make_request('task-2', {'event_id': 'e2'}, 'corr-2')]
+
+        process_single_event.run(requests)
+
+        (events, correlation_id), options = dispatched[0]
+        assert [e['event_id'] for e in events] == ['e1', 'e2']
+        assert options['countdown'] > 0
+        assert {task_id: result['retried_as'] for task_id, result in backend.done.items()} == {
+            'task-1': 'retry', 'task-2': 'retry'}
+        assert backend.done['task-2']['correlation_id'] == 'corr-2'
+
+    def test_status_of_retried_tasks_follows_the_retry_task(self, monkeypatch):
+        results = {
+            'task-1': SimpleNamespace(status='SUCCESS', result={'retried_as': 'retry'}, traceback=None),
+            'retry': SimpleNamespace(status='SUCCESS', result={'processed_count': 2}, traceback=None),
+        }
+        for result in results.values():
+            result.ready, result.failed = (lambda: True), (lambda: False)
+        monkeypatch.setattr(background_tasks.celery_app, 'AsyncResult', results.get)
+
+        status = BackgroundTaskManager.get_task_status('task-1')
+
+        assert status == {'task_id': 'task-1', 'retried_as': 'retry', 'status': 'SUCCESS',
+                          'result': {'processed_count': 2}, 'traceback': None}
+
+
+class TestEventPipeline:
+    """Test the ingestion pipeline end to end against Redis (in memory) and stubbed AWS services"""
+
+    def test_events_reach_every_realtime_structure(self, aws, fake_redis):
+        items = [(event_data('e1'), 'corr'),
+                 (event_data('e2', 1, 'add_to_cart'), 'corr'),
+                 ({'event_type': 'not-a-type'}, 'corr')]
+
+        outcomes = _process_events(items)
+
+        assert outcomes[:2] == [{'event_id': 'e1'}, {'event_id': 'e2'}] and 'error' in outcomes[2]
+        assert set(aws.table.items) == {'e1', 'e2'}
+        assert [json.loads(p['Message'])['event_data']['event_id'] for p in aws.published] == ['e1', 'e2']
+        assert aws.aggregations == [['e1', 'e2']]
+        day = items[0][0]['timestamp'][:10]
+        assert fake_redis.get(f'user_events:user-1:{day}') == '2'
+        keys = fake_redis.keys()
+        for prefix in ('hll:', 'topk:', 'session:', 'funnel:checkout:state:', 'funnel:checkout:step'):
+            assert any(key.startswith(prefix) for key in keys), prefix
+
+    def test_unstored_events_are_failed(self, aws, fake_redis, monkeypatch):
+        monkeypatch.setattr(DynamoDBService, 'store_event', lambda self, event: False)
+
+        outcomes = _process_events([(event_data('e1'), 'corr')])
+
+        assert 'error' in outcomes[0]
+        assert not aws.published and not aws.aggregations
+
+    def test_batched_tasks_record_real_outcomes(self, aws, fake_redis, backend):
+        requests = [make_request('task-1', event_data('e1'), 'corr-1'),
+                    make_request('task-2', {'event_type': 'not-a-type'}, 'corr-2')]
+
+        process_single_event.run(requests)
+
+        assert backend.done['task-1']['processed_events'] == ['e1']
+        assert backend.done['task-2']['failed_count'] == 1
+        assert set(aws.table.items) == {'e1'}
+
+
+class TestDispatch:
+    """Test routing of event processing tasks"""
+
+    def test_single_events_are_batched_on_the_worker(self, monkeypatch):
+        sent = []
+        monkeypatch.setattr(process_single_event, 'delay',
+                            lambda *args: sent.append(('single', args)) or SimpleNamespace(id='single-id'))
+        monkeypatch.setattr(background_tasks.process_event_batch, 'delay',
+                            lambda *args: sent.append(('batch', args)) or SimpleNamespace(id='batch-id'))
+
+        assert BackgroundTaskManager.process_events_async([{'event_id': 'e1'}], 'corr') == 'single-id'
+        assert BackgroundTaskManager.process_events_async([{'event_id': 'e1'}, {'event_id': 'e2'}]) == 'batch-id'
+        assert sent[0] == ('single', ({'event_id': 'e1'}, 'corr'))
+
+    def test_large_batches_are_split_into_a_chord(self, monkeypatch):
+        dispatched = []
+
+        def fake_chord(header):
+            header = list(header)
+            return lambda body: dispatched.append((header, body)) or SimpleNamespace(id='merged-id')
+
+        monkeypatch.setattr(background_tasks, 'chord', fake_chord)
+        monkeypatch.setattr(background_tasks.settings, 'EVENT_BATCH_CHUNK_SIZE', 100)
+        events = [{'event_id': f'e{i}'} for i in range(250)]
+
+        assert BackgroundTaskManager.process_events_async(events, 'corr') == 'merged-id'
+        header, body = dispatched[0]
+        assert [len(signature.args[0]) for signature in header] == [100, 100, 50]
+        assert [e for signature in header for e in signature.args[0]] == events
+        assert all(signature.task == background_tasks.process_event_batch.name for signature in header)
+        assert body.task == merge_event_batch_results.name and body.args == ('corr',)
+
+    def test_prefetch_holds_two_batches(self):
+        size = background_tasks.settings.EVENT_BATCH_MAX_SIZE
+        for concurrency in (1, 4, 16, 64):
+            assert batching_prefetch_multiplier(concurrency) * concurrency >= 2 * size
+
+
+class TestChunkedBatches:
+    """Test merging of per-chunk results"""
+
+    def test_results_are_merged_in_chunk_order(self):
+        chunk_results = [
+            {'processed_count': 2, 'failed_count': 0, 'processed_events': ['e1', 'e2'], 'failed_events': []},
+            {'processed_count': 1, 'failed_count': 1, 'processed_events': ['e3'],
+             'failed_events': [{'event_data': {'event_id': 'e4'}, 'error': 'invalid'}]},
+        ]
+
+        merged = merge_event_batch_results.run(chunk_results, 'corr')
+
+        assert merged['processed_count'] == 3 and merged['failed_count'] == 1
+        assert merged['processed_events'] == ['e1', 'e2', 'e3']
+        assert merged['failed_events'][0]['error'] == 'invalid'
+        assert merged['chunks'] == 2 and merged['correlation_id'] == 'corr'
+
+
+class TestAggregationTasks:
+    """Test periodic aggregation tasks against Redis (in memory)"""
+
+    def test_minute_aggregation_is_stored_and_cached(self, fake_redis, monkeypatch):
+        minute = datetime(2025, 6, 5, 12, 30, tzinfo=timezone.utc)
+        events = [{'timestamp': minute + timedelta(seconds=i), 'event_type': 'page_view',
+                   'user_id': f'user{i}', 'session_id': 'session'} for i in range(3)]
+        stored = []
+        dynamodb = SimpleNamespace(
+            iter_events_by_timerange=lambda start, end, **options: (e for e in events if start <= e['timestamp'] < end),
+            store_aggregation=lambda aggregation: stored.append(aggregation) or True,
+        )
+        monkeypatch.setattr(background_tasks, 'DynamoDBService', lambda: dynamodb)
+
+        result = generate_periodic_aggregations.run('minute', target_time=minute.isoformat())
+
+        assert result['total_events'] == 3 and len(stored) == 1
+        cached = background_tasks.CacheService().get_json(f'aggregation:minute:{minute.isoformat()}')
+        assert cached['total_events'] == 3
@@ -0,0 +1,32 @@
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.cache_service import CacheService
+
+
+class TestJsonDocuments:
+    """Test JSON document caching"""
+
+    def test_round_trip_with_ttl(self, fake_redis):
+        cache = CacheService()
+        document = {'period': 'hour', 'total_events': 3, 'revenue': Decimal('9.50'),
+                    'created_at': datetime(2025, 6, 5, tzinfo=timezone.utc)}
+
+        assert cache.set_json('aggregation:hour:x', document, ttl=60)
+
+        assert cache.get_json('aggregation:hour:x') == {
+            'period': 'hour', 'total_events': 3, 'revenue': '9.50', 'created_at': '2025-06-05 00:00:00+00:00'
+        }
+        assert 0 < fake_redis.ttl('aggregation:hour:x') <= 60
+
+    def test_missing_or_scalar_values_are_not_documents(self, fake_redis):
+        cache = CacheService()
+        cache.set('counter', 5)
+        assert cache.get_json('missing') is None
+        assert cache.get_json('counter') is None
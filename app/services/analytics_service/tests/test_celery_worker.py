@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import celery_worker
+from celery_worker import DEFAULT_QUEUES, apply_acks_policy, io_concurrency, pool_limits, resolve_worker_profile
+from src.services.background_tasks import (
+    generate_periodic_aggregations, process_event_batch, send_alert_notifications
+)
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    monkeypatch.setattr(celery_worker.os, 'cpu_count', lambda: 4)
+    return 4
+
+
+class TestWorkerProfiles:
+    """Test per-queue pool, concurrency and prefetch selection"""
+
+    def test_io_bound_queues_use_threads(self, cpus):
+        profile = resolve_worker_profile(['high_priority', 'notifications'])
+        assert profile['pool'] == 'threads'
+        assert profile['concurrency'] == io_concurrency(cpus) > cpus
+
+    def test_io_concurrency_is_bounded_by_the_connection_pool(self):
+        assert io_concurrency(1000) == celery_worker.get_settings().AWS_MAX_POOL_CONNECTIONS
+
+    def test_aggregations_keep_prefork(self, cpus):
+        assert resolve_worker_profile(['aggregations']) == {
+            'pool': 'prefork', 'concurrency': cpus, 'prefetch_multiplier': 1
+        }
+
+    def test_mixed_queues_fall_back_to_prefork(self, cpus):
+        profile = resolve_worker_profile(DEFAULT_QUEUES.split(','))
+        assert profile['pool'] == 'prefork' and profile['concurrency'] == cpus
+
+    def test_high_priority_prefetch_holds_event_batches(self, cpus):
+        profile = resolve_worker_profile(['high_priority'])
+        settings = celery_worker.get_settings()
+        assert profile['prefetch_multiplier'] * profile['concurrency'] >= settings.EVENT_BATCH_MAX_SIZE
+
+    def test_limits_are_only_set_where_enforced(self):
+        assert pool_limits('prefork')['task_soft_time_limit'] < pool_limits('prefork')['task_time_limit']
+        assert pool_limits('threads') == pool_limits('solo') == {}
+
+    def test_explicit_options_win(self, cpus):
+        profile = resolve_worker_profile(['high_priority'], concurrency=3, pool='prefork')
+        assert profile['pool'] == 'prefork' and profile['concurrency'] == 3
+
+
+class TestAcksPolicy:
+    """Test per-queue acknowledgement policies"""
+
+    def test_policies_apply_to_the_consumed_queues(self, monkeypatch):
+        for task in (process_event_batch, send_alert_notifications, generate_periodic_aggregations):
+            monkeypatch.setattr(task, 'acks_late', None)
+            monkeypatch.setattr(task, 'reject_on_worker_lost', None)
+
+        apply_acks_policy(['high_priority', 'notifications'])
+
+        assert process_event_batch.acks_late is True and process_event_batch.reject_on_worker_lost is True
+        assert send_alert_notifications.acks_late is False
+        assert generate_periodic_aggregations.acks_late is None
@@ -0,0 +1,153 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services import dynamodb_access
+from src.services.dynamodb_access import (
+    DYNAMODB_CONSUMED_CAPACITY, DYNAMODB_THROTTLES, AdaptiveClient, AdaptiveRateLimiter,
+    AdaptiveTable, DynamoDBAccess, decorrelated_jitter
+)
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'Operation')
+
+
+class FlakyTable:
+    """Table stand-in failing the first calls with the given error codes (or exceptions)"""
+
+    def __init__(self, name, errors=(), capacity=1.0):
+        self.name = name
+        self.errors = list(errors)
+        self.capacity = capacity
+        self.calls = []
+
+    def put_item(self, **params):
+        self.calls.append(params)
+        if self.errors:
+            error = self.errors.pop(0)
+            raise client_error(error) if isinstance(error, str) else error
+        return {'ConsumedCapacity': {'TableName': self.name, 'CapacityUnits': self.capacity}}
+
+
+class PartialBatchClient:
+    """Client stand-in processing at most `per_call` write requests per batch"""
+
+    def __init__(self, per_call):
+        self.per_call = per_call
+        self.sent = []
+
+    def batch_write_item(self, RequestItems, **params):
+        (table_name, requests), = RequestItems.items()
+        self.sent.append(len(requests))
+        rest = requests[self.per_call:]
+        return {
+            'UnprocessedItems': {table_name: rest} if rest else {},
+            'ConsumedCapacity': [{'TableName': table_name, 'CapacityUnits': float(len(requests) - len(rest))}],
+        }
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(dynamodb_access.time, 'sleep', lambda s: None)
+    monkeypatch.setattr(dynamodb_access, '_limiters', {})
+
+
+def sample(metric, **labels):
+    return metric.labels(**labels)._value.get()
+
+
+class TestRetries:
+    """Test throttle-only retries"""
+
+    def test_throttled_operation_is_retried(self):
+        table = FlakyTable('t-retry', errors=['ProvisionedThroughputExceededException'] * 2)
+        response = AdaptiveTable(table).put_item(Item={'id': 1})
+
+        assert len(table.calls) == 3
+        assert table.calls[0]['ReturnConsumedCapacity'] == 'TOTAL'
+        assert response['ConsumedCapacity']['CapacityUnits'] == 1.0
+        assert sample(DYNAMODB_THROTTLES, table='t-retry', operation='put_item') == 2
+
+    def test_connection_errors_are_retried(self):
+        table = FlakyTable('t-network', errors=[EndpointConnectionError(endpoint_url='http://dynamodb'),
+                                                ReadTimeoutError(endpoint_url='http://dynamodb')])
+        response = AdaptiveTable(table).put_item(Item={'id': 1})
+
+        assert len(table.calls) == 3
+        assert response['ConsumedCapacity']['CapacityUnits'] == 1.0
+        assert sample(DYNAMODB_THROTTLES, table='t-network', operation='put_item') == 0
+
+    def test_other_errors_are_not_retried(self):
+        table = FlakyTable('t-fail', errors=['ValidationException'])
+        with pytest.raises(ClientError):
+            AdaptiveTable(table).put_item(Item={'id': 1})
+        assert len(table.calls) == 1
+
+    def test_retries_are_bounded(self):
+        table = FlakyTable('t-bounded', errors=['ThrottlingException'] * 10)
+        with pytest.raises(ClientError):
+            AdaptiveTable(table, DynamoDBAccess(max_retries=3)).put_item(Item={'id': 1})
+        assert len(table.calls) == 4
+
+    def test_only_unprocessed_batch_items_are_resent(self):
+        client = PartialBatchClient(per_call=10)
+        requests = [{'PutRequest': {'Item': {'id': i}}} for i in range(25)]
+        response = AdaptiveClient(client).batch_write_item(RequestItems={'t-batch': requests})
+
+        assert client.sent == [25, 15, 5]
+        assert not response['UnprocessedItems']
+        assert sample(DYNAMODB_CONSUMED_CAPACITY, table='t-batch', operation='batch_write_item') == 25
+
+    def test_decorrelated_jitter_stays_within_bounds(self):
+        delay = 0.01
+        for _ in range(100):
+            delay = decorrelated_jitter(delay, 0.01, 1.0)
+            assert 0.01 <= delay <= 1.0
+
+
+class TestAdaptiveRateLimiter:
+    """Test AIMD rate adaptation"""
+
+    def test_throttle_halves_rate_once_per_cooldown(self):
+        limiter = AdaptiveRateLimiter(100, min_rate=10, cooldown=60)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        assert limiter.rate == 50
+
+    def test_success_increases_rate_up_to_max(self):
+        limiter = AdaptiveRateLimiter(100, increase=5, cooldown=0)
+        limiter.on_throttle()
+        for _ in range(20):
+            limiter.on_success()
+        assert limiter.rate == 100
+
+    def test_success_increases_rate_once_per_cooldown(self):
+        limiter = AdaptiveRateLimiter(100, increase=5, cooldown=60)
+        limiter.rate = 50
+        for _ in range(1000):
+            limiter.on_success()
+        assert limiter.rate == 55
+
+    def test_rate_never_drops_below_minimum(self):
+        limiter = AdaptiveRateLimiter(100, min_rate=10, cooldown=0)
+        for _ in range(10):
+            limiter.on_throttle()
+        assert limiter.rate == 10
+
+    def test_limiter_is_shared_across_threads(self):
+        tables = [FlakyTable('t-shared') for _ in range(4)]
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda t: AdaptiveTable(t).put_item(Item={}), tables))
+        assert len(dynamodb_access._limiters) == 1
+
+    def test_consumed_capacity_is_charged(self):
+        table = FlakyTable('t-charge', capacity=40.0)
+        AdaptiveTable(table).put_item(Item={})
+        limiter = dynamodb_access.get_rate_limiter('t-charge', 'write')
+        assert limiter.tokens <= limiter.rate - 40
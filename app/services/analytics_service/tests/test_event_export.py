@@ -0,0 +1,97 @@
+import io
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.services.event_export import PartitionedParquetExporter, export_events, stream_events
+from test_aggregation_engine import FakeDynamoDB, make_events
+
+DAY = datetime(2025, 6, 5, tzinfo=timezone.utc)
+
+
+class TestPartitionedExport:
+    """Test Hive-partitioned Parquet exports"""
+
+    def test_partitions_by_day_and_type(self, tmp_path):
+        events = make_events(DAY + timedelta(hours=23, minutes=58), 4)
+        summary = export_events(FakeDynamoDB(events), DAY, DAY + timedelta(days=2), output_dir=str(tmp_path))
+
+        assert summary['rows'] == 12
+        directories = {os.path.relpath(os.path.dirname(f['path']), tmp_path) for f in summary['files']}
+        assert directories == {
+            os.path.join('event_day=2025-06-05', 'event_type=page_view'),
+            os.path.join('event_day=2025-06-05', 'event_type=purchase'),
+            os.path.join('event_day=2025-06-06', 'event_type=page_view'),
+            os.path.join('event_day=2025-06-06', 'event_type=purchase'),
+        }
+
+        table = ds.dataset(str(tmp_path), format='parquet', partitioning='hive').to_table()
+        purchases = table.filter(ds.field('event_type') == 'purchase')
+        assert purchases.num_rows == 4
+        assert set(purchases.column('revenue').to_pylist()) == {Decimal('10.10')}
+
+    def test_dictionary_encoding_and_compression(self, tmp_path):
+        exporter = PartitionedParquetExporter(str(tmp_path))
+        exporter.write(make_events(DAY, 10))
+        summary = exporter.close()
+
+        metadata = pq.ParquetFile(summary['files'][0]['path']).metadata
+        columns = {metadata.schema.column(i).name: metadata.row_group(0).column(i) for i in range(metadata.num_columns)}
+        assert 'RLE_DICTIONARY' in columns['user_id'].encodings
+        assert columns['user_id'].compression == 'ZSTD'
+
+    def test_buffers_are_bounded(self, tmp_path):
+        exporter = PartitionedParquetExporter(str(tmp_path), row_group_size=5, max_buffered_rows=8, max_open_files=1)
+        exporter.write(make_events(DAY, 20))
+        assert exporter.buffered < 8
+        assert len(exporter.writers) <= 1
+        summary = exporter.close()
+
+        assert sum(f['rows'] for f in summary['files']) == 60
+        # Closing the least recently used writer rolls the partition over to a new part file
+        assert len(summary['files']) > 2
+
+    def test_event_type_filter_and_properties(self, tmp_path):
+        events = make_events(DAY, 2)
+        events[1]['properties'] = {'latency_ms': Decimal('12.5')}
+        summary = export_events(FakeDynamoDB(events), DAY, DAY + timedelta(hours=1),
+                                event_types=['page_view'], output_dir=str(tmp_path))
+
+        assert summary['rows'] == 4
+        table = ds.dataset(str(tmp_path), format='parquet', partitioning='hive').to_table()
+        properties = [json.loads(p) for p in table.column('properties').to_pylist() if p]
+        assert properties == [{'latency_ms': '12.5'}]
+
+
+class TestStreamingExport:
+    """Test chunked single-file exports"""
+
+    def test_parquet_stream_is_chunked_per_row_group(self):
+        chunks = list(stream_events(make_events(DAY, 10), 'parquet', row_group_size=8))
+
+        assert len(chunks) == 4  # 30 rows in row groups of 8: 3 full groups, then remainder + footer
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        assert parquet.metadata.num_rows == 30
+        assert parquet.metadata.num_row_groups == 4
+        table = parquet.read()
+        assert set(table.column('event_day').to_pylist()) == {'2025-06-05'}
+
+    def test_arrow_stream(self):
+        data = b''.join(stream_events(make_events(DAY, 3), 'arrow', row_group_size=4))
+        table = pa.ipc.open_stream(data).read_all()
+        assert table.num_rows == 9
+        assert table.column('event_type').to_pylist().count('purchase') == 3
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            list(stream_events([], 'csv'))
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.cache_service import CacheService
+from src.services.funnel_engine import FunnelEngine, load_funnels
+
+START = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+
+
+def event(session_id, minutes, event_type):
+    return {'session_id': session_id, 'event_type': event_type,
+            'timestamp': START + timedelta(minutes=minutes)}
+
+
+class TestFunnelEngine:
+    """Test incremental funnel tracking"""
+
+    @pytest.fixture(autouse=True)
+    def setup_engine(self, fake_redis):
+        self.cache = CacheService()
+        self.engine = FunnelEngine(self.cache, funnels=load_funnels(''))
+
+    def steps(self):
+        funnel = self.engine.get_conversion_funnel(
+            'checkout', start_time=START, end_time=START + timedelta(days=1))
+        return [step['sessions'] for step in funnel['steps']]
+
+    def test_steps_counted_across_batches(self):
+        self.engine.process([event('a', 0, 'page_view'), event('b', 0, 'page_view'),
+                             event('a', 1, 'add_to_cart')])
+        self.engine.process([event('a', 2, 'checkout_start'), event('a', 3, 'purchase'),
+                             event('b', 2, 'purchase')])
+        assert self.steps() == [2, 1, 1, 1]
+
+    def test_steps_must_be_in_order(self):
+        self.engine.process([event('a', 0, 'page_view'), event('a', 1, 'checkout_start'),
+                             event('a', 2, 'page_view'), event('a', 3, 'add_to_cart')])
+        assert self.steps() == [1, 1, 0, 0]
+
+    def test_step_window_expires_attempt(self):
+        self.engine.process([event('a', 0, 'page_view')])
+        self.engine.process([event('a', 45, 'add_to_cart')])
+        self.engine.process([event('a', 50, 'page_view'), event('a', 51, 'add_to_cart')])
+        assert self.steps() == [2, 1, 0, 0]
+
+    def test_conversion_and_drop_off(self):
+        self.engine.process([event(f's{i}', 0, 'page_view') for i in range(10)]
+                            + [event(f's{i}', 1, 'add_to_cart') for i in range(4)])
+        funnel = self.engine.get_conversion_funnel(
+            'checkout', start_time=START, end_time=START + timedelta(days=1))
+        assert funnel['steps'][1]['conversion_rate'] == 40
+        assert funnel['steps'][1]['drop_off'] == 6
+        assert funnel['overall_conversion_rate'] == 0
+
+    def test_query_cost_is_independent_of_traffic(self, monkeypatch):
+        self.engine.process([event(f's{i}', i % 60, 'page_view') for i in range(5000)])
+        reads = []
+        get_many = self.cache.get_many
+        monkeypatch.setattr(self.cache, 'get_many', lambda keys: reads.append(keys) or get_many(keys))
+        self.engine.get_conversion_funnel('checkout', start_time=START, end_time=START + timedelta(days=1))
+        assert len(reads) == 1
+
+    def test_concurrent_advance_is_counted_once(self, monkeypatch):
+        self.engine.process([event('a', 0, 'page_view')])
+        other = FunnelEngine(CacheService(), funnels=self.engine.funnels)
+        get_many = self.cache.get_many
+
+        def read_then_race(keys):
+            # Another worker advances the session between this worker's read and write
+            values = get_many(keys)
+            monkeypatch.setattr(self.cache, 'get_many', get_many)
+            other.process([event('a', 1, 'add_to_cart')])
+            return values
+
+        monkeypatch.setattr(self.cache, 'get_many', read_then_race)
+        assert self.engine.process([event('a', 2, 'add_to_cart'), event('a', 3, 'checkout_start')]) == 1
+        assert self.steps() == [1, 1, 1, 0]
+
+    def test_contended_sessions_are_given_up(self, monkeypatch):
+        monkeypatch.setattr(self.cache, 'run_script', lambda source, keys, args: list(range(1, len(keys) + 1)))
+        assert self.engine.process([event('a', 0, 'page_view')]) == 0
+        assert self.steps() == [0, 0, 0, 0]
+
+    def test_custom_funnels(self):
+        funnels = load_funnels('[{"name": "signup", "steps": ["page_view", "user_signup"], '
+                               '"step_window_seconds": 60}]')
+        assert funnels['signup'].step_window_seconds == [60]
+        with pytest.raises(ValueError):
+            load_funnels('[{"name": "bad", "steps": ["page_view", "purchase"], '
+                         '"step_window_seconds": [60, 60]}]')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,90 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.analytics_models import AnalyticsEvent
+from src.services.local_store import LocalEventStore, QueryTimeout
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalEventStore(path=str(tmp_path / 'events.sqlite3'), retention_days=7, max_rows=50, timeout_ms=2000)
+
+
+def make_event(minutes_ago, event_type='page_view', user_id='user1', **fields):
+    return AnalyticsEvent(
+        event_type=event_type, user_id=user_id, session_id=f'session-{user_id}',
+        timestamp=NOW - timedelta(minutes=minutes_ago), **fields
+    )
+
+
+class TestIngestion:
+    """Test incremental ingestion and retention"""
+
+    def test_duplicates_and_expired_events_are_skipped(self, store):
+        event = make_event(5)
+        old = {'event_id': 'old', 'event_type': 'page_view', 'timestamp': (NOW - timedelta(days=8)).isoformat()}
+        assert store.ingest([event, old]) == 1
+        assert store.ingest([event]) == 0
+        assert store.count_events() == 1
+
+    def test_prune(self, store):
+        store.ingest([make_event(5)])
+        assert store.prune(now=NOW + timedelta(days=8)) == 1
+        assert store.count_events() == 0
+
+
+class TestQueries:
+    """Test search, counts and group-bys"""
+
+    def test_search_matches_event_search_filters(self, store):
+        store.ingest([
+            make_event(30, user_id='user1'),
+            make_event(20, user_id='user1', event_type='purchase', revenue='12.50'),
+            make_event(10, user_id='user2'),
+        ])
+        events = store.search_events(user_id='user1', start_time=NOW - timedelta(hours=1), limit=10)
+        assert [e['event_type'] for e in events] == ['purchase', 'page_view']  # newest first
+        assert AnalyticsEvent(**events[0]).revenue is not None
+
+        assert store.count_events(event_type='page_view') == 2
+        assert store.search_events(limit=1, offset=1)[0]['event_type'] == 'purchase'
+
+    def test_group_by(self, store):
+        store.ingest([make_event(i, user_id=f'user{i % 3}', country='DE' if i % 2 else 'FR') for i in range(12)])
+        result = store.group_by(['country'], ['events', 'unique_users'], filters={'event_type': ['page_view']})
+        assert sorted(result['rows'], key=lambda row: row['country']) == [
+            {'country': 'DE', 'events': 6, 'unique_users': 3},
+            {'country': 'FR', 'events': 6, 'unique_users': 3},
+        ]
+        assert result['truncated'] is False
+
+    def test_row_limit(self, store):
+        store.ingest([make_event(i, user_id=f'user{i}') for i in range(60)])
+        result = store.group_by(['user_id'], limit=1000)
+        assert len(result['rows']) == 50
+        assert result['truncated'] is True
+
+    def test_negative_limit_is_clamped(self, store):
+        store.ingest([make_event(i, user_id=f'user{i}') for i in range(60)])
+        assert len(store.group_by(['user_id'], limit=-2)['rows']) == 1
+        assert len(store.search_events(limit=-1)) == 1
+
+    def test_unknown_columns_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.group_by(['user_id; DROP TABLE events'])
+        with pytest.raises(ValueError):
+            store.group_by(['user_id'], filters={'data': 'x'})
+
+    def test_timeout(self, store):
+        store.ingest([make_event(i, user_id=f'user{i}') for i in range(200)])
+        store.timeout_ms = 1
+        with pytest.raises(QueryTimeout):
+            # Cross join large enough to outlast the deadline
+            store._execute('SELECT COUNT(*) FROM events a, events b, events c', [])
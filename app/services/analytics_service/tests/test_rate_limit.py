@@ -0,0 +1,28 @@
+import pytest
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.rate_limit import RateLimiter
+
+
+class TestRateLimiter:
+    """Test the token bucket"""
+
+    def test_throttles_to_rate(self, monkeypatch):
+        slept = []
+        monkeypatch.setattr('src.services.rate_limit.time.sleep', slept.append)
+        limiter = RateLimiter(100)
+        limiter.acquire(100)
+        limiter.acquire(50)
+        assert slept and slept[-1] == pytest.approx(0.5, abs=0.01)
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr('src.services.rate_limit.time.sleep', lambda s: pytest.fail('slept'))
+        RateLimiter(None).acquire(10 ** 6)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.cache_service import CacheService
+from src.services.realtime_metrics import RealtimeTopK, SlidingWindowCounter
+
+
+class FakeCache:
+    """In-memory stand-in for the CacheService counter methods"""
+
+    def __init__(self):
+        self.values = {}
+        self.reads = 0
+
+    def increment_many(self, mapping, ttls=None):
+        for key, amount in mapping.items():
+            self.values[key] = self.values.get(key, 0) + amount
+        return True
+
+    def get_many(self, keys):
+        self.reads += 1
+        return {key: self.values[key] for key in keys if key in self.values}
+
+
+class TestSlidingWindowCounter:
+    """Test rolling counts over minute/hour buckets"""
+
+    def setup_method(self):
+        self.cache = FakeCache()
+        self.counter = SlidingWindowCounter(self.cache)
+        self.now = datetime(2025, 6, 5, 12, 30, 30, tzinfo=timezone.utc)
+        # One event per minute for the last 30 hours
+        for m in range(30 * 60):
+            self.counter.record(1, now=self.now - timedelta(minutes=m))
+
+    def test_rolling_windows(self):
+        # Exact up to the partially weighted oldest minute
+        assert self.counter.total('1m', now=self.now) == pytest.approx(1, abs=1)
+        assert self.counter.total('1h', now=self.now) == pytest.approx(60, abs=1)
+        assert self.counter.total('24h', now=self.now) == pytest.approx(24 * 60, abs=1)
+        assert self.cache.reads == 3
+
+    def test_24h_window_uses_hour_buckets(self):
+        keys = self.counter.window_keys(self.now - timedelta(hours=24), self.now)
+        hours = [key for key, _ in keys if ':hour:' in key]
+        assert len(hours) == 23
+        assert len(keys) < 24 + 2 * 60
+
+    def test_oldest_minute_is_weighted(self):
+        keys = self.counter.window_keys(self.now - timedelta(minutes=1), self.now)
+        assert keys == [
+            ('events_count:minute:2025-06-05 12:29', 0.5),
+            ('events_count:minute:2025-06-05 12:30', 1.0),
+        ]
+
+    def test_series(self):
+        series = self.counter.series(5, now=self.now)
+        assert [point['minute'] for point in series] == [
+            '2025-06-05 12:26', '2025-06-05 12:27', '2025-06-05 12:28',
+            '2025-06-05 12:29', '2025-06-05 12:30',
+        ]
+        assert all(point['count'] == 1 for point in series)
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            self.counter.total('7d', now=self.now)
+        with pytest.raises(ValueError):
+            self.counter.series(0, now=self.now)
+
+
+
+class TestRealtimeTopK:
+    """Test the Space-Saving top-k buckets against Redis (in memory)"""
+
+    @pytest.fixture(autouse=True)
+    def setup_top_k(self, fake_redis, monkeypatch):
+        monkeypatch.setattr(RealtimeTopK, 'CAPACITY', 3)
+        self.now = datetime(2025, 6, 5, 12, 30, 30, tzinfo=timezone.utc)
+        self.top_k = RealtimeTopK(CacheService())
+        self.redis = fake_redis
+
+    def record(self, *products):
+        self.top_k.record(SimpleNamespace(timestamp=self.now, product_id=p, category=None, country=None)
+                          for p in products)
+
+    def test_counts_are_exact_below_capacity(self):
+        self.record('a', 'a', 'b')
+        self.record('a', 'b', 'c')
+
+        assert self.top_k.top('products', now=self.now) == [
+            {'product_id': 'a', 'count': 3, 'error': 0},
+            {'product_id': 'b', 'count': 2, 'error': 0},
+            {'product_id': 'c', 'count': 1, 'error': 0},
+        ]
+
+    def test_steady_item_enters_a_full_bucket(self):
+        self.record(*['a'] * 5, *['b'] * 5, *['c'] * 5)
+        for i in range(10):
+            self.record('steady', f'rare-{i}')
+
+        top = self.top_k.top('products', k=3, now=self.now)
+        steady = next(item for item in top if item['product_id'] == 'steady')
+        assert steady['count'] - steady['error'] <= 10 <= steady['count']
+        assert self.redis.zcard(RealtimeTopK.bucket_key('products', 'minute', '2025-06-05 12:30')) == 3
+
+    def test_error_bounds_hold(self):
+        import random
+        rng = random.Random(7)
+        truth = {}
+        for _ in range(20):
+            batch = [f'p{min(int(rng.expovariate(0.5)), 30)}' for _ in range(25)]
+            for product in batch:
+                truth[product] = truth.get(product, 0) + 1
+            self.record(*batch)
+
+        for item in self.top_k.top('products', k=3, now=self.now):
+            assert item['count'] - item['error'] <= truth[item['product_id']] <= item['count']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
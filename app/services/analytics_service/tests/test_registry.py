@@ -0,0 +1,84 @@
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services import registry as registry_module
+from src.services.registry import ServiceRegistry, _warm_schemas
+
+
+class TestServiceRegistry:
+    """Test lazy creation and lifecycle"""
+
+    def test_services_are_created_once_on_first_use(self):
+        created = []
+        registry = ServiceRegistry()
+        registry.register('cache', lambda r: created.append('cache') or object())
+        proxy = registry.lazy('cache')
+        assert created == []
+
+        with ThreadPoolExecutor(8) as pool:
+            instances = list(pool.map(lambda _: registry.get('cache'), range(32)))
+        assert created == ['cache']
+        assert all(instance is instances[0] for instance in instances)
+        assert proxy.__class__.__name__ == 'LazyService'
+
+    def test_dependencies_are_resolved_through_registry(self):
+        registry = ServiceRegistry()
+        registry.register('cache', lambda r: {'name': 'cache'})
+        registry.register('counter', lambda r: {'cache': r.get('cache')})
+        assert registry.get('counter')['cache'] is registry.get('cache')
+
+    def test_proxy_forwards_attribute_access(self):
+        registry = ServiceRegistry()
+        registry.register('numbers', lambda r: [3, 1, 2])
+        assert registry.lazy('numbers').count(1) == 1
+
+    def test_slow_service_does_not_block_others(self):
+        release = threading.Event()
+        registry = ServiceRegistry()
+        registry.register('slow', lambda r: release.wait(5) and object())
+        registry.register('fast', lambda r: object())
+        with ThreadPoolExecutor(1) as pool:
+            pending = pool.submit(registry.get, 'slow')
+            assert registry.get('fast') is not None
+            release.set()
+            assert pending.result() is not None
+
+    def test_fork_starts_cold(self, monkeypatch):
+        registry = ServiceRegistry()
+        registry.register('cache', lambda r: object())
+        parent = registry.get('cache')
+        registry.warm_up()
+        monkeypatch.setattr(registry_module.os, 'getpid', lambda: -1)
+        assert not registry.ready
+        assert registry.get('cache') is not parent
+
+
+class TestWarmUp:
+    """Test readiness gating"""
+
+    def test_ready_only_after_warm_up(self):
+        release = threading.Event()
+        registry = ServiceRegistry()
+        registry.add_warm_up('slow', lambda r: release.wait(5))
+        registry.start_warm_up()
+        assert not registry.ready
+        release.set()
+        registry._warm_up_thread.join(5)
+        assert registry.ready
+
+    def test_failed_step_is_reported(self):
+        registry = ServiceRegistry()
+        registry.add_warm_up('broken', lambda r: 1 / 0)
+        registry.add_warm_up('fine', lambda r: None)
+        report = registry.warm_up()
+        assert registry.ready
+        assert not report['broken']['ok'] and report['fine']['ok']
+
+    def test_schema_warm_up(self):
+        _warm_schemas(ServiceRegistry())
@@ -0,0 +1,133 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.retention import (
+    BatchDeleteEngine, RetentionPolicy, load_retention_policy,
+    purge_expired_aggregations, purge_expired_events
+)
+
+NOW = datetime(2025, 6, 5, tzinfo=timezone.utc)
+
+
+class FakeClient:
+    """Low-level DynamoDB client stand-in: segmented scans and batch deletes"""
+
+    def __init__(self, table, unprocessed_once=False, page_size=10):
+        self.table = table
+        self.unprocessed_once = unprocessed_once
+        self.page_size = page_size
+        self.batches = []
+        self.snapshot = list(table.items)  # scans page over a stable key order, unaffected by deletes
+
+    def scan(self, TableName, Segment, TotalSegments, ExclusiveStartKey=None, **params):
+        items = [item for i, item in enumerate(self.snapshot) if i % TotalSegments == Segment]
+        start = ExclusiveStartKey or 0
+        response = {'Items': items[start:start + self.page_size], 'ScannedCount': len(items[start:start + self.page_size])}
+        if start + self.page_size < len(items):
+            response['LastEvaluatedKey'] = start + self.page_size
+        return response
+
+    def batch_write_item(self, RequestItems, **params):
+        requests = RequestItems[self.table.name]
+        assert len(requests) <= 25
+        self.batches.append(len(requests))
+        if self.unprocessed_once and requests[-1:] and len(requests) > 1:
+            self.unprocessed_once = False
+            processed, unprocessed = requests[:-1], requests[-1:]
+        else:
+            processed, unprocessed = requests, []
+        deleted = {r['DeleteRequest']['Key']['event_id'] for r in processed}
+        self.table.items = [item for item in self.table.items if item['event_id'] not in deleted]
+        return {'UnprocessedItems': {self.table.name: unprocessed} if unprocessed else {}}
+
+
+class FakeTable:
+    def __init__(self, items, **client_options):
+        self.name = 'analytics-events'
+        self.items = items
+        self.key_schema = [{'AttributeName': 'event_id', 'KeyType': 'HASH'}]
+        self.meta = SimpleNamespace(client=FakeClient(self, **client_options))
+
+
+def legacy_events(count, days_ago, event_type='page_view'):
+    timestamp = (NOW - timedelta(days=days_ago)).isoformat()
+    return [{'event_id': f'{event_type}-{days_ago}-{i}', 'event_type': event_type, 'timestamp': timestamp}
+            for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr('src.services.retention.time.sleep', lambda s: None)
+    monkeypatch.setattr('src.services.backfill.time.sleep', lambda s: None)
+
+
+class TestRetentionPolicy:
+    """Test TTL expiry computation"""
+
+    def test_event_expiry_per_type(self):
+        policy = RetentionPolicy(event_days={'api_call': 30}, default_days=365)
+        assert policy.event_expiry('api_call', NOW) == int((NOW + timedelta(days=30)).timestamp())
+        assert policy.event_expiry('purchase', NOW.isoformat()) == int((NOW + timedelta(days=365)).timestamp())
+
+    def test_aggregations_kept_forever(self):
+        policy = RetentionPolicy(aggregation_days={'minute': 14, 'day': None})
+        assert policy.aggregation_expiry('day', NOW) is None
+        assert policy.aggregation_expiry('minute', NOW) == int((NOW + timedelta(days=14)).timestamp())
+
+    def test_overrides(self):
+        policy = load_retention_policy('{"search": 7}')
+        assert policy['search'] == 7
+        assert policy['api_call'] == 30
+
+
+class TestPurge:
+    """Test the parallel batch delete engine"""
+
+    def test_purges_only_expired_items(self):
+        items = legacy_events(40, 45, 'api_call') + legacy_events(30, 45, 'purchase') + legacy_events(5, 10, 'api_call')
+        table = FakeTable(items)
+        policy = RetentionPolicy(event_days={'api_call': 30}, default_days=365)
+
+        stats = purge_expired_events(table, policy, now=NOW, segments=3, max_write_units=1000, max_read_units=1000)
+
+        assert stats['deleted'] == 40
+        assert stats['scanned'] == 75
+        assert {item['event_type'] for item in table.items} == {'api_call', 'purchase'}
+        assert len(table.items) == 35
+        assert max(table.meta.client.batches) <= 25
+
+    def test_unprocessed_items_are_retried(self):
+        table = FakeTable(legacy_events(30, 45, 'api_call'), unprocessed_once=True, page_size=100)
+        engine = BatchDeleteEngine(table, segments=1, max_write_units=1000, max_read_units=1000)
+        stats = engine.purge(lambda item: True)
+
+        assert stats['deleted'] == 30
+        assert stats['retries'] == 1
+        assert table.items == []
+
+    def test_writes_are_throttled(self, monkeypatch):
+        acquired = []
+        table = FakeTable(legacy_events(60, 45, 'api_call'))
+        engine = BatchDeleteEngine(table, segments=2, max_write_units=10, max_read_units=1000)
+        monkeypatch.setattr(engine.write_limiter, 'acquire', acquired.append)
+        engine.purge(lambda item: True)
+        assert sum(acquired) == 60
+
+    def test_aggregations_by_period(self):
+        items = [
+            {'event_id': 'm-old', 'period': 'minute', 'period_start': (NOW - timedelta(days=20)).isoformat()},
+            {'event_id': 'm-new', 'period': 'minute', 'period_start': (NOW - timedelta(days=2)).isoformat()},
+            {'event_id': 'd-old', 'period': 'day', 'period_start': (NOW - timedelta(days=900)).isoformat()},
+        ]
+        table = FakeTable(items)
+        policy = RetentionPolicy(aggregation_days={'minute': 14, 'day': None})
+        stats = purge_expired_aggregations(table, policy, now=NOW, segments=1, max_write_units=1000, max_read_units=1000)
+
+        assert stats['deleted'] == 1
+        assert [item['event_id'] for item in table.items] == ['m-new', 'd-old']
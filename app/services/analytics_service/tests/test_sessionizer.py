@@ -0,0 +1,146 @@
+import pytest
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.aggregation_engine import AggregateState, period_bounds
+from src.services.cache_service import CacheService
+from src.services.sessionizer import InMemorySessionStore, RedisSessionStore, Sessionizer
+
+START = datetime(2025, 6, 5, 10, tzinfo=timezone.utc)
+
+
+def event(session_id, minutes, event_type='page_view'):
+    return {
+        'session_id': session_id,
+        'user_id': f'user-{session_id}',
+        'event_type': event_type,
+        'timestamp': START + timedelta(minutes=minutes),
+    }
+
+
+class TestSessionizer:
+    """Test incremental sessionization"""
+
+    def test_sessions_span_batches(self):
+        sessionizer = Sessionizer(InMemorySessionStore(), gap_seconds=1800)
+        started, ended = sessionizer.process([event('a', 0), event('b', 1)])
+        assert {s['session_id'] for s in started} == {'a', 'b'}
+        assert ended == []
+
+        started, ended = sessionizer.process([event('a', 10, 'add_to_cart'), event('a', 20)])
+        assert started == [] and ended == []
+
+        ended = sessionizer.expire(now=START + timedelta(minutes=60))
+        by_id = {s['session_id']: s for s in ended}
+        assert by_id['a']['duration'] == 20 * 60
+        assert by_id['a']['events'] == 3
+        assert by_id['a']['depth'] == 2
+        assert not by_id['a']['bounce']
+        assert by_id['b']['bounce']
+
+    def test_gap_starts_new_session(self):
+        sessionizer = Sessionizer(InMemorySessionStore(), gap_seconds=1800)
+        sessionizer.process([event('a', 0), event('a', 5)])
+        started, ended = sessionizer.process([event('a', 50)])
+
+        assert len(started) == 1
+        assert len(ended) == 1 and ended[0]['duration'] == 5 * 60
+
+    def test_out_of_order_events(self):
+        sessionizer = Sessionizer(InMemorySessionStore(), gap_seconds=1800)
+        sessionizer.process([event('a', 10), event('a', 2)])
+        ended = sessionizer.expire(now=START + timedelta(hours=2))
+        assert ended[0]['duration'] == 8 * 60
+
+    def test_store_is_bounded(self):
+        sessionizer = Sessionizer(InMemorySessionStore(max_sessions=100), gap_seconds=1800)
+        _, ended = sessionizer.process([event(f's{i}', i / 100) for i in range(150)])
+        assert len(sessionizer.store.sessions) == 100
+        assert len(ended) == 50
+
+
+class TestRedisSessionStore:
+    """Test the shared session store against Redis (in memory)"""
+
+    def test_matches_in_memory_store(self, fake_redis):
+        batches = [[event('s1', 0), event('s2', 1, 'add_to_cart'), event('s1', 5)],
+                   [event('s1', 50), event('s2', 10), event('s3', 11)]]
+        redis_sessionizer = Sessionizer(RedisSessionStore(CacheService(), gap_seconds=1800), gap_seconds=1800)
+        memory_sessionizer = Sessionizer(InMemorySessionStore(), gap_seconds=1800)
+
+        for batch in batches:
+            assert redis_sessionizer.process(batch) == memory_sessionizer.process(batch)
+        now = START + timedelta(hours=2)
+        assert (sorted(redis_sessionizer.expire(now=now), key=lambda s: s['session_id'])
+                == sorted(memory_sessionizer.expire(now=now), key=lambda s: s['session_id']))
+
+    def test_concurrent_workers_do_not_lose_updates(self, fake_redis):
+        first = Sessionizer(RedisSessionStore(CacheService()), gap_seconds=1800)
+        second = Sessionizer(RedisSessionStore(CacheService()), gap_seconds=1800)
+
+        started_first, _ = first.process([event('s1', 0), event('s1', 1)])
+        started_second, _ = second.process([event('s1', 2)])
+        ended = first.expire(now=START + timedelta(hours=1))
+
+        assert len(started_first) == 1 and started_second == []
+        assert [(s['events'], s['depth']) for s in ended] == [(3, 3)]
+        assert second.expire(now=START + timedelta(hours=1)) == []  # closed exactly once
+
+    def test_session_active_again_is_not_claimed(self, fake_redis, monkeypatch):
+        store = RedisSessionStore(CacheService(), gap_seconds=1800)
+        sessionizer = Sessionizer(store, gap_seconds=1800)
+        sessionizer.process([event('s1', 0)])
+        read_idle = store.cache.zset_range_by_score
+
+        def read_then_refresh(*args):
+            idle = read_idle(*args)
+            Sessionizer(RedisSessionStore(CacheService()), gap_seconds=1800).process([event('s1', 40)])
+            return idle
+
+        monkeypatch.setattr(store.cache, 'zset_range_by_score', read_then_refresh)
+        assert sessionizer.expire(now=START + timedelta(minutes=31)) == []
+        assert store.count_active(now=START + timedelta(minutes=41)) == 1
+
+    def test_keys_share_a_cluster_slot(self):
+        from redis.crc import key_slot
+        store = RedisSessionStore(SimpleNamespace())
+        assert key_slot(store.key('s1').encode()) == key_slot(store.key('s2').encode()) == \
+            key_slot(RedisSessionStore.ACTIVE_KEY.encode())
+
+    def test_active_sessions_are_counted(self, fake_redis):
+        store = RedisSessionStore(CacheService(), gap_seconds=1800)
+        Sessionizer(store, gap_seconds=1800).process([event('s1', 0), event('s2', 20), event('s3', 40)])
+
+        assert store.count_active(now=START + timedelta(minutes=45)) == 2
+        assert store.count_active(now=START + timedelta(hours=2)) == 0
+
+
+class TestSessionTotals:
+    """Test session totals on aggregations"""
+
+    def test_totals_roll_up(self):
+        minute = START
+        a, b = AggregateState(), AggregateState()
+        a.add_session_totals({'sessions': 2, 'total_duration': 300, 'total_depth': 5, 'bounces': 1})
+        b.add_session_totals({'sessions': 2, 'total_duration': 100, 'total_depth': 3, 'bounces': 0})
+        stored = b.to_aggregation('minute', *period_bounds('minute', minute)).model_dump(mode='json')
+
+        merged = a.merge(AggregateState.from_aggregation(stored))
+        aggregation = merged.to_aggregation('hour', *period_bounds('hour', minute))
+
+        assert aggregation.avg_session_duration == 100
+        assert aggregation.session_metrics['avg_depth'] == 2
+        assert aggregation.session_metrics['bounce_rate'] == 25
+
+    def test_no_sessions(self):
+        aggregation = AggregateState().to_aggregation('minute', *period_bounds('minute', START))
+        assert aggregation.avg_session_duration is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import pytest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import sys
+import os
+
+# Add service root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.aws_services import DynamoDBService
+from src.services.sharding import ShardPlan, scatter_gather
+
+HOUR = datetime(2025, 6, 5, 13, tzinfo=timezone.utc)
+
+
+class FakeIndexClient:
+    """Low-level client stand-in answering time-bucket index queries"""
+
+    def __init__(self, items, page_size=7):
+        self.items = items
+        self.page_size = page_size
+        self.queried = Counter()
+
+    def query(self, TableName, IndexName, KeyConditionExpression, ExclusiveStartKey=0, **params):
+        bucket_condition, ts_condition = KeyConditionExpression.get_expression()['values']
+        partition_key = bucket_condition.get_expression()['values'][1]
+        start, end = ts_condition.get_expression()['values'][1:]
+        self.queried[partition_key] += 1
+        matching = sorted(
+            (i for i in self.items if i['time_bucket'] == partition_key and start <= i['timestamp'] <= end),
+            key=lambda i: i['timestamp']
+        )
+        page = matching[ExclusiveStartKey:ExclusiveStartKey + self.page_size]
+        response = {'Items': page}
+        if ExclusiveStartKey + self.page_size < len(matching):
+            response['LastEvaluatedKey'] = ExclusiveStartKey + self.page_size
+        return response
+
+
+def make_service(plan, items, scanned=()):
+    client = FakeIndexClient(items)
+    table = SimpleNamespace(name='analytics-events', scan=lambda **params: {'Items': list(scanned)})
+    resource = SimpleNamespace(Table=lambda name: table, meta=SimpleNamespace(client=client))
+    service = DynamoDBService(SimpleNamespace(dynamodb=resource))
+    if plan:
+        service.shards = plan
+    return service, client
+
+
+def sharded_items(plan, start, count, step=timedelta(seconds=37)):
+    items = []
+    for i in range(count):
+        ts = start + i * step
+        event_id = f'event-{i}'
+        items.append({'event_id': event_id, 'timestamp': ts.isoformat(),
+                      'time_bucket': plan.partition_key(event_id, ts)})
+    return items
+
+
+class TestShardPlan:
+    """Test shard key computation"""
+
+    def test_keys_spread_over_all_shards(self):
+        plan = ShardPlan(8, schedule={}, since='')
+        keys = Counter(plan.partition_key(f'event-{i}', HOUR) for i in range(8000))
+        assert sorted(keys) == plan.partition_keys(HOUR)
+        assert min(keys.values()) > 800
+
+    def test_schedule_changes_shard_count_per_bucket(self):
+        plan = ShardPlan(4, schedule={'2025-06-05T12:00:00+00:00': 16, '2025-06-06T00:00:00+00:00': 2}, since='')
+        assert plan.shards_for(HOUR - timedelta(hours=2)) == 4
+        assert len(plan.partition_keys(HOUR)) == 16
+        assert plan.shards_for(HOUR + timedelta(days=1)) == 2
+
+    def test_split_at_sharding_start(self):
+        plan = ShardPlan(4, schedule={}, since=HOUR.isoformat())
+        unsharded, sharded = plan.split(HOUR - timedelta(hours=1), HOUR + timedelta(hours=1))
+        assert unsharded == (HOUR - timedelta(hours=1), HOUR)
+        assert sharded == (HOUR, HOUR + timedelta(hours=1))
+
+
+class TestScatterGather:
+    """Test parallel shard reads"""
+
+    def test_merges_in_time_order(self):
+        shards = {
+            'a': [[{'timestamp': '1'}, {'timestamp': '4'}], [{'timestamp': '7'}]],
+            'b': [[{'timestamp': '2'}, {'timestamp': '3'}]],
+            'c': [[], [{'timestamp': '5'}, {'timestamp': '6'}]],
+        }
+        with ThreadPoolExecutor(4) as pool:
+            merged = list(scatter_gather(lambda key: iter(shards[key]), shards, pool))
+        assert [item['timestamp'] for item in merged] == ['1', '2', '3', '4', '5', '6', '7']
+
+    def test_time_range_reads_query_every_shard(self):
+        plan = ShardPlan(4, schedule={HOUR.isoformat(): 6}, since='')
+        items = sharded_items(plan, HOUR - timedelta(minutes=30), 200)
+        service, client = make_service(plan, items)
+
+        start, end = HOUR - timedelta(minutes=20), HOUR + timedelta(hours=1)
+        events = list(service.iter_events_by_timerange(start, end))
+
+        expected = [i for i in items if start.isoformat() <= i['timestamp'] < end.isoformat()]
+        assert [e['event_id'] for e in events] == [e['event_id'] for e in expected]
+        assert set(client.queried) == set(plan.partition_keys(HOUR - timedelta(hours=1)) + plan.partition_keys(HOUR))
+
+    def test_legacy_range_is_scanned(self):
+        plan = ShardPlan(4, schedule={}, since=HOUR.isoformat())
+        legacy = [{'event_id': 'old', 'timestamp': (HOUR - timedelta(minutes=5)).isoformat()}]
+        items = sharded_items(plan, HOUR, 10)
+        service, _ = make_service(plan, items, scanned=legacy)
+
+        events = list(service.iter_events_by_timerange(HOUR - timedelta(hours=1), HOUR + timedelta(hours=1)))
+        assert [e['event_id'] for e in events] == ['old'] + [i['event_id'] for i in items]
+
+    def test_unsharded_events_are_read_from_the_index(self, monkeypatch):
+        monkeypatch.setattr(DynamoDBService, '_scan_events', lambda *args: pytest.fail('events table scanned'))
+        service, client = make_service(None, [])
+        assert service.shards.partition_keys(HOUR) == ['2025-06-05T13#000']
+        client.items = sharded_items(service.shards, HOUR, 10)
+
+        events = list(service.iter_events_by_timerange(HOUR, HOUR + timedelta(minutes=1)))
+
+        assert [e['event_id'] for e in events] == ['event-0', 'event-1']
+        assert client.queried == {'2025-06-05T13#000': 1}
@@ -92,6 +92,50 @@ aws --endpoint-url=http://localhost:4566 dynamodb create-table \
     --provisioned-throughput ReadCapacityUnits=10,WriteCapacityUnits=10 \
     2>/dev/null || echo "ℹ️  Products table already exists"
 
+# Analytics events: time-range reads query the time-bucket index ("{hour}#{shard}" + timestamp)
+aws --endpoint-url=http://localhost:4566 dynamodb create-table \
+    --table-name analytics-events \
+    --attribute-definitions \
+        AttributeName=event_id,AttributeType=S \
+        AttributeName=time_bucket,AttributeType=S \
+        AttributeName=timestamp,AttributeType=S \
+    --key-schema \
+        AttributeName=event_id,KeyType=HASH \
+    --global-secondary-indexes \
+        IndexName=time-bucket-index,KeySchema='[{AttributeName=time_bucket,KeyType=HASH},{AttributeName=timestamp,KeyType=RANGE}]',Projection='{ProjectionType=ALL}' \
+    --billing-mode PAY_PER_REQUEST \
+    2>/dev/null || echo "ℹ️  analytics-events table already exists"
+
+aws --endpoint-url=http://localhost:4566 dynamodb create-table \
+    --table-name analytics-metrics \
+    --attribute-definitions \
+        AttributeName=metric_name,AttributeType=S \
+        AttributeName=timestamp,AttributeType=S \
+    --key-schema \
+        AttributeName=metric_name,KeyType=HASH \
+        AttributeName=timestamp,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    2>/dev/null || echo "ℹ️  analytics-metrics table already exists"
+
+# Analytics aggregations: one partition per period/event type ("hour#all"), ranges by period_start
+aws --endpoint-url=http://localhost:4566 dynamodb create-table \
+    --table-name analytics-aggregations \
+    --attribute-definitions \
+        AttributeName=aggregation_key,AttributeType=S \
+        AttributeName=period_start,AttributeType=S \
+    --key-schema \
+        AttributeName=aggregation_key,KeyType=HASH \
+        AttributeName=period_start,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    2>/dev/null || echo "ℹ️  analytics-aggregations table already exists"
+
+for table in analytics-events analytics-aggregations; do
+    aws --endpoint-url=http://localhost:4566 dynamodb update-time-to-live \
+        --table-name $table \
+        --time-to-live-specification Enabled=true,AttributeName=expires_at \
+        > /dev/null 2>&1 || true
+done
+
 echo "✅ DynamoDB tables ready!"
 
 echo ""
@@ -114,6 +158,9 @@ echo ""
 echo "  🗃️  DynamoDB Tables:"
 echo "    - users (with EmailIndex, UsernameIndex)"
 echo "    - Products (productId as partition key)"
+echo "    - analytics-events (with time-bucket-index)"
+echo "    - analytics-metrics"
+echo "    - analytics-aggregations (aggregation_key, period_start)"
 echo ""
 echo "🔧 LocalStack Dashboard: http://localhost:4566/_localstack/health"
 echo "🌐 Services ready for event-driven communication!" 
\ No newline at end of file